@@ -0,0 +1,266 @@
+"""Micro-benchmark do custo de CPU dos handlers, mensagens e teclados
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_handlers
+    python -m benchmarks.bench_handlers --save baseline.json
+    python -m benchmarks.bench_handlers --compare baseline.json --threshold 0.15
+
+Para cada caso mede:
+    ns/update     tempo de relógio por execução
+    cpu ns/update tempo de CPU do processo por execução (inclui threads)
+    bytes/update  pico de memória alocada durante a execução (tracemalloc)
+    allocs/update blocos alocados pela execução que continuam vivos ao fim do lote
+                  (tracemalloc, somados por local de alocação)
+
+A memória é medida em lotes, com as tarefas em segundo plano dos handlers já
+concluídas, e descontada a atividade de um lote de referência que só roda o
+setup (o CPython não expõe um contador de alocações brutas).
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.stubs import (
+    FakeBot,
+    FakeContext,
+    install_stubs,
+    make_callback_update,
+    make_command_update,
+)
+
+install_stubs()
+
+from handlers.callbacks import button_handler, guess_result_handler, continue_handler
+from handlers.commands import play
+from models.session import QuestionState
+from utils.session_manager import create_session, clear_sessions
+from utils.keyboard import create_game_keyboard, create_guess_keyboard, create_continue_keyboard, game_callback_data
+from utils.messages import (
+    format_question,
+    format_guess,
+    format_welcome,
+    format_victory,
+    format_defeat,
+    format_give_up,
+)
+
+CHAT_ID = -1001
+USER_ID = 42
+
+
+class Case:
+    """Um caso de benchmark: setup() monta os argumentos, run(*args) é medido"""
+
+    def __init__(self, name: str, setup: Callable, run: Callable, is_async: bool = True):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.is_async = is_async
+
+
+def _fresh_session(progression: float = 10.0, win: bool = False, question_count: int = 2):
+    """Cria uma sessão pronta para receber respostas"""
+    clear_sessions()
+    session = create_session(USER_ID, CHAT_ID)
+    session.aki.start_game(language=session.language, theme=session.theme)
+    session.aki.progression = progression
+    session.aki.step = question_count - 1
+    session.aki.win = win
+    session.question_count = question_count
+    session.history = [
+        QuestionState(f"Pergunta número {step + 1}?", step * 10.0, step)
+        for step in range(question_count - 1)
+    ]
+    if win:
+        session.aki.name_proposition = "Personagem"
+        session.aki.description_proposition = "Descrição"
+    return session
+
+
+def build_cases(bot: FakeBot) -> List[Case]:
+    """Monta a lista de casos medidos"""
+    ctx = FakeContext(bot)
+
+    def callback(action: str, user_id: int = USER_ID, **session_kwargs):
+        def setup():
+            game = _fresh_session(**session_kwargs)
+            data = game_callback_data(action, game.game_id)
+            return (make_callback_update(bot, CHAT_ID, user_id, data), ctx)
+        return setup
+
+    def play_setup():
+        clear_sessions()
+        return (make_command_update(bot, CHAT_ID, USER_ID, "/jogar"), ctx)
+
+    session = _fresh_session()
+
+    return [
+        Case("button_handler:answer", callback("yes"), button_handler),
+        Case("button_handler:answer_guess", callback("yes", progression=85.0), button_handler),
+        Case("button_handler:back", callback("back", question_count=3), button_handler),
+        Case("button_handler:other_user", callback("yes", user_id=USER_ID + 1), button_handler),
+        Case("guess_result_handler:correct", callback("correct", win=True), guess_result_handler),
+        Case("guess_result_handler:wrong", callback("wrong", win=True), guess_result_handler),
+        Case("continue_handler:continue", callback("continue"), continue_handler),
+        Case("continue_handler:give_up", callback("give_up"), continue_handler),
+        Case("play", play_setup, play),
+        Case("format_question", lambda: (session, "Seu personagem é real?"), format_question, False),
+        Case("format_guess", lambda: ("Personagem", "Descrição"), format_guess, False),
+        Case("format_welcome", lambda: ("Jogador",), format_welcome, False),
+        Case("format_victory", lambda: (), format_victory, False),
+        Case("format_defeat", lambda: (), format_defeat, False),
+        Case("format_give_up", lambda: (), format_give_up, False),
+        Case("create_game_keyboard", lambda: (session.game_id,), create_game_keyboard, False),
+        Case("create_guess_keyboard", lambda: (session.game_id,), create_guess_keyboard, False),
+        Case("create_continue_keyboard", lambda: (session.game_id,), create_continue_keyboard, False),
+    ]
+
+
+async def _call(case: Case, args) -> None:
+    if case.is_async:
+        await case.run(*args)
+    else:
+        case.run(*args)
+
+
+async def measure(case: Case, iterations: int, warmup: int) -> Dict[str, float]:
+    """Mede um caso e retorna as médias por execução"""
+    for _ in range(warmup):
+        await _call(case, case.setup())
+
+    wall_ns = 0
+    cpu_ns = 0
+    for _ in range(iterations):
+        args = case.setup()
+        wall_start = time.perf_counter_ns()
+        cpu_start = time.process_time_ns()
+        await _call(case, args)
+        cpu_ns += time.process_time_ns() - cpu_start
+        wall_ns += time.perf_counter_ns() - wall_start
+
+    # Segunda passada só para memória: o tracemalloc distorce os tempos
+    batch = max(1, iterations // 10)
+    gc.disable()
+    tracemalloc.start()
+    try:
+        baseline = await _measure_batch(case, batch, run=False)
+        result = await _measure_batch(case, batch, run=True)
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+
+    return {
+        "ns": wall_ns / iterations,
+        "cpu_ns": cpu_ns / iterations,
+        "bytes": result["bytes"] / batch,
+        "allocs": max(0.0, (result["allocs"] - baseline["allocs"]) / batch),
+    }
+
+
+async def _settle():
+    """Espera as tarefas em segundo plano criadas pelos handlers"""
+    pending = asyncio.all_tasks() - {asyncio.current_task()}
+    if pending:
+        await asyncio.wait(pending)
+
+
+async def _measure_batch(case: Case, batch: int, run: bool) -> Dict[str, float]:
+    """Memória de um lote: pico somado por execução e blocos vivos ao final
+
+    Com run=False só o setup roda, para descontar a atividade que não é do caso.
+    """
+    await _settle()
+    peak_bytes = 0
+    before = tracemalloc.take_snapshot()
+    for _ in range(batch):
+        args = case.setup()
+        tracemalloc.reset_peak()
+        before_bytes = tracemalloc.get_traced_memory()[0]
+        if run:
+            await _call(case, args)
+        peak_bytes += tracemalloc.get_traced_memory()[1] - before_bytes
+    await _settle()
+    after = tracemalloc.take_snapshot()
+
+    # Por local de alocação: blocos liberados em outro lugar não cancelam os novos
+    allocs = sum(stat.count_diff for stat in after.compare_to(before, "traceback") if stat.count_diff > 0)
+    return {"bytes": peak_bytes, "allocs": allocs}
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Retorna os casos que ficaram mais lentos que o limite em relação à base"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = result["cpu_ns"] / base["cpu_ns"] if base["cpu_ns"] else 1.0
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: {ratio:.2f}x CPU ({base['cpu_ns']:.0f} → {result['cpu_ns']:.0f} ns)")
+    return regressions
+
+
+async def run(args) -> int:
+    bot = FakeBot()
+    cases = build_cases(bot)
+    if args.filter:
+        cases = [case for case in cases if args.filter in case.name]
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = {}
+    print(f"{'caso':<34}{'ns/update':>12}{'cpu ns/update':>15}{'bytes/update':>14}{'allocs/update':>15}{'vs base':>9}")
+    for case in cases:
+        result = await measure(case, args.iterations, args.warmup)
+        results[case.name] = result
+        base = baseline.get(case.name)
+        delta = f"{result['cpu_ns'] / base['cpu_ns']:.2f}x" if base and base["cpu_ns"] else ""
+        print(
+            f"{case.name:<34}{result['ns']:>12.0f}{result['cpu_ns']:>15.0f}"
+            f"{result['bytes']:>14.0f}{result['allocs']:>15.1f}{delta:>9}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResultados salvos em {args.save}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\nRegressões de CPU:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nSem regressões de CPU.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--filter", help="roda apenas casos cujo nome contém este texto")
+    parser.add_argument("--save", help="salva os resultados como base em um arquivo JSON")
+    parser.add_argument("--compare", help="compara com uma base salva anteriormente")
+    parser.add_argument("--threshold", type=float, default=0.10, help="piora máxima aceita (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    # Silencia os logs dos handlers durante a medição
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Throughput da pilha completa (python-telegram-bot + handlers) em cada modo de execução
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_runtime
+    python -m benchmarks.bench_runtime --updates 20000 --batch 100
+
+Cada combinação de event loop (asyncio/uvloop) e codec JSON (json/orjson) instalada
+roda em um processo separado. Os updates passam pelo mesmo caminho da produção:
+decodificação do getUpdates, Update.de_json, Application.process_update, handlers
+e serialização das respostas da Bot API (respondidas localmente, sem rede).
+MongoDB e Akinator são substituídos pelos objetos falsos de benchmarks.stubs.
+
+    updates/s     updates processados por segundo de relógio
+    updates/s/cpu updates processados por segundo de CPU do processo (≈ por núcleo)
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from importlib.util import find_spec
+from typing import List, Tuple
+
+TOKEN = "123456:benchmark"
+CHATS = 50
+
+
+def _updates_payload(start_id: int, count: int) -> bytes:
+    """Monta uma resposta de getUpdates: em cada chat, /jogar seguido de respostas"""
+    updates = []
+    for i in range(count):
+        update_id = start_id + i
+        chat_id = -1000 - (update_id % CHATS)
+        user_id = 1000 + (update_id % CHATS)
+        chat = {"id": chat_id, "type": "supergroup", "title": "Grupo"}
+        user = {"id": user_id, "is_bot": False, "first_name": "Jogador"}
+        if (update_id // CHATS) % 8 == 0:
+            updates.append({
+                "update_id": update_id,
+                "message": {
+                    "message_id": update_id,
+                    "date": 0,
+                    "chat": chat,
+                    "from": user,
+                    "text": "/jogar",
+                    "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+                },
+            })
+        else:
+            updates.append({
+                "update_id": update_id,
+                "callback_query": {
+                    "id": str(update_id),
+                    "from": user,
+                    "chat_instance": str(chat_id),
+                    "data": "yes",
+                    "message": {"message_id": update_id, "date": 0, "chat": chat, "text": "Pergunta"},
+                },
+            })
+    return json.dumps({"ok": True, "result": updates}).encode()
+
+
+async def _run_child(total: int, batch: int) -> dict:
+    from telegram import Update
+
+    from benchmarks.stubs import bind_callback_to_game, install_stubs, make_local_request_class
+    install_stubs()
+
+    import utils.tracing
+    from bot import build_application
+    from utils.bot_registry import bot_id_from_token, register_application
+    from utils.session_manager import clear_sessions
+
+    # Sem exportar traces durante a medição
+    utils.tracing.TRACE_ENABLED = False
+
+    app = build_application(TOKEN, request_class=make_local_request_class())
+    await app.initialize()
+    register_application(app)
+    request = app.bot.request
+    bot_id = bot_id_from_token(TOKEN)
+    payloads = [_updates_payload(start, batch) for start in range(0, total, batch)]
+
+    async def process(payload: bytes):
+        for data in request.parse_json_payload(payload)["result"]:
+            await app.process_update(Update.de_json(bind_callback_to_game(data, bot_id), app.bot))
+
+    # Aquecimento
+    await process(_updates_payload(10 ** 9, batch))
+    clear_sessions()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for payload in payloads:
+        await process(payload)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    clear_sessions()
+    await app.shutdown()
+    processed = len(payloads) * batch
+    return {"updates": processed, "per_second": processed / wall, "per_cpu_second": processed / cpu}
+
+
+def child(loop: str, codec: str, total: int, batch: int) -> None:
+    from utils import performance
+
+    if loop == "uvloop":
+        performance.install_fast_event_loop()
+    if codec == "orjson":
+        performance.enable_fast_json()
+    print(json.dumps(asyncio.run(_run_child(total, batch))))
+
+
+def available_modes() -> List[Tuple[str, str]]:
+    loops = ["asyncio"] + (["uvloop"] if find_spec("uvloop") else [])
+    codecs = ["json"] + (["orjson"] if find_spec("orjson") else [])
+    return [(loop, codec) for loop in loops for codec in codecs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=10000)
+    parser.add_argument("--batch", type=int, default=100, help="updates por resposta de getUpdates")
+    parser.add_argument("--child", nargs=2, metavar=("LOOP", "JSON"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Silencia os logs dos handlers durante a medição
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    if args.child:
+        child(*args.child, args.updates, args.batch)
+        return
+
+    modes = available_modes()
+    baseline = None
+    print(f"{'loop':<10}{'json':<9}{'updates/s':>12}{'updates/s/cpu':>16}{'vs padrão':>11}")
+    for loop, codec in modes:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_runtime", "--updates", str(args.updates),
+             "--batch", str(args.batch), "--child", loop, codec],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        baseline = baseline or result["per_cpu_second"]
+        print(
+            f"{loop:<10}{codec:<9}{result['per_second']:>12.0f}{result['per_cpu_second']:>16.0f}"
+            f"{result['per_cpu_second'] / baseline:>10.2f}x"
+        )
+
+    missing = [name for name in ("uvloop", "orjson") if not find_spec(name)]
+    if missing:
+        print(f"\nNão instalados (modos omitidos): {', '.join(missing)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Custo das operações de armazenamento mais frequentes em cada backend
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_storage
+    MONGO_URL=mongodb://localhost:27017 python -m benchmarks.bench_storage
+
+Mede, pelas mesmas funções usadas pelos handlers (database.storage):
+    is_chat_locked      chat já conhecido
+    save_user_id:known  usuário já salvo (o caso de quase toda interação)
+    save_user_id:new    usuário novo
+
+Para cada operação, a latência (média e p99, uma de cada vez) e a vazão com
+--concurrency operações simultâneas, como quando vários updates chegam juntos.
+
+O SQLite usa um arquivo temporário. Com MONGO_URL, também mede o MongoDB com os dois
+drivers (pymongo assíncrono nativo e motor) e o SQLite como cache na frente dele, em
+um banco separado (akinator_bench) apagado no final.
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+from database import storage
+from database.mongodb import MongoStorage
+from database.sqlite import SQLiteStorage
+from config import MONGO_DRIVER
+
+BENCH_DATABASE = "akinator_bench"
+CHAT_ID = -1001
+KNOWN_USER = 42
+
+
+def build_backends(directory: str) -> List[Tuple[str, Callable[[], storage.Storage]]]:
+    backends = [("sqlite", lambda: SQLiteStorage(os.path.join(directory, "sqlite.db")))]
+    uri = os.getenv("MONGO_URL")
+    if uri:
+        backends.append(("mongo:pymongo", lambda: MongoStorage(uri, BENCH_DATABASE, "pymongo")))
+        backends.append(("mongo:motor", lambda: MongoStorage(uri, BENCH_DATABASE, "motor")))
+        backends.append((f"sqlite+mongo:{MONGO_DRIVER}", lambda: storage.CachedStorage(
+            MongoStorage(uri, BENCH_DATABASE), SQLiteStorage(os.path.join(directory, "cache.db"))
+        )))
+    return backends
+
+
+async def measure(operation: Callable, iterations: int, concurrency: int) -> Dict[str, float]:
+    """Mede uma operação assíncrona: média e p99 em microssegundos e vazão em operações/s"""
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter_ns()
+        await operation()
+        samples.append(time.perf_counter_ns() - started)
+    samples.sort()
+
+    # Vazão: lotes de operações simultâneas
+    started = time.perf_counter()
+    for _ in range(max(1, iterations // concurrency)):
+        await asyncio.gather(*(operation() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "avg_us": sum(samples) / len(samples) / 1000,
+        "p99_us": samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1000,
+        "ops_s": max(1, iterations // concurrency) * concurrency / elapsed,
+    }
+
+
+async def run_backend(factory: Callable[[], storage.Storage], iterations: int,
+                      concurrency: int) -> Dict[str, dict]:
+    backend = factory()
+    if not await storage.connect_storage(backend):
+        raise RuntimeError(f"não foi possível conectar ao backend {backend.name}")
+    try:
+        await storage.lock_chat(CHAT_ID)
+        await storage.save_user_id(KNOWN_USER)
+        new_users = itertools.count(10 ** 9)
+
+        # Aquecimento (conexões, cache)
+        for _ in range(20):
+            await storage.is_chat_locked(CHAT_ID)
+            await storage.save_user_id(KNOWN_USER)
+
+        return {
+            "is_chat_locked": await measure(lambda: storage.is_chat_locked(CHAT_ID), iterations, concurrency),
+            "save_user_id:known": await measure(lambda: storage.save_user_id(KNOWN_USER), iterations, concurrency),
+            "save_user_id:new": await measure(
+                lambda: storage.save_user_id(next(new_users)), iterations, concurrency
+            ),
+        }
+    finally:
+        if isinstance(backend, MongoStorage) or isinstance(getattr(backend, "primary", None), MongoStorage):
+            mongo = backend if isinstance(backend, MongoStorage) else backend.primary
+            await mongo.client.drop_database(BENCH_DATABASE)
+        await storage.close_storage()
+
+
+async def run(args) -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'backend':<22}{'operação':<22}{'média µs':>12}{'p99 µs':>12}{'ops/s':>12}")
+        for name, factory in build_backends(directory):
+            results = await run_backend(factory, args.iterations, args.concurrency)
+            for operation, result in results.items():
+                print(
+                    f"{name:<22}{operation:<22}{result['avg_us']:>12.1f}"
+                    f"{result['p99_us']:>12.1f}{result['ops_s']:>12.0f}"
+                )
+    if not os.getenv("MONGO_URL"):
+        print("\nMONGO_URL não configurado: MongoDB e cache local não medidos.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32, help="operações simultâneas na medição de vazão")
+    args = parser.parse_args()
+
+    # Silencia os logs durante a medição
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Replay de tráfego gravado (TRAFFIC_RECORD_FILE) contra a pilha completa do bot
+
+Uso (na raiz do projeto):
+    python -m benchmarks.replay traffic.jsonl                  # tempo real (1x)
+    python -m benchmarks.replay traffic.jsonl --speed 10       # 10x mais rápido
+    python -m benchmarks.replay traffic.jsonl --speed max      # sem pausas
+    python -m benchmarks.replay traffic.jsonl --speed max --save base.json
+    python -m benchmarks.replay traffic.jsonl --speed max --compare base.json
+
+Os updates entram pela update_queue da Application no mesmo ritmo da gravação
+(dividido pela velocidade) e passam por todos os handlers. As respostas do Akinator
+são servidas a partir da gravação, com o mesmo tempo de resposta (também dividido
+pela velocidade); a Bot API responde localmente e o MongoDB é substituído pelos
+objetos falsos de benchmarks.stubs.
+
+A latência é medida da chegada prevista do update até o fim do processamento,
+incluindo o tempo na fila.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import sys
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import requests
+
+TOKEN = "123456:replay"
+
+# Chat do update em processamento, propagado para as threads do Akinator
+_replay_chat: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("replay_chat", default=None)
+
+
+class ReplayResponse:
+    """Resposta gravada do Akinator, com a interface usada pela biblioteca akinator"""
+
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} (replay)", response=self)
+
+
+class Recording:
+    """Updates e respostas do Akinator lidos de um arquivo de gravação"""
+
+    def __init__(self, path: str):
+        self.updates: List[Tuple[float, Optional[int], dict]] = []
+        self._akinator: Dict[Tuple[Optional[int], str], Deque[Tuple[int, str, float]]] = defaultdict(deque)
+        self.misses = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                item = json.loads(line)
+                if item["type"] == "update":
+                    self.updates.append((item["t"], item["chat"], item["update"]))
+                elif item["type"] == "akinator":
+                    self._akinator[(item["chat"], item["path"])].append(
+                        (item["status"], item["body"], item["elapsed"])
+                    )
+        self.updates.sort(key=lambda entry: entry[0])
+
+    def next_response(self, chat: Optional[int], path: str) -> Optional[Tuple[int, str, float]]:
+        """Próxima resposta gravada desse chat para esse caminho"""
+        responses = self._akinator.get((chat, path))
+        if not responses:
+            self.misses += 1
+            return None
+        return responses.popleft()
+
+
+def make_transport_class(recording: Recording, speed: Optional[float]):
+    """Cria o substituto do EndpointScraper que responde com a gravação"""
+
+    class ReplayTransport:
+        def __init__(self, selector, base_url: str, language: str):
+            self.base_url = base_url
+            self.requests = 0
+
+        def post(self, url: str, **kwargs):
+            self.requests += 1
+            recorded = recording.next_response(_replay_chat.get(), url.rsplit("/", 1)[-1])
+            if recorded is None:
+                # Chamada que não existia na gravação (mudança de comportamento)
+                return ReplayResponse(503, "")
+            status, body, elapsed = recorded
+            if speed:
+                time.sleep(elapsed / speed)
+            return ReplayResponse(status, body)
+
+        def close(self):
+            pass
+
+    return ReplayTransport
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def replay(path: str, speed: Optional[float]) -> dict:
+    import akinator
+    from telegram import Update
+
+    from benchmarks.stubs import bind_callback_to_game, install_stubs, make_local_request_class
+    install_stubs()
+
+    import models.session
+    import utils.tracing
+    from bot import build_application
+    from utils.bot_registry import bot_id_from_token, register_application
+    from utils.session_manager import clear_sessions
+    from utils.traffic_recorder import recorder
+
+    recording = Recording(path)
+    # Akinator real (o parsing faz parte do custo), com as respostas da gravação
+    models.session.Akinator = akinator.Akinator
+    models.session.EndpointScraper = make_transport_class(recording, speed)
+    # Sem exportar traces nem gravar de novo durante o replay
+    utils.tracing.TRACE_ENABLED = False
+    recorder.path = None
+
+    app = build_application(TOKEN, request_class=make_local_request_class())
+    bot_id = bot_id_from_token(TOKEN)
+    errors = []
+
+    async def on_error(update, context):
+        errors.append(context.error)
+
+    app.add_error_handler(on_error)
+
+    total = len(recording.updates)
+    latencies: List[float] = []
+    scheduled: Dict[int, float] = {}
+    chats: Dict[int, Optional[int]] = {}
+    raw: Dict[int, dict] = {}
+    finished = asyncio.Event()
+    process_update = app.process_update
+
+    async def timed_process_update(update):
+        _replay_chat.set(chats.get(update.update_id))
+        if update.callback_query is not None:
+            # O id do jogo nos botões só é conhecido depois que o /jogar do replay roda
+            update = Update.de_json(bind_callback_to_game(raw.pop(update.update_id), bot_id), app.bot)
+        try:
+            await process_update(update)
+        finally:
+            latencies.append(time.perf_counter() - scheduled[update.update_id])
+            if len(latencies) >= total:
+                finished.set()
+
+    app.process_update = timed_process_update
+
+    await app.initialize()
+    register_application(app)
+    await app.start()
+
+    if not total:
+        finished.set()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    first_offset = recording.updates[0][0] if total else 0.0
+    for offset, chat, data in recording.updates:
+        due = wall_start + (offset - first_offset) / speed if speed else time.perf_counter()
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        update = Update.de_json(data, app.bot)
+        scheduled[update.update_id] = max(due, wall_start)
+        chats[update.update_id] = chat
+        if update.callback_query is not None:
+            raw[update.update_id] = data
+        await app.update_queue.put(update)
+
+    await finished.wait()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    await app.stop()
+    clear_sessions()
+    await app.shutdown()
+
+    return {
+        "updates": total,
+        "wall": wall,
+        "throughput": total / wall if wall else 0.0,
+        "cpu_per_update_ms": cpu / total * 1000 if total else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "errors": len(errors),
+        "akinator_misses": recording.misses,
+    }
+
+
+def _parse_speed(value: str) -> Optional[float]:
+    if value == "max":
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("a velocidade deve ser positiva ou 'max'")
+    return speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="arquivo gravado com TRAFFIC_RECORD_FILE")
+    parser.add_argument("--speed", type=_parse_speed, default=1.0, help="1, 10, ... ou max (padrão: 1)")
+    parser.add_argument("--save", help="salva o resultado como base em um arquivo JSON")
+    parser.add_argument("--compare", help="compara com uma base salva anteriormente")
+    parser.add_argument("--threshold", type=float, default=0.10, help="piora máxima aceita (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    # Silencia os logs dos handlers durante o replay
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    result = asyncio.run(replay(args.recording, args.speed))
+    print(f"updates:            {result['updates']}")
+    print(f"tempo:              {result['wall']:.2f} s")
+    print(f"throughput:         {result['throughput']:.1f} updates/s")
+    print(f"CPU por update:     {result['cpu_per_update_ms']:.3f} ms")
+    print(
+        f"latência (ms):      p50 {result['p50_ms']:.1f} - p95 {result['p95_ms']:.1f} - "
+        f"p99 {result['p99_ms']:.1f} - máx {result['max_ms']:.1f}"
+    )
+    print(f"erros nos handlers: {result['errors']}")
+    print(f"chamadas ao Akinator fora da gravação: {result['akinator_misses']}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResultado salvo em {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        regressions = [
+            f"{key}: {base[key]:.3f} → {result[key]:.3f}"
+            for key in ("cpu_per_update_ms", "p95_ms", "p99_ms")
+            if base.get(key) and result[key] > base[key] * (1 + args.threshold)
+        ]
+        if regressions:
+            print("\nRegressões:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nSem regressões.")
+
+
+if __name__ == "__main__":
+    main()
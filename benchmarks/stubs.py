@@ -0,0 +1,223 @@
+"""Objetos falsos para rodar os handlers sem Telegram, MongoDB ou Akinator"""
+
+import itertools
+from telegram import Update
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+class FakeBot:
+    """Bot falso: qualquer método da Bot API vira uma corrotina que só conta a chamada"""
+
+    defaults = None
+
+    def __init__(self):
+        self.calls = {}
+        self.id = 123456
+        self.username = "akinator_bench_bot"
+
+    def __getattr__(self, name):
+        async def api_call(*args, **kwargs):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            return None
+        return api_call
+
+
+class FakeApplication:
+    """Só o necessário da Application para as tarefas em segundo plano dos handlers"""
+
+    def create_task(self, coroutine, update=None, name=None):
+        import asyncio
+        return asyncio.create_task(coroutine, name=name)
+
+
+class FakeContext:
+    """Substitui o ContextTypes.DEFAULT_TYPE"""
+
+    def __init__(self, bot: FakeBot, args=None):
+        self.bot = bot
+        self.args = args or []
+        self.application = FakeApplication()
+
+
+class FakeAkinator:
+    """Akinator falso com a mesma interface da versão 2.0.2"""
+
+    def __init__(self, session=None, progression_step: float = 10.0):
+        self.session = session
+        self.progression_step = progression_step
+        self.language = None
+        self.theme = None
+        self.question = None
+        self.progression = 0.0
+        self.step = 0
+        self.win = False
+        self.finished = False
+        self.name_proposition = None
+        self.description_proposition = None
+        self.photo = None
+
+    def start_game(self, *, language: str = "en", child_mode: bool = False, theme: str = "c"):
+        self.language = language
+        self.theme = theme
+        self.question = "Seu personagem é real?"
+        self.progression = 0.0
+        self.step = 0
+        self.win = False
+
+    def answer(self, answer: str):
+        self.step += 1
+        self.progression = min(100.0, self.progression + self.progression_step)
+        self.question = f"Pergunta número {self.step + 1}?"
+        if self.progression >= 90:
+            self.win = True
+            self.name_proposition = "Personagem"
+            self.description_proposition = "Descrição do personagem"
+
+    def exclude(self):
+        # Descarta a proposta e volta a perguntar
+        self.win = False
+        self.step += 1
+        self.question = f"Pergunta número {self.step + 1}?"
+
+    def back(self):
+        self.step = max(0, self.step - 1)
+        self.progression = max(0.0, self.progression - self.progression_step)
+        self.question = f"Pergunta número {self.step + 1}?"
+        self.win = False
+
+
+async def fake_is_chat_locked(chat_id: int) -> bool:
+    return False
+
+
+async def fake_save_user_id(user_id: int) -> bool:
+    return True
+
+
+async def fake_get_chat_settings(chat_id: int):
+    return None
+
+
+def install_stubs():
+    """Substitui MongoDB e Akinator pelos objetos falsos nos módulos que os usam"""
+    import handlers.callbacks
+    import handlers.commands
+    import models.session
+    import utils.chat_settings
+
+    for module in (handlers.callbacks, handlers.commands):
+        module.is_chat_locked = fake_is_chat_locked
+        module.save_user_id = fake_save_user_id
+    utils.chat_settings.get_chat_settings = fake_get_chat_settings
+    models.session.Akinator = FakeAkinator
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": "Jogador"}
+
+
+def _chat(chat_id: int) -> dict:
+    if chat_id > 0:
+        return {"id": chat_id, "type": "private", "first_name": "Jogador"}
+    return {"id": chat_id, "type": "supergroup", "title": "Grupo"}
+
+
+def make_callback_update(bot: FakeBot, chat_id: int, user_id: int, data: str) -> Update:
+    """Cria um Update de botão inline"""
+    payload = {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": _user(user_id),
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": next(_message_ids),
+                "date": 0,
+                "chat": _chat(chat_id),
+                "text": "Pergunta",
+            },
+        },
+    }
+    return Update.de_json(payload, bot)
+
+
+def bind_callback_to_game(payload: dict, bot_id: int) -> dict:
+    """Aponta o botão de um update pronto (gravado ou gerado) para o jogo atual do jogador
+
+    Os ids de jogo são aleatórios, então os dos updates não batem com os do processo atual.
+    """
+    from utils.keyboard import game_callback_data, parse_callback_data
+    from utils.session_manager import sessions_by_bot
+
+    query = payload.get("callback_query")
+    if not query or "message" not in query:
+        return payload
+    chat_id = query["message"]["chat"]["id"]
+    session = sessions_by_bot.get(bot_id, {}).get(chat_id, {}).get(query["from"]["id"])
+    action, _ = parse_callback_data(query.get("data", ""))
+    query["data"] = game_callback_data(action, session.game_id if session else "0")
+    return payload
+
+
+def make_command_update(bot: FakeBot, chat_id: int, user_id: int, text: str) -> Update:
+    """Cria um Update de comando de texto"""
+    command = text.split()[0]
+    payload = {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_message_ids),
+            "date": 0,
+            "chat": _chat(chat_id),
+            "from": _user(user_id),
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        },
+    }
+    return Update.de_json(payload, bot)
+
+
+def _local_responses() -> dict:
+    """Respostas fixas da Bot API, já serializadas"""
+    import json
+
+    bot_user = {"id": 123456, "is_bot": True, "first_name": "Akinator", "username": "akinator_bench_bot"}
+    message = {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": -1001, "type": "supergroup", "title": "Grupo"},
+        "from": bot_user,
+        "text": "ok",
+    }
+    return {
+        "getMe": json.dumps({"ok": True, "result": bot_user}).encode(),
+        "sendMessage": json.dumps({"ok": True, "result": message}).encode(),
+        "sendPhoto": json.dumps({"ok": True, "result": message}).encode(),
+        "default": json.dumps({"ok": True, "result": True}).encode(),
+    }
+
+
+def make_local_request_class():
+    """Cria uma BotRequest que responde localmente, sem rede (serializa e decodifica de verdade)"""
+    from utils.telegram_request import BotRequest
+
+    responses = _local_responses()
+
+    class LocalRequest(BotRequest):
+        async def initialize(self):
+            pass
+
+        async def shutdown(self):
+            pass
+
+        async def do_request(self, url, method, request_data=None, read_timeout=None,
+                             write_timeout=None, connect_timeout=None, pool_timeout=None):
+            if request_data is not None:
+                # Força a serialização dos parâmetros, como no envio real
+                request_data.json_parameters
+            endpoint = url.rsplit("/", 1)[-1]
+            return 200, responses.get(endpoint, responses["default"])
+
+    return LocalRequest
@@ -0,0 +1,183 @@
+"""Telegram falso que envia updates para o webhook do bot
+
+Uso (na raiz do projeto):
+    python -m benchmarks.webhook_poster                          # sobe o bot localmente em modo webhook
+    python -m benchmarks.webhook_poster --updates 20000 --connections 40 --queue 500
+    python -m benchmarks.webhook_poster --url http://localhost:8443/webhook/123456 --secret XYZ
+
+Sem --url, a pilha completa do bot roda no mesmo processo (Bot API respondida
+localmente, MongoDB e Akinator substituídos pelos objetos falsos de benchmarks.stubs)
+atrás de um WebhookServer, e o envio só termina quando todos os updates aceitos
+foram processados. Como o Telegram, cada conexão envia um update por vez e
+reenvia os recusados com 503.
+
+    ack           tempo até o servidor responder (o que o Telegram espera)
+    processados   updates/s do primeiro envio até o último update processado
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from typing import List, Optional
+
+import httpx
+
+from benchmarks.replay import percentile
+
+TOKEN = "123456:webhook"
+SECRET = "segredo-do-benchmark"
+CHATS = 50
+
+
+def make_update(update_id: int) -> dict:
+    """Em cada chat, /jogar seguido de respostas aos botões"""
+    chat_id = -1000 - (update_id % CHATS)
+    user = {"id": 1000 + (update_id % CHATS), "is_bot": False, "first_name": "Jogador"}
+    chat = {"id": chat_id, "type": "supergroup", "title": "Grupo"}
+    if (update_id // CHATS) % 8 == 0:
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id, "date": int(time.time()), "chat": chat, "from": user,
+                "text": "/jogar", "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            },
+        }
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id), "from": user, "chat_instance": str(chat_id), "data": "yes",
+            "message": {"message_id": update_id, "date": 0, "chat": chat, "text": "Pergunta"},
+        },
+    }
+
+
+async def post_updates(url: str, secret: str, total: int, connections: int) -> dict:
+    """Envia `total` updates por `connections` conexões, um por vez em cada uma"""
+    ids = itertools.count(1)
+    acks: List[float] = []
+    retries = 0
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret, "Content-Type": "application/json"}
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+
+    async with httpx.AsyncClient(limits=limits, timeout=10.0) as client:
+        # Segredo errado precisa ser recusado
+        wrong = await client.post(url, content=b"{}", headers={**headers, "X-Telegram-Bot-Api-Secret-Token": "x"})
+
+        async def connection():
+            nonlocal retries
+            while True:
+                update_id = next(ids)
+                if update_id > total:
+                    return
+                body = json.dumps(make_update(update_id)).encode()
+                while True:
+                    started = time.perf_counter()
+                    response = await client.post(url, content=body, headers=headers)
+                    acks.append(time.perf_counter() - started)
+                    if response.status_code != 503:
+                        response.raise_for_status()
+                        break
+                    # Fila cheia: o Telegram espera e reenvia
+                    retries += 1
+                    await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(connection() for _ in range(connections)))
+        wall = time.perf_counter() - started
+
+    return {
+        "updates": total,
+        "wall": wall,
+        "acks_per_second": len(acks) / wall if wall else 0.0,
+        "ack_p50_ms": percentile(acks, 0.50) * 1000,
+        "ack_p99_ms": percentile(acks, 0.99) * 1000,
+        "ack_max_ms": max(acks, default=0.0) * 1000,
+        "retries": retries,
+        "wrong_secret_status": wrong.status_code,
+    }
+
+
+async def run_local(total: int, connections: int, queue_size: int, port: int) -> dict:
+    """Sobe o bot com o webhook em 127.0.0.1 e envia os updates até todos serem processados"""
+    from benchmarks.stubs import install_stubs, make_local_request_class
+    install_stubs()
+
+    import utils.tracing
+    from bot import build_application
+    from utils.bot_registry import bot_id_from_token, register_application
+    from utils.session_manager import clear_sessions
+    from utils.webhook import WebhookServer, webhook_path
+
+    utils.tracing.TRACE_ENABLED = False
+
+    app = build_application(TOKEN, request_class=make_local_request_class())
+    processed = 0
+    finished = asyncio.Event()
+    process_update = app.process_update
+
+    async def counted_process_update(update):
+        nonlocal processed
+        try:
+            await process_update(update)
+        finally:
+            processed += 1
+            if processed >= total:
+                finished.set()
+
+    app.process_update = counted_process_update
+
+    webhook = WebhookServer("127.0.0.1", port, SECRET, connections, queue_size)
+    queue = webhook.add_application(app)
+    await app.initialize()
+    register_application(app)
+    await webhook.start()
+    # Como no set_webhook, sem a chamada à Bot API
+    queue.start()
+    await app.start()
+
+    started = time.perf_counter()
+    url = f"http://127.0.0.1:{port}{webhook_path(bot_id_from_token(TOKEN))}"
+    result = await post_updates(url, SECRET, total, connections)
+    await finished.wait()
+    wall = time.perf_counter() - started
+
+    await webhook.stop()
+    await app.stop()
+    clear_sessions()
+    await app.shutdown()
+    return {**result, "processed_per_second": total / wall, **{f"queue_{k}": v for k, v in queue.snapshot().items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--connections", type=int, default=40, help="como o max_connections do setWebhook")
+    parser.add_argument("--queue", type=int, default=1000, help="tamanho da fila do webhook (modo local)")
+    parser.add_argument("--port", type=int, default=18443, help="porta do webhook (modo local)")
+    parser.add_argument("--url", help="webhook de um bot já rodando (sem isso, sobe o bot localmente)")
+    parser.add_argument("--secret", default=SECRET)
+    args = parser.parse_args()
+
+    # Silencia os logs dos handlers durante a medição
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    if args.url:
+        result = asyncio.run(post_updates(args.url, args.secret, args.updates, args.connections))
+    else:
+        result = asyncio.run(run_local(args.updates, args.connections, args.queue, args.port))
+
+    print(f"updates:            {result['updates']} em {result['wall']:.2f}s")
+    print(f"acks/s:             {result['acks_per_second']:.0f}")
+    print(f"ack (ms):           p50 {result['ack_p50_ms']:.2f} - p99 {result['ack_p99_ms']:.2f} "
+          f"- máx {result['ack_max_ms']:.2f}")
+    print(f"reenvios (503):     {result['retries']}")
+    print(f"segredo errado:     HTTP {result['wrong_secret_status']}")
+    if "processed_per_second" in result:
+        print(f"processados/s:      {result['processed_per_second']:.0f}")
+
+
+if __name__ == "__main__":
+    main()
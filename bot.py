@@ -1,83 +1,236 @@
 import os
+import signal
 import asyncio
 import logging
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ChatMemberHandler
 from telegram import Update
 
-from handlers.commands import start, play, cancel, lock, unlock, leave_group
+from handlers.commands import (
+    start, play, cancel, lock, unlock, language, theme, leave_group,
+    broadcast, broadcast_status, broadcast_stop, connections, profile
+)
 from handlers.callbacks import button_handler, guess_result_handler, continue_handler
-from utils.session_manager import cleanup_expired_sessions, set_bot_application
-from database.mongodb import connect_mongodb, close_mongodb
-
-# Configuração de logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+from handlers.membership import bot_membership
+from utils.session_manager import cleanup_expired_sessions
+from utils.endpoint_selector import endpoint_selector
+from utils.broadcast import resume_broadcast
+from utils.logging_setup import setup_logging, stop_logging
+from utils.application import BotApplication
+from utils.telegram_request import BotRequest
+from utils.bot_registry import register_application, bot_id_from_token
+from utils.update_processor import PriorityUpdateProcessor
+from utils.backlog import process_backlog
+from utils.performance import enable_performance_mode
+from utils.loop_monitor import loop_monitor
+from utils.health import start_health_server, add_health_routes
+from utils.webhook import WebhookServer, new_secret
+from utils.dead_chats import load_dead_chats
+from database.storage import connect_storage, close_storage
+from config import (
+    AKINATOR_MAX_WORKERS,
+    PERFORMANCE_MODE,
+    HEALTH_HOST,
+    HEALTH_PORT,
+    TELEGRAM_REQUEST,
+    TELEGRAM_UPDATES_REQUEST,
+    UPDATE_WORKERS,
+    UPDATE_MAX_PENDING,
+    UPDATE_MODE,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_QUEUE_SIZE,
 )
+
+# Configuração de logging (fila + thread de escrita, não bloqueia o event loop)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# Tipos de update que os handlers tratam (os outros nem são enviados pelo Telegram)
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY, Update.MY_CHAT_MEMBER]
 
-async def post_init(application: Application) -> None:
-    """Callback executado após inicialização do bot"""
-    # Conecta ao MongoDB
-    await connect_mongodb()
-    
-    # Define a referência do bot no session_manager
-    set_bot_application(application)
-    
-    # Inicia limpeza de sessões expiradas
-    asyncio.create_task(cleanup_expired_sessions())
-    logger.info("🧹 Sistema de limpeza de sessões iniciado")
 
+def get_tokens() -> List[str]:
+    """Lê os tokens: TELEGRAM_BOT_TOKENS (separados por vírgula) ou TELEGRAM_BOT_TOKEN"""
+    tokens = os.getenv("TELEGRAM_BOT_TOKENS") or os.getenv("TELEGRAM_BOT_TOKEN") or ""
+    return [token.strip() for token in tokens.split(",") if token.strip()]
 
-async def post_shutdown(application: Application) -> None:
-    """Callback executado ao desligar o bot"""
-    await close_mongodb()
 
+def use_webhook() -> bool:
+    """Webhook quando configurado (ou com WEBHOOK_URL no modo "auto"), senão long-polling"""
+    if UPDATE_MODE == "auto":
+        return bool(os.getenv("WEBHOOK_URL"))
+    return UPDATE_MODE == "webhook"
 
-def main():
-    """Função principal"""
-    token = os.getenv("TELEGRAM_BOT_TOKEN")
-    if not token:
-        raise ValueError("TELEGRAM_BOT_TOKEN não configurado!")
-    
-    # Cria aplicação
+
+def build_application(token: str, request_class=BotRequest) -> Application:
+    """Cria a aplicação de um token com todos os handlers"""
+    # Cria aplicação (com trace por update e spans nas chamadas da Bot API)
+    # O long-polling tem pool e timeouts próprios, separado dos envios
     app = (
         Application.builder()
+        .application_class(BotApplication)
         .token(token)
-        .post_init(post_init)
-        .post_shutdown(post_shutdown)
+        .request(request_class(name="envios", bot_id=bot_id_from_token(token), **TELEGRAM_REQUEST))
+        .get_updates_request(request_class(name="getUpdates", **TELEGRAM_UPDATES_REQUEST))
+        .concurrent_updates(PriorityUpdateProcessor(UPDATE_WORKERS, UPDATE_MAX_PENDING))
         .build()
     )
-    
+
     # Registra comandos
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("jogar", play))
     app.add_handler(CommandHandler("cancelar", cancel))
-    app.add_handler(CommandHandler("travar", lock))      # ← NOVO
+    app.add_handler(CommandHandler("travar", lock))
     app.add_handler(CommandHandler("destravar", unlock))
+    app.add_handler(CommandHandler("idioma", language))
+    app.add_handler(CommandHandler("tema", theme))
     app.add_handler(CommandHandler("sair", leave_group))
-    
+    app.add_handler(CommandHandler("broadcast", broadcast))
+    app.add_handler(CommandHandler("broadcast_status", broadcast_status))
+    app.add_handler(CommandHandler("broadcast_parar", broadcast_stop))
+    app.add_handler(CommandHandler("conexoes", connections))
+    app.add_handler(CommandHandler("perfil", profile))
+
     # Registra callbacks
     app.add_handler(CallbackQueryHandler(
-    button_handler,
-    pattern="^(yes|no|idk|probably|probably_not|back)$"
+        button_handler,
+        pattern=r"^(yes|no|idk|probably|probably_not|back)(:\w+)?$"
     ))
 
     app.add_handler(CallbackQueryHandler(
         guess_result_handler,
-        pattern="^(correct|wrong)$"
+        pattern=r"^(correct|wrong)(:\w+)?$"
     ))
 
     app.add_handler(CallbackQueryHandler(
         continue_handler,
-        pattern="^(continue|give_up)$"
+        pattern=r"^(continue|give_up)(:\w+)?$"
     ))
-    
-    # Inicia o bot
-    logger.info("🤖 Bot Akinator iniciado com sucesso!")
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+
+    # Bot adicionado, removido ou bloqueado
+    app.add_handler(ChatMemberHandler(bot_membership, ChatMemberHandler.MY_CHAT_MEMBER))
+
+    return app
+
+
+async def startup(apps: List[Application]) -> None:
+    """Inicializa os recursos compartilhados por todos os bots"""
+    # Threads das chamadas ao Akinator, compartilhadas por todos os bots
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=AKINATOR_MAX_WORKERS, thread_name_prefix="akinator")
+    )
+
+    # Registra os bots (o primeiro é o principal)
+    for app in apps:
+        register_application(app)
+
+    # Conecta ao armazenamento (MongoDB ou SQLite, um para todos os bots)
+    await connect_storage()
+
+    # Chats em que os bots foram removidos ou bloqueados (nenhuma chamada é feita para eles)
+    for app in apps:
+        await load_dead_chats(bot_id_from_token(app.bot.token))
+
+    # Inicia limpeza de sessões expiradas
+    asyncio.create_task(cleanup_expired_sessions())
+    logger.info("🧹 Sistema de limpeza de sessões iniciado")
+
+    # Inicia medição de latência dos servidores do Akinator
+    asyncio.create_task(endpoint_selector.run_probes())
+    logger.info("📡 Medição dos servidores do Akinator iniciada")
+
+    # Inicia o monitor de travamentos do event loop
+    loop_monitor.start()
+
+
+async def run_bots(tokens: List[str]) -> None:
+    """Roda uma aplicação por token no mesmo event loop"""
+    apps = [build_application(token) for token in tokens]
+    await startup(apps)
+
+    webhook: Optional[WebhookServer] = None
+    webhook_url = os.getenv("WEBHOOK_URL")
+    if use_webhook():
+        if not webhook_url:
+            raise ValueError("WEBHOOK_URL não configurado!")
+        webhook = WebhookServer(
+            WEBHOOK_HOST, WEBHOOK_PORT, os.getenv("WEBHOOK_SECRET") or new_secret(),
+            WEBHOOK_MAX_CONNECTIONS, WEBHOOK_QUEUE_SIZE
+        )
+        for app in apps:
+            webhook.add_application(app)
+
+    if webhook is not None and HEALTH_PORT == WEBHOOK_PORT:
+        # Uma porta só: /healthz e /readyz no mesmo servidor do webhook
+        add_health_routes(webhook.server)
+        health_server = None
+    else:
+        health_server = await start_health_server(HEALTH_HOST, HEALTH_PORT)
+    if webhook is not None:
+        await webhook.start()
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
+    started: List[Application] = []
+    try:
+        for app in apps:
+            await app.initialize()
+            # Sem webhook registrado para o getUpdates do backlog funcionar (os pendentes são mantidos)
+            await app.bot.delete_webhook()
+            # O backlog de quando o bot estava fora entra na fila antes dos updates novos
+            await process_backlog(app, ALLOWED_UPDATES)
+            if webhook is not None:
+                await webhook.set_webhook(app, webhook_url, ALLOWED_UPDATES)
+            else:
+                await app.updater.start_polling(allowed_updates=ALLOWED_UPDATES)
+            await app.start()
+            started.append(app)
+
+            # Retoma broadcast interrompido, se houver
+            await resume_broadcast(app.bot)
+            logger.info(f"🤖 Bot @{app.bot.username} iniciado com sucesso!")
+
+        await stop_event.wait()
+    finally:
+        if webhook is not None:
+            # O webhook continua registrado: o Telegram guarda os updates até o bot voltar
+            await webhook.stop()
+        for app in reversed(started):
+            if app.updater.running:
+                await app.updater.stop()
+            await app.stop()
+            await app.shutdown()
+        if health_server is not None:
+            await health_server.stop()
+        loop_monitor.stop()
+        await close_storage()
+
+
+def main():
+    """Função principal"""
+    tokens = get_tokens()
+    if not tokens:
+        raise ValueError("TELEGRAM_BOT_TOKEN não configurado!")
+
+    # uvloop/orjson opcionais (precisa ser antes de criar o event loop)
+    if PERFORMANCE_MODE:
+        enable_performance_mode()
+
+    logger.info(f"🤖 Iniciando {len(tokens)} bot(s) Akinator...")
+    try:
+        asyncio.run(run_bots(tokens))
+    finally:
+        stop_logging()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
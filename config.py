@@ -1,13 +1,224 @@
 """Configurações globais do bot"""
 
+import os
+
 # Tempo máximo de inatividade (em segundos)
 TIMEOUT = 120  # 2 minutos
 
 # Percentual de certeza para o Akinator fazer um palpite
 GUESS_THRESHOLD = 80
 
+# Quando mostrar o palpite proposto pelo Akinator (utils.guess_policy):
+# "adaptive" (progresso e trajetória), "threshold" (só a partir de GUESS_THRESHOLD) ou "server" (sempre)
+GUESS_POLICY = "adaptive"
+
+# Política adaptativa: abaixo deste progresso, só aceita a proposta se o progresso estabilizou
+GUESS_MIN_PROGRESSION = 40
+
+# Progresso estável: variou no máximo GUESS_PLATEAU_DELTA pontos nas últimas GUESS_PLATEAU_WINDOW respostas
+GUESS_PLATEAU_WINDOW = 3
+GUESS_PLATEAU_DELTA = 5.0
+
+# A partir desta pergunta, qualquer proposta é mostrada
+GUESS_MAX_QUESTIONS = 25
+
 # Idioma do Akinator (pt, en, es, fr, etc)
 AKINATOR_LANGUAGE = "pt"
 
 # Intervalo de limpeza de sessões expiradas (em segundos)
-CLEANUP_INTERVAL = 60  # 1 minuto
\ No newline at end of file
+CLEANUP_INTERVAL = 60  # 1 minuto
+
+# Jogos simultâneos em um mesmo chat (um por jogador)
+MAX_GAMES_PER_CHAT = 10
+
+# Tema padrão do Akinator (c = personagens, a = animais, o = objetos)
+AKINATOR_THEME = "c"
+
+# Servidores candidatos do Akinator por idioma
+# Se o idioma não estiver aqui, usa apenas https://<idioma>.akinator.com
+AKINATOR_ENDPOINTS = {
+    "pt": ["https://pt.akinator.com"],
+}
+
+# Intervalo entre medições de latência dos servidores (em segundos)
+ENDPOINT_PROBE_INTERVAL = 30
+
+# Taxa de erro máxima para um servidor ser considerado saudável (0 a 1)
+ENDPOINT_MAX_ERROR_RATE = 0.5
+
+# Nível de log
+LOG_LEVEL = "INFO"
+
+# Tamanho máximo da fila de logs (mensagens excedentes são descartadas)
+LOG_QUEUE_SIZE = 10000
+
+# Fração dos eventos de alto volume que são escritos no log (0 a 1)
+LOG_SAMPLING = {
+    "user_saved": 0.01,
+    "answer": 0.05,
+    "session_created": 0.2,
+    "session_deleted": 0.2,
+}
+
+# Rastreamento por update (traces em JSON lines); desligado por padrão
+TRACE_ENABLED = False
+
+# Arquivo local onde os traces são gravados (None para desativar)
+TRACE_EXPORT_FILE = "traces.jsonl"
+
+# Tamanho máximo do arquivo de traces (em bytes) e cópias antigas mantidas (traces.jsonl.1, ...)
+TRACE_EXPORT_MAX_BYTES = 50 * 1024 * 1024
+TRACE_EXPORT_BACKUPS = 3
+
+# URL de um coletor HTTP que recebe os traces em lotes (None para desativar)
+TRACE_COLLECTOR_URL = None
+
+# Fração dos updates rápidos que têm o trace gravado (0 a 1)
+TRACE_SAMPLE_RATE = 0.01
+
+# Updates mais lentos que isso (em segundos) sempre têm o trace gravado
+TRACE_SLOW_THRESHOLD = 2.0
+
+# Orçamento total de tempo para processar um update (em segundos)
+UPDATE_DEADLINE = 10.0
+
+# Fatia máxima do orçamento para cada dependência (em segundos)
+MONGO_TIMEOUT = 1.5
+AKINATOR_TIMEOUT = 8.0
+TELEGRAM_TIMEOUT = 5.0
+
+# Tempo mínimo garantido para avisar o jogador, mesmo com o orçamento esgotado
+TELEGRAM_MIN_TIMEOUT = 2.0
+
+# ID do dono do bot (comandos restritos: /sair, /broadcast)
+BOT_OWNER_ID = 1790032262
+
+# Envio em massa: mensagens por segundo (o limite do Telegram é ~30/s)
+BROADCAST_RATE = 25
+
+# Envio em massa: envios simultâneos
+BROADCAST_CONCURRENCY = 20
+
+# Envio em massa: IDs lidos do MongoDB por lote (o progresso é salvo a cada lote)
+BROADCAST_BATCH_SIZE = 500
+
+# Envio em massa: tentativas por usuário em erros temporários
+BROADCAST_MAX_RETRIES = 3
+
+# Sessões HTTP do Akinator mantidas para reutilização entre jogos
+AKINATOR_SCRAPER_POOL_SIZE = 64
+
+# Threads para as chamadas bloqueantes ao Akinator (compartilhadas por todos os bots)
+AKINATOR_MAX_WORKERS = 32
+
+# Updates processados ao mesmo tempo por bot (os de um mesmo jogador continuam em ordem)
+# Na fila, botões de jogos em andamento passam na frente de /jogar, que passa na frente do resto
+UPDATE_WORKERS = 32
+
+# Updates na fila de prioridade; os excedentes esperam em ordem de chegada
+UPDATE_MAX_PENDING = 5000
+
+# Backlog acumulado com o bot fora do ar: comandos mais antigos que isso (em segundos) são descartados
+BACKLOG_MAX_AGE = 600
+
+# Respostas simultâneas aos botões expirados do backlog
+BACKLOG_ANSWER_CONCURRENCY = 20
+
+# Modo de alto desempenho: event loop uvloop e JSON orjson na Bot API
+# (opcional: pip install uvloop orjson; sem eles, usa asyncio e json padrão)
+# Também pode ser ligado sem editar este arquivo, com PERFORMANCE_MODE=1 no ambiente
+PERFORMANCE_MODE = os.getenv("PERFORMANCE_MODE") == "1"
+
+# Conexões com a Bot API: chamadas normais (envios, edições, respostas de botões)
+# http2 depende do pacote h2 (pip install "httpx[http2]"); sem ele, usa HTTP/1.1
+TELEGRAM_REQUEST = {
+    "pool_size": 64,
+    "connect_timeout": 5.0,
+    "read_timeout": 5.0,
+    "write_timeout": 5.0,
+    "media_write_timeout": 20.0,
+    "pool_timeout": 3.0,
+    "http2": False,
+    "max_keepalive": 64,
+    "keepalive_expiry": 60.0,
+}
+
+# Conexões com a Bot API: long-polling do getUpdates (uma chamada por vez)
+TELEGRAM_UPDATES_REQUEST = {
+    "pool_size": 1,
+    "connect_timeout": 5.0,
+    "read_timeout": 5.0,
+    "write_timeout": 5.0,
+    "media_write_timeout": 5.0,
+    "pool_timeout": 1.0,
+    "http2": False,
+    "max_keepalive": 1,
+    "keepalive_expiry": 300.0,
+}
+
+# Espera por conexão livre acima disso (em segundos) gera aviso no log
+TELEGRAM_POOL_WAIT_WARNING = 0.5
+
+# Gravação do tráfego (updates anonimizados + respostas do Akinator) para replay
+# None desativa; ex.: "traffic.jsonl" (replay: python -m benchmarks.replay traffic.jsonl)
+TRAFFIC_RECORD_FILE = None
+
+# Armazenamento: "auto" (MongoDB se MONGO_URL existir, senão SQLite), "mongo" ou "sqlite"
+STORAGE_BACKEND = "auto"
+
+# Arquivo do SQLite (backend sqlite ou cache local)
+SQLITE_PATH = "akinator.db"
+
+# Usa o SQLite como cache de leitura na frente do MongoDB (apenas com uma instância do bot)
+STORAGE_LOCAL_CACHE = False
+
+# Driver do MongoDB: "pymongo" (cliente asyncio nativo) ou "motor" (pymongo em threads)
+MONGO_DRIVER = "pymongo"
+
+# Pool de conexões do MongoDB: máximo, mínimo mantido aberto e tempo ocioso (em segundos)
+MONGO_MAX_POOL_SIZE = 50
+MONGO_MIN_POOL_SIZE = 2
+MONGO_MAX_IDLE_TIME = 300
+
+# Espera máxima por uma conexão livre do pool e por uma resposta do servidor (em segundos)
+MONGO_POOL_TIMEOUT = 1.0
+MONGO_SOCKET_TIMEOUT = 10.0
+
+# Compressão do protocolo, em ordem de preferência (None desativa); ex.: "zstd,snappy,zlib"
+# zstd e snappy dependem dos pacotes zstandard e python-snappy; os ausentes são ignorados
+MONGO_COMPRESSORS = None
+
+# Profiler (/perfil): intervalo entre amostras e duração (em segundos)
+PROFILER_INTERVAL = 0.01
+PROFILER_DEFAULT_SECONDS = 10
+PROFILER_MAX_SECONDS = 60
+
+# Pasta onde os perfis também são salvos (None = só envia pelo Telegram)
+PROFILER_OUTPUT_DIR = None
+
+# Monitor do event loop: intervalo de medição e atraso considerado travamento (em segundos)
+LOOP_MONITOR_INTERVAL = 0.1
+LOOP_STALL_THRESHOLD = 0.5
+
+# Servidor de health check (/healthz e /readyz); porta None desativa
+HEALTH_HOST = "0.0.0.0"
+HEALTH_PORT = 8080
+
+# Prontidão: atraso máximo do loop e tempo máximo de cada verificação (em segundos)
+READY_MAX_LOOP_LAG = 1.0
+READY_CHECK_TIMEOUT = 1.0
+
+# Recebimento dos updates: "auto" (webhook se WEBHOOK_URL existir, senão polling), "polling" ou "webhook"
+UPDATE_MODE = "auto"
+
+# Webhook: endereço e porta locais do servidor que recebe os updates do Telegram
+# (a URL pública vem de WEBHOOK_URL e o segredo, de WEBHOOK_SECRET; sem segredo, um aleatório é gerado)
+WEBHOOK_HOST = "0.0.0.0"
+WEBHOOK_PORT = 8443
+
+# Conexões simultâneas que o Telegram abre por bot (1 a 100) e aceitas pelo servidor
+WEBHOOK_MAX_CONNECTIONS = 40
+
+# Updates recebidos e ainda não entregues à Application, por bot; acima disso o
+# Telegram recebe 503 e reenvia depois
+WEBHOOK_QUEUE_SIZE = 1000
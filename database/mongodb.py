@@ -1,127 +1,197 @@
-"""Conexão e operações com MongoDB"""
+"""Backend MongoDB do armazenamento"""
 
-import os
+import importlib.util
+import inspect
 import logging
-from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Optional
+from typing import AsyncIterator, Optional
+from database.storage import Storage
+from utils.bot_registry import primary_bot_id
+from config import (
+    MONGO_TIMEOUT,
+    MONGO_DRIVER,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME,
+    MONGO_POOL_TIMEOUT,
+    MONGO_SOCKET_TIMEOUT,
+    MONGO_COMPRESSORS,
+)
 
 logger = logging.getLogger(__name__)
 
-# Cliente MongoDB
-_mongo_client: Optional[AsyncIOMotorClient] = None
-_db = None
-_users_collection = None
-_locked_chats_collection = None
-
-
-async def connect_mongodb():
-    """Conecta ao MongoDB"""
-    global _mongo_client, _db, _users_collection, _locked_chats_collection
-    
-    mongo_uri = os.getenv("MONGO_URL")
-    if not mongo_uri:
-        logger.warning("⚠️ MONGO_URL não configurado! IDs não serão salvos.")
-        return False
-    
-    try:
-        _mongo_client = AsyncIOMotorClient(mongo_uri)
-        _db = _mongo_client.akinator_bot
-        _users_collection = _db.users
-        _locked_chats_collection = _db.locked_chats
-        
-        # Cria índices únicos
-        await _users_collection.create_index("user_id", unique=True)
-        await _locked_chats_collection.create_index("chat_id", unique=True)
-        
-        logger.info("✅ MongoDB conectado com sucesso!")
-        return True
-    except Exception as e:
-        logger.error(f"❌ Erro ao conectar MongoDB: {e}")
-        return False
-
-
-async def save_user_id(user_id: int) -> bool:
-    """Salva o ID do usuário no MongoDB (apenas se não existir)"""
-    if _users_collection is None:
-        return False
-    
-    try:
-        await _users_collection.update_one(
-            {"user_id": user_id},
-            {"$set": {"user_id": user_id}},
-            upsert=True
+# Pacote opcional exigido por cada compressor (zlib vem com o Python)
+_COMPRESSOR_PACKAGES = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+
+
+def _client_class(driver: str):
+    """Classe do cliente assíncrono do driver escolhido"""
+    if driver == "motor":
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient
+    if driver == "pymongo":
+        from pymongo import AsyncMongoClient
+        return AsyncMongoClient
+    raise ValueError(f"driver do MongoDB desconhecido: {driver!r}")
+
+
+def _compressors(names: Optional[str]) -> Optional[str]:
+    """Mantém só os compressores disponíveis, na ordem configurada"""
+    if not names:
+        return None
+    available = []
+    for name in (part.strip() for part in names.split(",")):
+        package = _COMPRESSOR_PACKAGES.get(name, name)
+        if package is not None and importlib.util.find_spec(package) is None:
+            logger.warning(f"⚠️ Compressão {name} indisponível (pacote {package} não instalado)")
+            continue
+        available.append(name)
+    return ",".join(available) or None
+
+
+def client_options(timeout: float = MONGO_TIMEOUT) -> dict:
+    """Parâmetros do pool, timeouts e compressão comuns aos dois drivers"""
+    timeout_ms = int(timeout * 1000)
+    options = {
+        "serverSelectionTimeoutMS": timeout_ms,
+        "connectTimeoutMS": timeout_ms,
+        "socketTimeoutMS": int(MONGO_SOCKET_TIMEOUT * 1000),
+        "waitQueueTimeoutMS": int(MONGO_POOL_TIMEOUT * 1000),
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": int(MONGO_MAX_IDLE_TIME * 1000),
+    }
+    compressors = _compressors(MONGO_COMPRESSORS)
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+def _chat_key(bot_id: Optional[int], chat_id: int) -> dict:
+    """Chave de um chat nos documentos de trava/configuração (cada bot tem os seus)"""
+    return {"bot_id": bot_id, "chat_id": chat_id}
+
+
+class MongoStorage(Storage):
+    """Dados em MongoDB: coleções users, locked_chats e broadcasts"""
+
+    name = "mongo"
+
+    def __init__(self, uri: Optional[str], database: str = "akinator_bot", driver: str = MONGO_DRIVER):
+        self.uri = uri
+        self.database = database
+        self.driver = driver
+        self.client = None
+        self.users = None
+        self.locked_chats = None
+        self.broadcasts = None
+
+    async def _migrate_legacy_data(self):
+        """Atribui ao bot principal os dados salvos antes do suporte a vários tokens"""
+        bot_id = primary_bot_id()
+        if bot_id is None:
+            return
+
+        await self.locked_chats.update_many({"bot_id": {"$exists": False}}, {"$set": {"bot_id": bot_id}})
+        await self.users.update_many({"bots": {"$exists": False}}, {"$set": {"bots": [bot_id]}})
+        await self.broadcasts.update_many({"bot_id": {"$exists": False}}, {"$set": {"bot_id": bot_id}})
+
+        # O índice único antigo (só chat_id) impediria o mesmo chat em dois bots
+        indexes = await self.locked_chats.index_information()
+        if "chat_id_1" in indexes:
+            await self.locked_chats.drop_index("chat_id_1")
+
+    async def connect(self) -> bool:
+        """Conecta ao MongoDB"""
+        if not self.uri:
+            logger.warning("⚠️ MONGO_URL não configurado! IDs não serão salvos.")
+            return False
+
+        try:
+            self.client = _client_class(self.driver)(self.uri, **client_options())
+            db = self.client[self.database]
+            self.users = db.users
+            self.locked_chats = db.locked_chats
+            self.broadcasts = db.broadcasts
+
+            await self._migrate_legacy_data()
+
+            # Cria índices únicos
+            await self.users.create_index("user_id", unique=True)
+            await self.users.create_index([("bots", 1), ("user_id", 1)])
+            await self.locked_chats.create_index([("bot_id", 1), ("chat_id", 1)], unique=True)
+
+            logger.info(f"✅ MongoDB conectado com sucesso! (driver {self.driver})")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Erro ao conectar MongoDB: {e}")
+            return False
+
+    async def close(self):
+        """Fecha a conexão com MongoDB"""
+        if self.client is not None:
+            # No pymongo assíncrono close() é uma corrotina; no motor, não
+            result = self.client.close()
+            if inspect.isawaitable(result):
+                await result
+            self.client = None
+            logger.info("🔌 MongoDB desconectado")
+
+    async def ping(self):
+        await self.client.admin.command("ping")
+
+    async def save_user(self, bot_id, user_id):
+        update = {"$set": {"user_id": user_id}}
+        if bot_id is not None:
+            # Registra por quais bots o usuário pode ser contatado
+            update["$addToSet"] = {"bots": bot_id}
+        await self.users.update_one({"user_id": user_id}, update, upsert=True)
+
+    async def has_user(self, bot_id, user_id):
+        return await self.users.find_one({"user_id": user_id, "bots": bot_id}, {"_id": 1}) is not None
+
+    async def count_users(self):
+        return await self.users.count_documents({})
+
+    async def get_chat(self, bot_id, chat_id):
+        return await self.locked_chats.find_one(
+            _chat_key(bot_id, chat_id),
+            {"_id": 0, "locked": 1, "language": 1, "theme": 1}
         )
-        logger.info(f"💾 User ID salvo: {user_id}")
-        return True
-    except Exception as e:
-        if "duplicate key error" not in str(e).lower():
-            logger.error(f"❌ Erro ao salvar user_id {user_id}: {e}")
-        return False
-
-
-async def get_total_users() -> int:
-    """Retorna o total de usuários únicos"""
-    if _users_collection is None:
-        return 0
-    
-    try:
-        count = await _users_collection.count_documents({})
-        return count
-    except Exception as e:
-        logger.error(f"❌ Erro ao contar usuários: {e}")
-        return 0
-
-
-async def lock_chat(chat_id: int) -> bool:
-    """Trava um chat (bloqueia o bot)"""
-    if _locked_chats_collection is None:
-        return False
-    
-    try:
-        await _locked_chats_collection.update_one(
-            {"chat_id": chat_id},
-            {"$set": {"chat_id": chat_id, "locked": True}},
-            upsert=True
+
+    async def update_chat(self, bot_id, chat_id, fields):
+        update = {"$set": {**_chat_key(bot_id, chat_id), **fields}}
+        if "locked" not in fields:
+            update["$setOnInsert"] = {"locked": False}
+        await self.locked_chats.update_one(_chat_key(bot_id, chat_id), update, upsert=True)
+
+    async def iter_user_ids(self, bot_id, after_user_id, batch_size) -> AsyncIterator[int]:
+        query = {"bots": bot_id}
+        if after_user_id is not None:
+            query["user_id"] = {"$gt": after_user_id}
+        cursor = (
+            self.users.find(query, {"_id": 0, "user_id": 1})
+            .sort("user_id", 1)
+            .batch_size(batch_size)
         )
-        logger.info(f"🔒 Chat travado: {chat_id}")
-        return True
-    except Exception as e:
-        logger.error(f"❌ Erro ao travar chat {chat_id}: {e}")
-        return False
-
-
-async def unlock_chat(chat_id: int) -> bool:
-    """Destrava um chat (libera o bot)"""
-    if _locked_chats_collection is None:
-        return False
-    
-    try:
-        result = await _locked_chats_collection.delete_one({"chat_id": chat_id})
-        if result.deleted_count > 0:
-            logger.info(f"🔓 Chat destravado: {chat_id}")
-            return True
-        return False
-    except Exception as e:
-        logger.error(f"❌ Erro ao destravar chat {chat_id}: {e}")
-        return False
-
-
-async def is_chat_locked(chat_id: int) -> bool:
-    """Verifica se um chat está travado"""
-    if _locked_chats_collection is None:
-        return False
-    
-    try:
-        doc = await _locked_chats_collection.find_one({"chat_id": chat_id})
-        return doc is not None
-    except Exception as e:
-        logger.error(f"❌ Erro ao verificar chat {chat_id}: {e}")
-        return False
-
-
-async def close_mongodb():
-    """Fecha a conexão com MongoDB"""
-    global _mongo_client
-    if _mongo_client is not None:
-        _mongo_client.close()
-        logger.info("🔌 MongoDB desconectado")
\ No newline at end of file
+        async for doc in cursor:
+            yield doc["user_id"]
+
+    async def count_users_after(self, bot_id, after_user_id):
+        query = {"bots": bot_id}
+        if after_user_id is not None:
+            query["user_id"] = {"$gt": after_user_id}
+        return await self.users.count_documents(query)
+
+    async def create_broadcast(self, doc):
+        result = await self.broadcasts.insert_one(doc)
+        return result.inserted_id
+
+    async def update_broadcast(self, broadcast_id, fields):
+        await self.broadcasts.update_one({"_id": broadcast_id}, {"$set": fields})
+
+    async def get_running_broadcast(self, bot_id):
+        return await self.broadcasts.find_one({"bot_id": bot_id, "status": "running"})
+
+    async def dead_chat_ids(self, bot_id):
+        cursor = self.locked_chats.find({"bot_id": bot_id, "dead": True}, {"_id": 0, "chat_id": 1})
+        return [doc["chat_id"] async for doc in cursor]
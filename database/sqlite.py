@@ -0,0 +1,207 @@
+"""Backend SQLite do armazenamento (arquivo local em modo WAL)"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Optional
+from database.storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# bot_id ausente (antes do registro dos bots) é gravado como 0: NULL não entra na chave primária
+_NO_BOT = 0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    bot_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    PRIMARY KEY (bot_id, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS chats (
+    bot_id INTEGER NOT NULL,
+    chat_id INTEGER NOT NULL,
+    locked INTEGER NOT NULL DEFAULT 0,
+    language TEXT,
+    theme TEXT,
+    dead INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bot_id, chat_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bot_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS broadcasts_status ON broadcasts (bot_id, status);
+"""
+
+# Campos de chat que podem ser atualizados (os booleanos são gravados como 0/1)
+_CHAT_FIELDS = ("locked", "language", "theme", "dead")
+_BOOL_FIELDS = ("locked", "dead")
+
+# Colunas acrescentadas depois da primeira versão do esquema
+_ADDED_COLUMNS = {"chats": [("dead", "INTEGER NOT NULL DEFAULT 0")]}
+
+
+def _bot(bot_id: Optional[int]) -> int:
+    return _NO_BOT if bot_id is None else bot_id
+
+
+class SQLiteStorage(Storage):
+    """Dados em um arquivo SQLite, acessado por uma única thread dedicada"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        # Uma thread: a conexão não é compartilhada e as escritas ficam em ordem
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        # WAL: leituras não esperam escritas; NORMAL: sem fsync a cada commit (seguro em WAL)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        for table, columns in _ADDED_COLUMNS.items():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for name, definition in columns:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+        self._conn = conn
+
+    async def connect(self) -> bool:
+        try:
+            await self._run(self._open)
+            logger.info(f"✅ SQLite aberto: {self.path}")
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"❌ Erro ao abrir SQLite {self.path}: {e}")
+            return False
+
+    async def close(self):
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+    def _write(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._conn:
+            return self._conn.execute(sql, params)
+
+    async def save_user(self, bot_id, user_id):
+        await self._run(
+            self._write, "INSERT OR IGNORE INTO users (bot_id, user_id) VALUES (?, ?)", (_bot(bot_id), user_id)
+        )
+
+    def _has_user(self, bot_id: int, user_id: int) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM users WHERE bot_id = ? AND user_id = ?", (bot_id, user_id)
+        ).fetchone()
+        return row is not None
+
+    async def has_user(self, bot_id, user_id):
+        return await self._run(self._has_user, _bot(bot_id), user_id)
+
+    def _scalar(self, sql: str, params=()):
+        return self._conn.execute(sql, params).fetchone()[0]
+
+    async def ping(self):
+        await self._run(self._scalar, "SELECT 1")
+
+    async def count_users(self):
+        return await self._run(self._scalar, "SELECT COUNT(DISTINCT user_id) FROM users")
+
+    def _get_chat(self, bot_id: int, chat_id: int) -> Optional[dict]:
+        row = self._conn.execute(
+            "SELECT locked, language, theme FROM chats WHERE bot_id = ? AND chat_id = ?", (bot_id, chat_id)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"locked": bool(row[0]), "language": row[1], "theme": row[2]}
+
+    async def get_chat(self, bot_id, chat_id):
+        return await self._run(self._get_chat, _bot(bot_id), chat_id)
+
+    async def update_chat(self, bot_id, chat_id, fields):
+        names = [name for name in _CHAT_FIELDS if name in fields]
+        values = [int(fields[name]) if name in _BOOL_FIELDS else fields[name] for name in names]
+        columns = ", ".join(["bot_id", "chat_id", *names])
+        placeholders = ", ".join("?" * (len(names) + 2))
+        updates = ", ".join(f"{name} = excluded.{name}" for name in names) or "locked = locked"
+        await self._run(
+            self._write,
+            f"INSERT INTO chats ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT (bot_id, chat_id) DO UPDATE SET {updates}",
+            (_bot(bot_id), chat_id, *values)
+        )
+
+    def _user_ids_after(self, bot_id: int, after_user_id: Optional[int], limit: int) -> list:
+        rows = self._conn.execute(
+            "SELECT user_id FROM users WHERE bot_id = ? AND user_id > ? ORDER BY user_id LIMIT ?",
+            (bot_id, after_user_id if after_user_id is not None else -(2 ** 63), limit)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    async def iter_user_ids(self, bot_id, after_user_id, batch_size) -> AsyncIterator[int]:
+        while True:
+            batch = await self._run(self._user_ids_after, _bot(bot_id), after_user_id, batch_size)
+            for user_id in batch:
+                yield user_id
+            if len(batch) < batch_size:
+                return
+            after_user_id = batch[-1]
+
+    async def count_users_after(self, bot_id, after_user_id):
+        return await self._run(
+            self._scalar,
+            "SELECT COUNT(*) FROM users WHERE bot_id = ? AND user_id > ?",
+            (_bot(bot_id), after_user_id if after_user_id is not None else -(2 ** 63))
+        )
+
+    async def create_broadcast(self, doc):
+        cursor = await self._run(
+            self._write,
+            "INSERT INTO broadcasts (bot_id, status, doc) VALUES (?, ?, ?)",
+            (_bot(doc.get("bot_id")), doc["status"], json.dumps(doc, default=str))
+        )
+        return cursor.lastrowid
+
+    def _update_broadcast(self, broadcast_id: int, fields: dict):
+        with self._conn:
+            row = self._conn.execute("SELECT doc FROM broadcasts WHERE id = ?", (broadcast_id,)).fetchone()
+            if row is None:
+                return
+            doc = {**json.loads(row[0]), **fields}
+            self._conn.execute(
+                "UPDATE broadcasts SET status = ?, doc = ? WHERE id = ?",
+                (doc["status"], json.dumps(doc, default=str), broadcast_id)
+            )
+
+    async def update_broadcast(self, broadcast_id, fields):
+        await self._run(self._update_broadcast, broadcast_id, fields)
+
+    def _running_broadcast(self, bot_id: int) -> Optional[dict]:
+        row = self._conn.execute(
+            "SELECT id, doc FROM broadcasts WHERE bot_id = ? AND status = 'running' ORDER BY id DESC LIMIT 1",
+            (bot_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {**json.loads(row[1]), "_id": row[0]}
+
+    async def get_running_broadcast(self, bot_id):
+        return await self._run(self._running_broadcast, _bot(bot_id))
+
+    def _dead_chat_ids(self, bot_id: int) -> list:
+        rows = self._conn.execute("SELECT chat_id FROM chats WHERE bot_id = ? AND dead = 1", (bot_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    async def dead_chat_ids(self, bot_id):
+        return await self._run(self._dead_chat_ids, _bot(bot_id))
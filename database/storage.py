@@ -0,0 +1,419 @@
+"""Armazenamento do bot: interface comum dos backends e funções usadas pelos handlers
+
+Backends:
+    mongo   MongoDB (várias instâncias do bot podem compartilhar os dados)
+    sqlite  arquivo local em modo WAL (uma única instância)
+
+Com STORAGE_LOCAL_CACHE, o SQLite funciona como cache de leitura na frente do MongoDB.
+"""
+
+import os
+import logging
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from utils.tracing import traced
+from utils.deadline import with_deadline, DeadlineExceeded
+from utils.bot_registry import current_bot_id
+from config import MONGO_TIMEOUT, STORAGE_BACKEND, STORAGE_LOCAL_CACHE, SQLITE_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class Storage(ABC):
+    """Operações que todo backend implementa (erros são tratados pelas funções do módulo)"""
+
+    name = "base"
+
+    @abstractmethod
+    async def connect(self) -> bool:
+        ...
+
+    async def close(self):
+        pass
+
+    async def ping(self):
+        """Confirma que o backend responde (levanta exceção se não)"""
+
+    @abstractmethod
+    async def save_user(self, bot_id: Optional[int], user_id: int):
+        """Salva o usuário e registra o bot pelo qual ele pode ser contatado"""
+
+    @abstractmethod
+    async def has_user(self, bot_id: Optional[int], user_id: int) -> bool:
+        ...
+
+    @abstractmethod
+    async def count_users(self) -> int:
+        """Total de usuários únicos (de todos os bots)"""
+
+    @abstractmethod
+    async def get_chat(self, bot_id: Optional[int], chat_id: int) -> Optional[dict]:
+        """Trava e configurações de um chat: {"locked", "language", "theme"}"""
+
+    @abstractmethod
+    async def update_chat(self, bot_id: Optional[int], chat_id: int, fields: dict):
+        """Cria ou atualiza campos de um chat (um chat novo começa destravado)"""
+
+    @abstractmethod
+    def iter_user_ids(self, bot_id: Optional[int], after_user_id: Optional[int],
+                      batch_size: int) -> AsyncIterator[int]:
+        ...
+
+    @abstractmethod
+    async def count_users_after(self, bot_id: Optional[int], after_user_id: Optional[int]) -> int:
+        ...
+
+    @abstractmethod
+    async def create_broadcast(self, doc: dict):
+        ...
+
+    @abstractmethod
+    async def update_broadcast(self, broadcast_id, fields: dict):
+        ...
+
+    @abstractmethod
+    async def get_running_broadcast(self, bot_id: Optional[int]) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def dead_chat_ids(self, bot_id: Optional[int]) -> List[int]:
+        """Chats marcados como inativos (update_chat com {"dead": True})"""
+
+
+class CachedStorage(Storage):
+    """Cache de leitura local (SQLite) na frente de outro backend
+
+    Usuários já salvos e chats já consultados são respondidos pelo cache; as escritas
+    vão para os dois. Só é consistente com uma instância do bot escrevendo nos dados.
+    """
+
+    def __init__(self, primary: Storage, cache: Storage):
+        self.primary = primary
+        self.cache = cache
+        self.name = f"{cache.name}+{primary.name}"
+
+    async def connect(self) -> bool:
+        if not await self.primary.connect():
+            return False
+        return await self.cache.connect()
+
+    async def close(self):
+        await self.cache.close()
+        await self.primary.close()
+
+    async def ping(self):
+        await self.primary.ping()
+
+    async def save_user(self, bot_id, user_id):
+        if await self.cache.has_user(bot_id, user_id):
+            return
+        await self.primary.save_user(bot_id, user_id)
+        await self.cache.save_user(bot_id, user_id)
+
+    async def has_user(self, bot_id, user_id):
+        return await self.cache.has_user(bot_id, user_id) or await self.primary.has_user(bot_id, user_id)
+
+    async def count_users(self):
+        return await self.primary.count_users()
+
+    async def get_chat(self, bot_id, chat_id):
+        doc = await self.cache.get_chat(bot_id, chat_id)
+        if doc is not None:
+            return doc
+        doc = await self.primary.get_chat(bot_id, chat_id)
+        # Guarda também a ausência (chat destravado, sem configurações)
+        await self.cache.update_chat(bot_id, chat_id, doc or {"locked": False})
+        return doc
+
+    async def update_chat(self, bot_id, chat_id, fields):
+        await self.primary.update_chat(bot_id, chat_id, fields)
+        await self.cache.update_chat(bot_id, chat_id, fields)
+
+    def iter_user_ids(self, bot_id, after_user_id, batch_size):
+        return self.primary.iter_user_ids(bot_id, after_user_id, batch_size)
+
+    async def count_users_after(self, bot_id, after_user_id):
+        return await self.primary.count_users_after(bot_id, after_user_id)
+
+    async def create_broadcast(self, doc):
+        return await self.primary.create_broadcast(doc)
+
+    async def update_broadcast(self, broadcast_id, fields):
+        await self.primary.update_broadcast(broadcast_id, fields)
+
+    async def get_running_broadcast(self, bot_id):
+        return await self.primary.get_running_broadcast(bot_id)
+
+    async def dead_chat_ids(self, bot_id):
+        return await self.primary.dead_chat_ids(bot_id)
+
+
+# Backend em uso (None = nenhum disponível)
+_storage: Optional[Storage] = None
+
+# Último estado conhecido de trava por chat, usado quando o backend não responde a tempo
+# Estrutura: {(bot_id, chat_id): bool}
+_locked_cache: Dict[Tuple[Optional[int], int], bool] = {}
+
+
+def create_storage(backend: str = STORAGE_BACKEND, local_cache: bool = STORAGE_LOCAL_CACHE) -> Storage:
+    """Cria o backend configurado ("auto" usa MongoDB se MONGO_URL existir, senão SQLite)"""
+    from database.mongodb import MongoStorage
+    from database.sqlite import SQLiteStorage
+
+    if backend == "auto":
+        backend = "mongo" if os.getenv("MONGO_URL") else "sqlite"
+    if backend == "sqlite":
+        return SQLiteStorage(SQLITE_PATH)
+    if backend != "mongo":
+        raise ValueError(f"STORAGE_BACKEND inválido: {backend}")
+
+    storage = MongoStorage(os.getenv("MONGO_URL"))
+    if local_cache:
+        storage = CachedStorage(storage, SQLiteStorage(SQLITE_PATH))
+    return storage
+
+
+async def connect_storage(storage: Optional[Storage] = None) -> bool:
+    """Conecta ao backend de armazenamento"""
+    global _storage
+    storage = storage or create_storage()
+    try:
+        if not await storage.connect():
+            return False
+    except Exception as e:
+        logger.error(f"❌ Erro ao conectar ao armazenamento ({storage.name}): {e}")
+        return False
+    _storage = storage
+    logger.info(f"✅ Armazenamento pronto: {storage.name}")
+    return True
+
+
+async def close_storage():
+    """Fecha a conexão com o armazenamento"""
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
+
+
+def get_storage() -> Optional[Storage]:
+    return _storage
+
+
+@traced("storage.save_user_id")
+async def save_user_id(user_id: int) -> bool:
+    """Salva o ID do usuário (apenas se não existir)"""
+    if _storage is None:
+        return False
+
+    try:
+        await with_deadline(_storage.save_user(current_bot_id(), user_id), MONGO_TIMEOUT)
+        logger.info("💾 User ID salvo: %s", user_id, extra={"event": "user_saved", "user_id": user_id})
+        return True
+    except DeadlineExceeded:
+        # Sem tempo: pula o salvamento, o usuário será salvo na próxima interação
+        logger.warning("⏳ Salvamento do user_id %s pulado (timeout)", user_id, extra={"user_id": user_id})
+        return False
+    except Exception as e:
+        if "duplicate key error" not in str(e).lower():
+            logger.error(f"❌ Erro ao salvar user_id {user_id}: {e}")
+        return False
+
+
+@traced("storage.get_total_users")
+async def get_total_users() -> int:
+    """Retorna o total de usuários únicos (de todos os bots)"""
+    if _storage is None:
+        return 0
+
+    try:
+        return await _storage.count_users()
+    except Exception as e:
+        logger.error(f"❌ Erro ao contar usuários: {e}")
+        return 0
+
+
+@traced("storage.lock_chat")
+async def lock_chat(chat_id: int) -> bool:
+    """Trava um chat (bloqueia o bot)"""
+    if _storage is None:
+        return False
+
+    try:
+        await with_deadline(_storage.update_chat(current_bot_id(), chat_id, {"locked": True}), MONGO_TIMEOUT)
+        _locked_cache[(current_bot_id(), chat_id)] = True
+        logger.info(f"🔒 Chat travado: {chat_id}")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Erro ao travar chat {chat_id}: {e}")
+        return False
+
+
+async def _unlock(bot_id: Optional[int], chat_id: int) -> bool:
+    doc = await _storage.get_chat(bot_id, chat_id)
+    if not doc or not doc.get("locked"):
+        return False
+    # Mantém o registro para preservar as configurações do chat
+    await _storage.update_chat(bot_id, chat_id, {"locked": False})
+    return True
+
+
+@traced("storage.unlock_chat")
+async def unlock_chat(chat_id: int) -> bool:
+    """Destrava um chat (libera o bot)"""
+    if _storage is None:
+        return False
+
+    try:
+        unlocked = await with_deadline(_unlock(current_bot_id(), chat_id), MONGO_TIMEOUT)
+        _locked_cache[(current_bot_id(), chat_id)] = False
+        if unlocked:
+            logger.info(f"🔓 Chat destravado: {chat_id}")
+        return unlocked
+    except Exception as e:
+        logger.error(f"❌ Erro ao destravar chat {chat_id}: {e}")
+        return False
+
+
+@traced("storage.is_chat_locked")
+async def is_chat_locked(chat_id: int) -> bool:
+    """Verifica se um chat está travado"""
+    if _storage is None:
+        return False
+
+    try:
+        doc = await with_deadline(_storage.get_chat(current_bot_id(), chat_id), MONGO_TIMEOUT)
+        locked = bool(doc and doc.get("locked"))
+        _locked_cache[(current_bot_id(), chat_id)] = locked
+        return locked
+    except DeadlineExceeded:
+        # Sem tempo: usa o último estado conhecido (destravado se nunca consultado)
+        logger.warning("⏳ Verificação de trava do chat %s usando cache (timeout)", chat_id, extra={"chat_id": chat_id})
+        return _locked_cache.get((current_bot_id(), chat_id), False)
+    except Exception as e:
+        logger.error(f"❌ Erro ao verificar chat {chat_id}: {e}")
+        return _locked_cache.get((current_bot_id(), chat_id), False)
+
+
+@traced("storage.get_chat_settings")
+async def get_chat_settings(chat_id: int) -> Optional[dict]:
+    """Retorna as configurações salvas de um chat (idioma e tema)"""
+    if _storage is None:
+        return None
+
+    try:
+        doc = await with_deadline(_storage.get_chat(current_bot_id(), chat_id), MONGO_TIMEOUT)
+        if doc is None:
+            return None
+        return {"language": doc.get("language"), "theme": doc.get("theme")}
+    except Exception as e:
+        logger.error(f"❌ Erro ao buscar configurações do chat {chat_id}: {e}")
+        return None
+
+
+def forget_chat(chat_id: int):
+    """Descarta o estado de trava guardado em memória para um chat"""
+    _locked_cache.pop((current_bot_id(), chat_id), None)
+
+
+@traced("storage.save_chat_settings")
+async def save_chat_settings(chat_id: int, language: str, theme: str) -> bool:
+    """Salva as configurações de um chat junto com os dados de trava"""
+    if _storage is None:
+        return False
+
+    try:
+        await with_deadline(
+            _storage.update_chat(current_bot_id(), chat_id, {"language": language, "theme": theme}),
+            MONGO_TIMEOUT
+        )
+        logger.info(f"🌐 Configurações salvas - Chat: {chat_id}, Idioma: {language}, Tema: {theme}")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Erro ao salvar configurações do chat {chat_id}: {e}")
+        return False
+
+
+async def iter_user_ids(after_user_id: Optional[int] = None, batch_size: int = 500) -> AsyncIterator[int]:
+    """Percorre os IDs de usuários em ordem crescente, a partir de um checkpoint"""
+    if _storage is None:
+        return
+
+    async for user_id in _storage.iter_user_ids(current_bot_id(), after_user_id, batch_size):
+        yield user_id
+
+
+async def count_users_after(after_user_id: Optional[int] = None) -> int:
+    """Conta os usuários com ID maior que o checkpoint"""
+    if _storage is None:
+        return 0
+
+    try:
+        return await _storage.count_users_after(current_bot_id(), after_user_id)
+    except Exception as e:
+        logger.error(f"❌ Erro ao contar usuários: {e}")
+        return 0
+
+
+async def create_broadcast(doc: dict) -> Optional[object]:
+    """Registra um novo broadcast e retorna o ID"""
+    if _storage is None:
+        return None
+
+    try:
+        return await _storage.create_broadcast(doc)
+    except Exception as e:
+        logger.error(f"❌ Erro ao criar broadcast: {e}")
+        return None
+
+
+async def update_broadcast(broadcast_id, fields: dict) -> bool:
+    """Atualiza o progresso (checkpoint) de um broadcast"""
+    if _storage is None:
+        return False
+
+    try:
+        await _storage.update_broadcast(broadcast_id, fields)
+        return True
+    except Exception as e:
+        logger.error(f"❌ Erro ao atualizar broadcast {broadcast_id}: {e}")
+        return False
+
+
+async def get_running_broadcast() -> Optional[dict]:
+    """Retorna o broadcast interrompido, se houver"""
+    if _storage is None:
+        return None
+
+    try:
+        return await _storage.get_running_broadcast(current_bot_id())
+    except Exception as e:
+        logger.error(f"❌ Erro ao buscar broadcast: {e}")
+        return None
+
+
+@traced("storage.set_chat_dead")
+async def set_chat_dead(chat_id: int, dead: bool) -> bool:
+    """Marca (ou desmarca) um chat em que o bot foi removido ou bloqueado"""
+    if _storage is None:
+        return False
+
+    try:
+        await _storage.update_chat(current_bot_id(), chat_id, {"dead": dead})
+        return True
+    except Exception as e:
+        logger.error(f"❌ Erro ao salvar estado do chat {chat_id}: {e}")
+        return False
+
+
+async def get_dead_chats() -> List[int]:
+    """Retorna os chats marcados como inativos do bot atual"""
+    if _storage is None:
+        return []
+
+    try:
+        return await _storage.dead_chat_ids(current_bot_id())
+    except Exception as e:
+        logger.error(f"❌ Erro ao buscar chats inativos: {e}")
+        return []
@@ -2,14 +2,19 @@
 
 import asyncio
 import logging
+import time
+from typing import Optional, Tuple
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from utils.session_manager import get_session, delete_session, has_active_session
-from utils.keyboard import create_game_keyboard, create_guess_keyboard, create_continue_keyboard
-from utils.messages import format_question, format_guess, format_victory, format_defeat, format_give_up
-from database.mongodb import save_user_id, is_chat_locked
-from config import GUESS_THRESHOLD
+from models.session import AkinatorSession
+from utils.session_manager import get_game, delete_session
+from utils.keyboard import create_game_keyboard, create_guess_keyboard, create_continue_keyboard, parse_callback_data
+from utils.messages import format_question, format_guess, format_victory, format_defeat, format_give_up, format_retry
+from utils.deadline import DeadlineExceeded, detached
+from utils.guess_policy import guess_policy, GUESS, DECLINE
+from database.storage import save_user_id, is_chat_locked
+from config import AKINATOR_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +28,15 @@ ANSWER_MAP = {
 }
 
 
+def find_game(chat_id: int, data: str) -> Tuple[str, Optional[AkinatorSession]]:
+    """Separa a ação do botão e encontra o jogo a que ele pertence"""
+    action, game_id = parse_callback_data(data)
+    session = get_game(game_id) if game_id else None
+    if session is not None and session.chat_id != chat_id:
+        session = None
+    return action, session
+
+
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler para botões de resposta do jogo"""
     query = update.callback_query
@@ -41,8 +55,9 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await save_user_id(user.id)
     
-    # Verifica se existe sessão ativa
-    if not has_active_session(chat_id):
+    # Verifica se o jogo do botão ainda está ativo
+    answer, session = find_game(chat_id, query.data)
+    if session is None:
         await query.message.reply_text(
             "⏱️ Esta sessão expirou.\n"
             "Use /jogar para começar um novo jogo."
@@ -50,8 +65,6 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.message.delete()
         return
     
-    session = get_session(chat_id)
-    
     # Verifica se é o usuário correto
     if session.user_id != user.id:
         await query.answer(
@@ -62,7 +75,7 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Verifica timeout
     if session.is_expired():
-        delete_session(chat_id)
+        delete_session(chat_id, session.user_id)
         await query.message.reply_text(
             "⏱️ Tempo esgotado! O jogo foi encerrado por inatividade.\n"
             "Use /jogar para começar um novo jogo."
@@ -70,85 +83,100 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.message.delete()
         return
     
+    # A resposta anterior ainda pode mudar o jogo: não aceita outra até ela terminar
+    if session.is_busy():
+        await query.answer(
+            "⏳ Aguarde, o Akinator ainda está respondendo!",
+            show_alert=True
+        )
+        return
+    
     session.update_activity()
-    answer = query.data
+    
+    # Estado antes da resposta e se o Akinator já a recebeu (para concluir a jogada se ele atrasar)
+    state = None
+    answered = False
+    
+    async def advance():
+        """Conclui a jogada depois que o Akinator aceitou a resposta"""
+        nonlocal answered
+        answered = True
+        session.push_history(state)
+        session.increment_question()
+        await ask_or_guess(context, chat_id, session)
     
     try:
-        # Apaga mensagem anterior
-        await query.message.delete()
-        
         if answer == "back":
-            # Volta para pergunta anterior
-            if session.question_count > 1:
-                await asyncio.to_thread(session.aki.back)
-                session.question_count -= 1
-                
-                question = session.aki.question
-                
-                keyboard = create_game_keyboard()
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=format_question(session, question),
-                    reply_markup=keyboard,
+            # Volta para pergunta anterior usando o histórico local, sem esperar o Akinator
+            previous = session.pop_history()
+            if previous is not None:
+                # Edita a própria mensagem da pergunta: uma única chamada à Bot API
+                message = query.message
+                await query.edit_message_text(
+                    format_question(session, previous.question),
+                    reply_markup=create_game_keyboard(session.game_id),
                     parse_mode='HTML'
                 )
+                
+                # Confirma com o Akinator em segundo plano e corrige esta mesma mensagem se ele discordar
+                # (em ordem, se houver outro "voltar" pendente)
+                session.pending_back = context.application.create_task(
+                    detached(sync_back(session, message, session.pending_back)),
+                    update=update
+                )
             else:
+                # Apaga mensagem anterior
+                await query.message.delete()
                 await context.bot.send_message(
                     chat_id=chat_id,
                     text="❗ Você já está na primeira pergunta!"
                 )
                 # Reenvia a pergunta atual
-                keyboard = create_game_keyboard()
+                keyboard = create_game_keyboard(session.game_id)
                 await context.bot.send_message(
                     chat_id=chat_id,
-                    text=format_question(session, session.aki.question),
+                    text=format_question(session, session.displayed_question()),
                     reply_markup=keyboard,
                     parse_mode='HTML'
                 )
         
         else:
+            # Apaga mensagem anterior
+            await query.message.delete()
+            
             # Processa resposta normal
             aki_answer = ANSWER_MAP.get(answer)
             if not aki_answer:
                 return
             
+            # O Akinator precisa estar na mesma pergunta que o jogador respondeu
+            if await session.wait_for_back():
+                await context.bot.send_message(
+                    chat_id=chat_id,
+                    text=format_question(session, session.aki.question),
+                    reply_markup=create_game_keyboard(session.game_id),
+                    parse_mode='HTML'
+                )
+                return
+            
+            state = session.current_state()
+            started = time.perf_counter()
             try: 
                 # Envia resposta ao Akinator (versão 2.0.2)
-                await asyncio.to_thread(session.aki.answer, aki_answer)
-                session.increment_question()
-                
-                question = session.aki.question
-                
-                # Verifica se deve fazer um palpite
-                if session.get_progress() >= GUESS_THRESHOLD:
-                    await make_guess(context, chat_id, session)
-                else:
-                    # Próxima pergunta
-                    keyboard = create_game_keyboard()
-                    await context.bot.send_message(
-                        chat_id=chat_id,
-                        text=format_question(session, question),
-                        reply_markup=keyboard,
-                        parse_mode='HTML'
-                    )
+                await session.call(session.aki.answer, aki_answer, limit=AKINATOR_TIMEOUT)
             except RuntimeError as e:
-                # Erro da API do Akinator - tenta novamente
-                logger.warning(f"⚠️ API Akinator instável, tentando novamente...")
+                # Erro da API do Akinator - tenta novamente (só a resposta: ela não foi aceita)
+                logger.warning(
+                    "⚠️ API Akinator instável, tentando novamente...",
+                    extra={"chat_id": chat_id, "handler": "button_handler"}
+                )
                 
                 try:
                     # Segunda tentativa
                     await asyncio.sleep(1)
-                    await asyncio.to_thread(session.aki.answer, aki_answer)
-                    session.increment_question()
-                    
-                    question = session.aki.question
-                    keyboard = create_game_keyboard()
-                    await context.bot.send_message(
-                        chat_id=chat_id,
-                        text=format_question(session, question),
-                        reply_markup=keyboard,
-                        parse_mode='HTML'
-                    )
+                    await session.call(session.aki.answer, aki_answer, limit=AKINATOR_TIMEOUT)
+                except DeadlineExceeded:
+                    raise
                 except:
                     # Se falhar de novo, avisa o usuário
                     await context.bot.send_message(
@@ -157,8 +185,48 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                             "Tente novamente em alguns minutos.\n\n"
                             "Use /jogar para começar um novo jogo."
                     )
-                    delete_session(chat_id)
-                    raise
+                    delete_session(chat_id, session.user_id)
+                    return
+            
+            logger.info(
+                "💬 Resposta %s - Pergunta %s", aki_answer, session.question_count + 1,
+                extra={
+                    "event": "answer",
+                    "chat_id": chat_id,
+                    "user_id": user.id,
+                    "handler": "button_handler",
+                    "latency": time.perf_counter() - started
+                }
+            )
+            
+            # Palpite ou próxima pergunta, conforme a política
+            # (a resposta já foi aceita: uma falha daqui em diante encerra o jogo, sem reenviá-la)
+            await advance()
+    
+    except DeadlineExceeded:
+        logger.warning(
+            "⏳ Akinator não respondeu a tempo - Chat: %s", chat_id,
+            extra={"chat_id": chat_id, "user_id": user.id, "handler": "button_handler"}
+        )
+        if session.is_busy() or answered:
+            # A chamada continua na thread e ainda vai mudar o jogo: segue quando ela terminar
+            then = (lambda: ask_or_guess(context, chat_id, session)) if answered else advance
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text="⏳ O Akinator está demorando para responder. A próxima pergunta chega em instantes..."
+            )
+            context.application.create_task(
+                detached(resume_after_call(context, chat_id, session, then)),
+                update=update
+            )
+        else:
+            # A resposta nem chegou a ser enviada: pede de novo
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=format_retry(session, session.displayed_question()),
+                reply_markup=create_game_keyboard(session.game_id),
+                parse_mode='HTML'
+            )
     
     except Exception as e:
         logger.error(f"❌ Erro ao processar resposta: {e}")
@@ -168,26 +236,133 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             text="😕 Ocorreu um erro. O jogo foi encerrado.\n"
                  "Use /jogar para começar novamente."
         )
-        delete_session(chat_id)
+        delete_session(chat_id, session.user_id)
+
+
+async def resume_after_call(context: ContextTypes.DEFAULT_TYPE, chat_id: int, session: AkinatorSession, then):
+    """Conclui a jogada quando a chamada ao Akinator que passou do prazo terminar"""
+    try:
+        await session.settle()
+    except Exception as e:
+        # O Akinator não mudou de estado: agora é seguro pedir a resposta de novo
+        logger.warning(
+            "⚠️ Chamada atrasada ao Akinator falhou - Chat: %s: %s", chat_id, e,
+            extra={"chat_id": chat_id, "user_id": session.user_id, "handler": "resume_after_call"}
+        )
+        then = None
+    
+    # Jogo cancelado ou expirado enquanto esperava
+    if get_game(session.game_id) is not session:
+        return
+    
+    try:
+        if then is not None:
+            await then()
+            return
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=format_retry(session, session.displayed_question()),
+            reply_markup=create_game_keyboard(session.game_id),
+            parse_mode='HTML'
+        )
+    except Exception as e:
+        logger.error(f"❌ Erro ao concluir jogada atrasada - Chat {chat_id}: {e}")
+
+
+async def sync_back(session: AkinatorSession, message, previous: Optional[asyncio.Task]) -> bool:
+    """Envia o "voltar" ao Akinator e corrige a pergunta exibida se ele discordar do histórico
+
+    Retorna True se a pergunta exibida precisou ser corrigida.
+    """
+    if previous is not None:
+        await asyncio.wait({previous})
+    
+    expected = session.shown
+    restored = False
+    try:
+        try:
+            await session.call(session.aki.back, limit=AKINATOR_TIMEOUT)
+        except DeadlineExceeded:
+            # O "voltar" continua na thread: o resultado dele é o que vale
+            await session.settle()
+    except Exception as e:
+        # O Akinator continua na pergunta seguinte
+        logger.warning(
+            "⚠️ Falha ao voltar no Akinator - Chat: %s: %s", session.chat_id, e,
+            extra={"event": "back_failed", "chat_id": session.chat_id, "user_id": session.user_id}
+        )
+        if expected is not None:
+            session.push_history(expected)
+            restored = True
+    
+    # Só o último "voltar" da fila compara com o que está na tela
+    if session.pending_back is not asyncio.current_task():
+        return False
+    session.shown = None
+    
+    actual = session.current_state()
+    if expected is not None and (actual.question, actual.step) == (expected.question, expected.step):
+        return False
+    
+    logger.warning(
+        "🔀 Akinator divergiu do histórico local - Chat: %s, passo %s (esperado %s)",
+        session.chat_id, actual.step, expected.step if expected else None,
+        extra={"event": "back_mismatch", "chat_id": session.chat_id, "user_id": session.user_id}
+    )
+    # A pergunta de onde se voltou continua no histórico se o Akinator parou depois dela
+    if not restored and expected is not None and expected.step < actual.step:
+        session.push_history(expected)
+    session.trim_history(actual.step)
+    try:
+        await message.edit_text(
+            format_question(session, actual.question),
+            reply_markup=create_game_keyboard(session.game_id),
+            parse_mode='HTML'
+        )
+    except Exception as e:
+        # A mensagem já foi respondida/apagada: a pergunta correta é reenviada na próxima resposta
+        logger.debug(f"Não foi possível corrigir a pergunta - Chat {session.chat_id}: {e}")
+    return True
+
+
+async def ask_or_guess(context: ContextTypes.DEFAULT_TYPE, chat_id: int, session: AkinatorSession):
+    """Depois de uma resposta: mostra o palpite proposto pelo Akinator ou a próxima pergunta"""
+    decision = guess_policy.decide(session)
+    if decision == DECLINE:
+        # Proposta cedo demais: descarta e segue perguntando
+        guess_policy.record_decline(session)
+        await session.call(session.aki.exclude, limit=AKINATOR_TIMEOUT)
+        decision = guess_policy.decide(session)
+    
+    if decision == GUESS:
+        await make_guess(context, chat_id, session)
+        return
+    
+    if session.aki.finished:
+        # O Akinator não tem mais propostas
+        session.outcome = "defeat"
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=format_give_up(),
+            parse_mode='HTML'
+        )
+        delete_session(chat_id, session.user_id)
+        return
+    
+    await context.bot.send_message(
+        chat_id=chat_id,
+        text=format_question(session, session.aki.question),
+        reply_markup=create_game_keyboard(session.game_id),
+        parse_mode='HTML'
+    )
 
 
 async def make_guess(context: ContextTypes.DEFAULT_TYPE, chat_id: int, session):
-    """Faz o Akinator adivinhar o personagem"""
+    """Mostra a proposta do Akinator (só chamada com aki.win, pela política de palpite)"""
     try:
         # Versão 2.0.2 - o palpite está em atributos separados
         # name_proposition, description_proposition, photo
         
-        if not session.aki.win:
-            # Se win ainda é False, não está pronto para palpite
-            keyboard = create_game_keyboard()
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=format_question(session, session.aki.question),
-                reply_markup=keyboard,
-                parse_mode='HTML'
-            )
-            return
-        
         # Monta o dicionário do palpite
         guess = {
             'name': session.aki.name_proposition or 'Desconhecido',
@@ -195,12 +370,11 @@ async def make_guess(context: ContextTypes.DEFAULT_TYPE, chat_id: int, session):
             'absolute_picture_path': session.aki.photo or None
         }
         
-        logger.info(f"🎯 Palpite: {guess['name']}")
         
         # Monta o texto com a informação
         text = format_guess(guess['name'], guess['description'])
         
-        keyboard = create_guess_keyboard()
+        keyboard = create_guess_keyboard(session.game_id)
         
         # Verifica se tem imagem
         if guess['absolute_picture_path']:
@@ -221,7 +395,10 @@ async def make_guess(context: ContextTypes.DEFAULT_TYPE, chat_id: int, session):
                 parse_mode='HTML'
             )
         
-        logger.info(f"🎯 Palpite enviado - Chat: {chat_id}, Personagem: {guess['name']}")
+        logger.info(
+            "🎯 Palpite enviado - Chat: %s, Personagem: %s", chat_id, guess['name'],
+            extra={"chat_id": chat_id, "user_id": session.user_id, "handler": "make_guess"}
+        )
         
     except Exception as e:
         logger.error(f"❌ Erro ao fazer palpite: {e}")
@@ -231,7 +408,7 @@ async def make_guess(context: ContextTypes.DEFAULT_TYPE, chat_id: int, session):
             text="😕 Ocorreu um erro ao tentar adivinhar.\n"
                  "Use /jogar para tentar novamente."
         )
-        delete_session(chat_id)
+        delete_session(chat_id, session.user_id)
 
 
 async def guess_result_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -253,7 +430,8 @@ async def guess_result_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     await save_user_id(user.id)
     
     # Verifica sessão
-    if not has_active_session(chat_id):
+    result, session = find_game(chat_id, query.data)
+    if session is None:
         await query.message.reply_text("⏱️ Sessão expirada.")
         try:
             await query.message.delete()
@@ -261,11 +439,9 @@ async def guess_result_handler(update: Update, context: ContextTypes.DEFAULT_TYP
             pass
         return
     
-    session = get_session(chat_id)
-    
     # Verifica timeout
     if session.is_expired():
-        delete_session(chat_id)
+        delete_session(chat_id, session.user_id)
         await query.message.reply_text(
             "⏱️ Tempo esgotado! O jogo foi encerrado por inatividade.\n"
             "Use /jogar para começar um novo jogo."
@@ -281,14 +457,15 @@ async def guess_result_handler(update: Update, context: ContextTypes.DEFAULT_TYP
         await query.answer("❗ Este jogo pertence a outro usuário!", show_alert=True)
         return
     
-    result = query.data
-    
     # Remove os botões da mensagem do palpite
     try:
         await query.edit_message_reply_markup(reply_markup=None)
     except:
         pass
     
+    # Acerto dos palpites (estatísticas da política de palpite)
+    guess_policy.record_guess(session, result == "correct")
+    
     # Envia resultado
     if result == "correct":
         await context.bot.send_message(
@@ -296,18 +473,24 @@ async def guess_result_handler(update: Update, context: ContextTypes.DEFAULT_TYP
             text=format_victory(),
             parse_mode='HTML'
         )
-        logger.info(f"🎉 Vitória - Chat: {chat_id}")
-        delete_session(chat_id)
+        logger.info(
+            "🎉 Vitória - Chat: %s", chat_id,
+            extra={"chat_id": chat_id, "user_id": user.id, "handler": "guess_result_handler"}
+        )
+        delete_session(chat_id, session.user_id)
     else:
         # Errou - pergunta se quer continuar
-        keyboard = create_continue_keyboard()
+        keyboard = create_continue_keyboard(session.game_id)
         await context.bot.send_message(
             chat_id=chat_id,
             text=format_defeat(),
             reply_markup=keyboard,
             parse_mode='HTML'
         )
-        logger.info(f"😅 Erro no palpite - Chat: {chat_id}")
+        logger.info(
+            "😅 Erro no palpite - Chat: %s", chat_id,
+            extra={"chat_id": chat_id, "user_id": user.id, "handler": "guess_result_handler"}
+        )
         # NÃO deleta a sessão aqui, espera o usuário decidir
 
 
@@ -328,7 +511,8 @@ async def continue_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # Verifica sessão
-    if not has_active_session(chat_id):
+    action, session = find_game(chat_id, query.data)
+    if session is None:
         await query.message.reply_text("⏱️ Sessão expirada.")
         try:
             await query.message.delete()
@@ -336,11 +520,9 @@ async def continue_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             pass
         return
     
-    session = get_session(chat_id)
-    
     # Verifica timeout
     if session.is_expired():
-        delete_session(chat_id)
+        delete_session(chat_id, session.user_id)
         await query.message.reply_text(
             "⏱️ Tempo esgotado! O jogo foi encerrado por inatividade.\n"
             "Use /jogar para começar um novo jogo."
@@ -356,7 +538,10 @@ async def continue_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.answer("❗ Este jogo pertence a outro usuário!", show_alert=True)
         return
     
-    action = query.data
+    # A chamada anterior ao Akinator ainda está em andamento
+    if session.is_busy():
+        await query.answer("⏳ Aguarde, o Akinator ainda está respondendo!", show_alert=True)
+        return
     
     # Remove os botões da mensagem
     try:
@@ -365,17 +550,32 @@ async def continue_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         pass
     
     if action == "continue":
-        # Continua o jogo - próxima pergunta
+        # Continua o jogo - descarta a proposta errada e segue para a próxima pergunta
+        async def continue_game():
+            if session.aki.win:
+                await session.call(session.aki.exclude, limit=AKINATOR_TIMEOUT)
+            await ask_or_guess(context, chat_id, session)
+        
         try:
-            question = session.aki.question
-            keyboard = create_game_keyboard()
+            await continue_game()
+            logger.info(
+                "🔄 Continuando jogo - Chat: %s", chat_id,
+                extra={"chat_id": chat_id, "user_id": user.id, "handler": "continue_handler"}
+            )
+        except DeadlineExceeded:
+            # Segue quando o Akinator responder, sem aceitar outra ação até lá
+            logger.warning(
+                "⏳ Akinator não respondeu a tempo - Chat: %s", chat_id,
+                extra={"chat_id": chat_id, "user_id": user.id, "handler": "continue_handler"}
+            )
             await context.bot.send_message(
                 chat_id=chat_id,
-                text=format_question(session, question),
-                reply_markup=keyboard,
-                parse_mode='HTML'
+                text="⏳ O Akinator está demorando para responder. A próxima pergunta chega em instantes..."
+            )
+            context.application.create_task(
+                detached(resume_after_call(context, chat_id, session, continue_game)),
+                update=update
             )
-            logger.info(f"🔄 Continuando jogo - Chat: {chat_id}")
         except Exception as e:
             logger.error(f"❌ Erro ao continuar: {e}")
             await context.bot.send_message(
@@ -383,13 +583,17 @@ async def continue_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 text="😕 Ocorreu um erro ao continuar.\n"
                      "Use /jogar para tentar novamente."
             )
-            delete_session(chat_id)
+            delete_session(chat_id, session.user_id)
     else:  # give_up
         # Desiste do jogo
+        session.outcome = "defeat"
         await context.bot.send_message(
             chat_id=chat_id,
             text=format_give_up(),
             parse_mode='HTML'
         )
-        logger.info(f"🏳️ Desistência - Chat: {chat_id}")
-        delete_session(chat_id)
\ No newline at end of file
+        logger.info(
+            "🏳️ Desistência - Chat: %s", chat_id,
+            extra={"chat_id": chat_id, "user_id": user.id, "handler": "continue_handler"}
+        )
+        delete_session(chat_id, session.user_id)
\ No newline at end of file
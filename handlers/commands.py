@@ -1,20 +1,47 @@
 """Handlers para comandos do bot"""
 
-import asyncio
 import logging
-from telegram import Update
+import os
+from datetime import datetime
+from typing import Optional
+from telegram import Bot, Message, Update
+from telegram.constants import ChatType
 from telegram.ext import ContextTypes
 
 from utils.session_manager import (
     create_session,
     get_session,
+    get_game,
     delete_session,
-    has_active_session
+    delete_chat_sessions,
+    count_chat_sessions
 )
-from utils.keyboard import create_game_keyboard
-from utils.messages import format_question, format_welcome
+from models.session import AkinatorSession
+from utils.keyboard import create_game_keyboard, parse_callback_data
+from utils.messages import format_question, format_welcome, format_pool_stats
 from utils.permissions import is_user_admin
-from database.mongodb import save_user_id, lock_chat, unlock_chat, is_chat_locked
+from utils.chat_settings import (
+    get_settings,
+    set_language,
+    set_theme,
+    available_themes,
+    SUPPORTED_LANGUAGES,
+    THEME_NAMES
+)
+from utils.deadline import run_in_thread, DeadlineExceeded, detached
+from database.storage import save_user_id, lock_chat, unlock_chat, is_chat_locked
+from utils.broadcast import start_broadcast, get_current_broadcast, cancel_broadcast
+from utils.telegram_request import get_pool_stats
+from utils.profiler import SamplingProfiler, start_profiling, finish_profiling, dump_tasks
+from config import (
+    AKINATOR_TIMEOUT,
+    BOT_OWNER_ID,
+    MAX_GAMES_PER_CHAT,
+    PROFILER_INTERVAL,
+    PROFILER_DEFAULT_SECONDS,
+    PROFILER_MAX_SECONDS,
+    PROFILER_OUTPUT_DIR,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -55,55 +82,96 @@ async def play(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await save_user_id(user.id)
     
-    # Verifica se já existe sessão ativa
-    if has_active_session(chat_id):
-        session = get_session(chat_id)
-        if session.user_id == user.id:
-            await update.message.reply_text(
-                "❗ Você já tem um jogo ativo!\n"
-                "Use /cancelar para encerrar e começar um novo."
-            )
-        else:
-            await update.message.reply_text(
-                f"❗ Já existe um jogo ativo neste chat.\n"
-                f"Aguarde o término ou peça ao usuário que está jogando "
-                "para usar /cancelar."
-            )
+    # Verifica se o jogador já tem um jogo ativo neste chat
+    if get_session(chat_id, user.id) is not None:
+        await update.message.reply_text(
+            "❗ Você já tem um jogo ativo!\n"
+            "Use /cancelar para encerrar e começar um novo."
+        )
+        return
+    
+    # Cada jogador tem o seu jogo, até o limite do chat
+    if count_chat_sessions(chat_id) >= MAX_GAMES_PER_CHAT:
+        await update.message.reply_text(
+            f"❗ Já existem {MAX_GAMES_PER_CHAT} jogos ativos neste chat.\n"
+            f"Aguarde o término de algum deles."
+        )
         return
     
-    # Cria nova sessão
-    session = create_session(user.id, chat_id)
+    # Cria nova sessão com o idioma e tema do chat
+    settings = await get_settings(chat_id)
+    player_name = user.first_name if update.effective_chat.type != ChatType.PRIVATE else None
+    session = create_session(user.id, chat_id, settings.language, settings.theme, player_name)
     
     try:
-        # Inicia o Akinator em português
-        await asyncio.to_thread(session.aki.start_game, language='pt', child_mode=False, theme='c')
+        # Inicia o Akinator no idioma configurado
+        await run_in_thread(
+            session.aki.start_game,
+            language=session.language,
+            child_mode=False,
+            theme=session.theme,
+            limit=AKINATOR_TIMEOUT
+        )
         session.question_count = 1
         
         # Pega a primeira pergunta
         question = session.aki.question
         
         # Envia primeira pergunta
-        keyboard = create_game_keyboard()
+        keyboard = create_game_keyboard(session.game_id)
         await update.message.reply_text(
             format_question(session, question),
             reply_markup=keyboard,
             parse_mode='HTML'
         )
         
-        logger.info(f"🎮 Jogo iniciado - Chat: {chat_id}, User: {user.id}")
+        logger.info(
+            "🎮 Jogo iniciado - Chat: %s, User: %s, Servidor: %s", chat_id, user.id, session.endpoint,
+            extra={"chat_id": chat_id, "user_id": user.id, "handler": "play"}
+        )
         
+    except DeadlineExceeded:
+        logger.warning(
+            "⏳ Akinator não respondeu a tempo ao iniciar - Chat: %s", chat_id,
+            extra={"chat_id": chat_id, "user_id": user.id, "handler": "play"}
+        )
+        delete_session(chat_id, user.id)
+        await update.message.reply_text(
+            "⏳ O Akinator demorou demais para responder.\n"
+            "Use /jogar para tentar novamente."
+        )
+    
     except Exception as e:
         logger.error(f"❌ Erro ao iniciar jogo: {e}")
         logger.exception(e)
-        delete_session(chat_id)
+        delete_session(chat_id, user.id)
         await update.message.reply_text(
             "😕 Desculpe, ocorreu um erro ao iniciar o jogo.\n"
             "Tente novamente em alguns instantes."
         )
 
 
+def _replied_game(message: Optional[Message], chat_id: int) -> Optional[AkinatorSession]:
+    """Jogo de uma mensagem respondida: a pergunta do bot (pelos botões) ou o jogador que escreveu"""
+    if message is None:
+        return None
+    if message.reply_markup and message.reply_markup.inline_keyboard:
+        button = message.reply_markup.inline_keyboard[0][0]
+        _, game_id = parse_callback_data(button.callback_data or "")
+        session = get_game(game_id) if game_id else None
+        if session is not None and session.chat_id == chat_id:
+            return session
+    if message.from_user and not message.from_user.is_bot:
+        return get_session(chat_id, message.from_user.id)
+    return None
+
+
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler do comando /cancelar - Cancela o jogo atual"""
+    """Handler do comando /cancelar - Cancela o jogo atual
+
+    Sem argumentos cancela o próprio jogo; respondendo a uma mensagem, o jogo dela;
+    "/cancelar todos" (administradores) cancela todos os jogos do chat.
+    """
     chat_id = update.effective_chat.id
     user = update.effective_user
     
@@ -117,32 +185,55 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await save_user_id(user.id)
     
-    # Verifica se existe sessão
-    if not has_active_session(chat_id):
+    # Todos os jogos do chat (apenas admins)
+    if context.args and context.args[0].lower() == "todos":
+        if not await is_user_admin(update, context):
+            await update.message.reply_text(
+                "❗ Apenas administradores podem cancelar todos os jogos."
+            )
+            return
+        removed = delete_chat_sessions(chat_id)
+        if not removed:
+            await update.message.reply_text(
+                "❗ Não há nenhum jogo ativo no momento."
+            )
+            return
         await update.message.reply_text(
-            "❗ Não há nenhum jogo ativo no momento."
+            f"✅ {removed} jogo(s) cancelado(s)!\n"
+            "Use /jogar para começar um novo."
+        )
+        logger.info(
+            "🛑 Todos os jogos cancelados - Chat: %s, Admin: %s", chat_id, user.id,
+            extra={"chat_id": chat_id, "user_id": user.id, "handler": "cancel"}
         )
         return
     
-    session = get_session(chat_id)
+    # Verifica se existe sessão (a da mensagem respondida ou a do próprio usuário)
+    session = _replied_game(update.message.reply_to_message, chat_id) or get_session(chat_id, user.id)
+    if session is None:
+        await update.message.reply_text(
+            "❗ Não há nenhum jogo ativo no momento."
+        )
+        return
     
     # Verifica se é o dono da sessão OU se é admin do grupo
-    is_admin = await is_user_admin(update, context)
-    
-    if session.user_id != user.id and not is_admin:
+    if session.user_id != user.id and not await is_user_admin(update, context):
         await update.message.reply_text(
             "❗ Apenas quem iniciou o jogo ou administradores podem cancelá-lo."
         )
         return
     
     # Remove sessão
-    delete_session(chat_id)
+    delete_session(chat_id, session.user_id)
     await update.message.reply_text(
         "✅ Jogo cancelado!\n"
         "Use /jogar para começar um novo."
     )
     
-    logger.info(f"🛑 Jogo cancelado - Chat: {chat_id}, User: {user.id}")
+    logger.info(
+        "🛑 Jogo cancelado - Chat: %s, User: %s", chat_id, session.user_id,
+        extra={"chat_id": chat_id, "user_id": user.id, "handler": "cancel"}
+    )
 
 
 async def lock(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -166,9 +257,8 @@ async def lock(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    # Cancela jogo ativo se houver
-    if has_active_session(chat_id):
-        delete_session(chat_id)
+    # Cancela os jogos ativos do chat
+    delete_chat_sessions(chat_id)
     
     # Trava o chat
     await lock_chat(chat_id)
@@ -216,13 +306,103 @@ async def unlock(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     logger.info(f"🔓 Bot destravado - Chat: {chat_id}, Admin: {user.id}")
 
+async def language(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler do comando /idioma - Define o idioma dos jogos do chat"""
+    chat_id = update.effective_chat.id
+    
+    if await is_chat_locked(chat_id):
+        await update.message.reply_text(
+            "🔒 O bot está travado neste grupo.\n"
+            "Apenas administradores podem usar /destravar."
+        )
+        return
+    
+    settings = await get_settings(chat_id)
+    
+    if not context.args:
+        await update.message.reply_text(
+            f"🌐 <b>Idioma atual:</b> {settings.language}\n\n"
+            f"Idiomas disponíveis: {', '.join(SUPPORTED_LANGUAGES)}\n"
+            f"Use /idioma &lt;código&gt; para alterar.",
+            parse_mode='HTML'
+        )
+        return
+    
+    # Em grupos, apenas administradores podem alterar
+    if update.effective_chat.type != ChatType.PRIVATE and not await is_user_admin(update, context):
+        await update.message.reply_text(
+            "❗ Apenas administradores podem alterar o idioma."
+        )
+        return
+    
+    code = context.args[0].lower()
+    if code not in SUPPORTED_LANGUAGES:
+        await update.message.reply_text(
+            f"❗ Idioma inválido.\n"
+            f"Idiomas disponíveis: {', '.join(SUPPORTED_LANGUAGES)}"
+        )
+        return
+    
+    settings = await set_language(chat_id, code)
+    await update.message.reply_text(
+        f"🌐 Idioma alterado para <b>{settings.language}</b>!\n"
+        f"Tema: {THEME_NAMES[settings.theme]}\n\n"
+        f"O novo idioma vale a partir do próximo /jogar.",
+        parse_mode='HTML'
+    )
+
+
+async def theme(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler do comando /tema - Define o tema dos jogos do chat"""
+    chat_id = update.effective_chat.id
+    
+    if await is_chat_locked(chat_id):
+        await update.message.reply_text(
+            "🔒 O bot está travado neste grupo.\n"
+            "Apenas administradores podem usar /destravar."
+        )
+        return
+    
+    settings = await get_settings(chat_id)
+    themes = available_themes(settings.language)
+    options = ", ".join(f"{code} ({THEME_NAMES[code]})" for code in themes)
+    
+    if not context.args:
+        await update.message.reply_text(
+            f"🎭 <b>Tema atual:</b> {THEME_NAMES[settings.theme]}\n\n"
+            f"Temas disponíveis: {options}\n"
+            f"Use /tema &lt;código&gt; para alterar.",
+            parse_mode='HTML'
+        )
+        return
+    
+    # Em grupos, apenas administradores podem alterar
+    if update.effective_chat.type != ChatType.PRIVATE and not await is_user_admin(update, context):
+        await update.message.reply_text(
+            "❗ Apenas administradores podem alterar o tema."
+        )
+        return
+    
+    code = context.args[0].lower()
+    if code not in themes:
+        await update.message.reply_text(
+            f"❗ Tema indisponível para o idioma {settings.language}.\n"
+            f"Temas disponíveis: {options}"
+        )
+        return
+    
+    settings = await set_theme(chat_id, code)
+    await update.message.reply_text(
+        f"🎭 Tema alterado para <b>{THEME_NAMES[settings.theme]}</b>!\n\n"
+        f"O novo tema vale a partir do próximo /jogar.",
+        parse_mode='HTML'
+    )
+
+
 async def leave_group(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando para o bot sair de um grupo (apenas dono do bot)"""
     user_id = update.effective_user.id
     
-    # ⚠️ COLOQUE SEU USER_ID AQUI
-    BOT_OWNER_ID = 1790032262
-    
     if user_id != BOT_OWNER_ID:
         return  # Ignora se não for você
     
@@ -242,4 +422,133 @@ async def leave_group(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
     except Exception as e:
         logger.error(f"❌ Erro ao sair do grupo: {e}")
-        await update.message.reply_text(f"❌ Erro ao sair: {e}")
\ No newline at end of file
+        await update.message.reply_text(f"❌ Erro ao sair: {e}")
+
+
+async def broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /broadcast - Envia uma mensagem a todos os usuários (apenas dono do bot)"""
+    if update.effective_user.id != BOT_OWNER_ID:
+        return  # Ignora se não for você
+    
+    if get_current_broadcast() is not None:
+        await update.message.reply_text(
+            "❗ Já existe um broadcast em andamento.\n"
+            "Use /broadcast_status para acompanhar."
+        )
+        return
+    
+    reply = update.message.reply_to_message
+    parts = update.message.text_html.split(None, 1)
+    text = parts[1].strip() if len(parts) > 1 else ""
+    
+    if reply is None and not text:
+        await update.message.reply_text(
+            "Use /broadcast &lt;mensagem&gt; ou responda a uma mensagem com /broadcast.",
+            parse_mode='HTML'
+        )
+        return
+    
+    if reply is not None:
+        # Copia a mensagem respondida (mantém mídia e formatação)
+        job = await start_broadcast(
+            context.bot,
+            update.effective_chat.id,
+            from_chat_id=reply.chat_id,
+            message_id=reply.message_id
+        )
+    else:
+        job = await start_broadcast(context.bot, update.effective_chat.id, text=text)
+    
+    if job is None:
+        await update.message.reply_text("❌ Não foi possível iniciar o broadcast (armazenamento indisponível).")
+        return
+    
+    await update.message.reply_text(
+        "📣 Broadcast iniciado!\n"
+        "Use /broadcast_status para acompanhar ou /broadcast_parar para cancelar."
+    )
+
+
+async def broadcast_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /broadcast_status - Mostra o progresso do broadcast (apenas dono do bot)"""
+    if update.effective_user.id != BOT_OWNER_ID:
+        return
+    
+    job = get_current_broadcast()
+    if job is None:
+        await update.message.reply_text("📣 Nenhum broadcast em andamento.")
+        return
+    
+    await update.message.reply_text(job.progress_text(), parse_mode='HTML')
+
+
+async def broadcast_stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /broadcast_parar - Cancela o broadcast em andamento (apenas dono do bot)"""
+    if update.effective_user.id != BOT_OWNER_ID:
+        return
+    
+    if cancel_broadcast():
+        await update.message.reply_text("🛑 Broadcast cancelado.")
+    else:
+        await update.message.reply_text("📣 Nenhum broadcast em andamento.")
+
+
+async def connections(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /conexoes - Mostra o uso e a espera por conexões com a Bot API (apenas dono do bot)"""
+    if update.effective_user.id != BOT_OWNER_ID:
+        return
+
+    await update.message.reply_text(format_pool_stats(get_pool_stats()), parse_mode='HTML')
+
+
+async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /perfil [segundos] - Perfila o processo e envia as pilhas (apenas dono do bot)"""
+    if update.effective_user.id != BOT_OWNER_ID:
+        return  # Ignora se não for você
+    
+    try:
+        seconds = float(context.args[0]) if context.args else PROFILER_DEFAULT_SECONDS
+    except ValueError:
+        await update.message.reply_text("❗ Uso: /perfil [segundos]")
+        return
+    seconds = min(max(seconds, 1.0), PROFILER_MAX_SECONDS)
+    
+    # Tarefas pendentes no momento do pedido (o que está lento agora)
+    tasks = dump_tasks()
+    profiler = start_profiling(PROFILER_INTERVAL)
+    if profiler is None:
+        await update.message.reply_text("❗ Já existe um perfil em andamento.")
+        return
+    
+    # Em segundo plano: o handler não pode segurar a fila de updates durante a coleta
+    context.application.create_task(
+        detached(_send_profile(context.bot, update.effective_chat.id, profiler, seconds, tasks)),
+        update=update
+    )
+    await update.message.reply_text(f"🔬 Coletando amostras por {seconds:.0f}s...")
+
+
+async def _send_profile(bot: Bot, chat_id: int, profiler: SamplingProfiler, seconds: float, tasks: str):
+    """Conclui o perfil, salva (se configurado) e envia os arquivos"""
+    await finish_profiling(profiler, seconds)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    files = {
+        f"perfil-{stamp}.folded": profiler.collapsed(),
+        f"tarefas-{stamp}.txt": tasks,
+    }
+    
+    if PROFILER_OUTPUT_DIR:
+        os.makedirs(PROFILER_OUTPUT_DIR, exist_ok=True)
+        for filename, content in files.items():
+            with open(os.path.join(PROFILER_OUTPUT_DIR, filename), "w", encoding="utf-8") as f:
+                f.write(content)
+    
+    caption = f"🔬 {profiler.sample_count} amostras em {seconds:.0f}s (pilhas colapsadas para flamegraph)"
+    for filename, content in files.items():
+        await bot.send_document(
+            chat_id=chat_id,
+            document=content.encode("utf-8"),
+            filename=filename,
+            caption=caption
+        )
+        caption = None
@@ -0,0 +1,26 @@
+"""Handler das mudanças de status do próprio bot nos chats (adicionado, removido, bloqueado)"""
+
+import logging
+from telegram import ChatMember, Update
+from telegram.ext import ContextTypes
+
+from utils.bot_registry import current_bot_id
+from utils.dead_chats import mark_chat_dead, mark_chat_alive
+
+logger = logging.getLogger(__name__)
+
+# Status em que o bot não pode mais enviar mensagens para o chat
+_GONE = (ChatMember.LEFT, ChatMember.BANNED)
+
+
+async def bot_membership(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Atualiza os chats inativos quando o bot sai, é removido, bloqueado ou volta"""
+    change = update.my_chat_member
+    chat_id = change.chat.id
+    member = change.new_chat_member
+
+    if member.status in _GONE or (member.status == ChatMember.RESTRICTED and not member.is_member):
+        # Em privado, BANNED/LEFT = o usuário bloqueou o bot
+        mark_chat_dead(current_bot_id(), chat_id, f"my_chat_member: {member.status}")
+    else:
+        mark_chat_alive(current_bot_id(), chat_id)
@@ -1,21 +1,58 @@
 """Modelo de sessão do Akinator"""
 
+import asyncio
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, NamedTuple, Optional
 from akinator import Akinator
-from config import TIMEOUT, AKINATOR_LANGUAGE
+from config import TIMEOUT, AKINATOR_LANGUAGE, AKINATOR_THEME
+from utils.endpoint_selector import endpoint_selector, EndpointScraper
+from utils.deadline import DeadlineExceeded, timeout_for, start_thread, wait_thread
+
+
+class QuestionState(NamedTuple):
+    """Pergunta já exibida, guardada para o "voltar" instantâneo"""
+    question: str
+    progression: float
+    step: int
 
 
 class AkinatorSession:
     """Gerencia uma sessão individual do Akinator"""
     
-    def __init__(self, user_id: int, chat_id: int):
+    def __init__(self, user_id: int, chat_id: int,
+                 language: str = AKINATOR_LANGUAGE, theme: str = AKINATOR_THEME,
+                 player_name: Optional[str] = None):
         self.user_id = user_id
         self.chat_id = chat_id
+        # Nome exibido nas mensagens quando há vários jogos no mesmo chat (grupos)
+        self.player_name = player_name
+        # Identifica o jogo no callback_data dos botões
+        self.game_id = ""
+        self.language = language
+        self.theme = theme
+        # Escolhe o servidor mais rápido e saudável para o idioma
+        self.endpoint = endpoint_selector.choose(language)
+        self.transport = EndpointScraper(endpoint_selector, self.endpoint, language)
         # Versão 2.0.2 do akinator
-        self.aki = Akinator()
+        self.aki = Akinator(session=self.transport)
+        self.bot_id: Optional[int] = None
         self.last_activity = datetime.now()
         self.question_count = 0
+        # Progresso após cada resposta (trajetória usada pela política de palpite)
+        self.progress_trail: List[float] = []
+        # Palpites mostrados, propostas recusadas e resultado ("win", "defeat" ou None)
+        self.guesses = 0
+        self.declined = 0
+        self.outcome: Optional[str] = None
+        # Perguntas anteriores (a última é a que antecede a atual)
+        self.history: List[QuestionState] = []
+        # Pergunta exibida enquanto o "voltar" ainda não foi confirmado pelo Akinator
+        self.shown: Optional[QuestionState] = None
+        # "Voltar" enviado ao Akinator em segundo plano
+        self.pending_back: Optional[asyncio.Task] = None
+        # Última chamada ao Akinator e a que passou do prazo (ainda pode mudar o estado do jogo)
+        self.in_flight: Optional[asyncio.Future] = None
+        self.stalled: Optional[asyncio.Future] = None
     
     def update_activity(self):
         """Atualiza o timestamp da última atividade"""
@@ -27,8 +64,81 @@ class AkinatorSession:
     
     def get_progress(self) -> float:
         """Retorna o progresso atual em porcentagem"""
+        if self.shown is not None:
+            return float(self.shown.progression)
         return float(self.aki.progression)
+
+    def current_state(self) -> QuestionState:
+        """Pergunta atual segundo o Akinator"""
+        return QuestionState(self.aki.question, float(self.aki.progression), int(self.aki.step))
+
+    def push_history(self, state: QuestionState):
+        """Guarda a pergunta respondida"""
+        self.history.append(state)
+
+    def trim_history(self, step: int):
+        """Mantém só as perguntas anteriores ao passo informado e renumera a atual"""
+        while self.history and self.history[-1].step >= step:
+            self.history.pop()
+        del self.progress_trail[len(self.history):]
+        self.question_count = len(self.history) + 1
+
+    def pop_history(self) -> Optional[QuestionState]:
+        """Retira a pergunta anterior à exibida (pelo passo do Akinator) e passa a exibi-la
+
+        O passo não acompanha a posição na lista: excluir uma proposta avança o
+        Akinator sem uma pergunta respondida.
+        """
+        step = self.shown.step if self.shown is not None else int(self.aki.step)
+        self.trim_history(step)
+        if not self.history:
+            return None
+        if self.progress_trail:
+            self.progress_trail.pop()
+        self.shown = self.history.pop()
+        self.question_count = len(self.history) + 1
+        return self.shown
+
+    def displayed_question(self) -> str:
+        """Pergunta que o jogador está vendo"""
+        if self.shown is not None:
+            return self.shown.question
+        return self.aki.question
+
+    async def wait_for_back(self) -> bool:
+        """Aguarda o "voltar" em segundo plano; retorna True se a pergunta exibida foi corrigida"""
+        task = self.pending_back
+        if task is None or task.done():
+            return False
+        await asyncio.wait({task})
+        return not task.cancelled() and task.exception() is None and bool(task.result())
+    
+    async def call(self, func, *args, limit: float):
+        """Chama o Akinator em thread; se o prazo acabar, a chamada segue registrada na sessão"""
+        if timeout_for(limit) <= 0:
+            raise DeadlineExceeded("Orçamento do update esgotado")
+        future = self.in_flight = start_thread(func, *args)
+        try:
+            return await wait_thread(future, limit)
+        except DeadlineExceeded:
+            if not future.done():
+                self.stalled = future
+            raise
+
+    def is_busy(self) -> bool:
+        """Uma chamada que passou do prazo ainda está em andamento"""
+        return self.stalled is not None and not self.stalled.done()
+
+    async def settle(self):
+        """Aguarda a última chamada ao Akinator terminar (propaga o erro dela)"""
+        if self.in_flight is not None:
+            await asyncio.shield(self.in_flight)
     
     def increment_question(self):
-        """Incrementa o contador de perguntas"""
-        self.question_count += 1
\ No newline at end of file
+        """Incrementa o contador de perguntas e guarda o progresso"""
+        self.question_count += 1
+        self.progress_trail.append(float(self.aki.progression))
+    
+    def close(self):
+        """Libera os recursos da sessão"""
+        self.transport.close()
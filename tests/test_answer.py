@@ -0,0 +1,61 @@
+"""Resposta: a tentativa extra cobre só o envio da resposta, nunca o que vem depois dela"""
+
+import asyncio
+
+from benchmarks.stubs import FakeAkinator, FakeBot, FakeContext, install_stubs, make_callback_update
+
+install_stubs()
+
+import handlers.callbacks as callbacks
+from utils.bot_registry import bot_scope
+from utils.guess_policy import ASK, DECLINE
+from utils.session_manager import clear_sessions, create_session, get_game
+
+CHAT_ID = -1001
+USER_ID = 42
+
+
+class _DeclineProposals:
+    """Recusa toda proposta do Akinator"""
+
+    def decide(self, session):
+        return DECLINE if session.aki.win else ASK
+
+    def record_decline(self, session):
+        session.declined += 1
+
+
+def test_failed_exclude_does_not_resend_answer(monkeypatch):
+    answers = []
+    original_answer = FakeAkinator.answer
+
+    def answer(self, value):
+        answers.append(value)
+        original_answer(self, value)
+
+    def exclude(self):
+        raise RuntimeError("Failed to exclude the proposition.")
+
+    monkeypatch.setattr(FakeAkinator, "answer", answer)
+    monkeypatch.setattr(FakeAkinator, "exclude", exclude)
+    monkeypatch.setattr(callbacks, "guess_policy", _DeclineProposals())
+    bot = FakeBot()
+    ctx = FakeContext(bot)
+
+    async def play():
+        clear_sessions()
+        session = create_session(USER_ID, CHAT_ID)
+        session.aki.start_game(language=session.language, theme=session.theme)
+        session.question_count = 1
+        # A resposta leva a uma proposta, que é recusada
+        session.aki.progression = 85.0
+
+        update = make_callback_update(bot, CHAT_ID, USER_ID, f"yes:{session.game_id}")
+        await callbacks.button_handler(update, ctx)
+
+        assert answers == ["yes"]
+        assert [state.step for state in session.history] == [0]
+        assert get_game(session.game_id) is None
+
+    with bot_scope(None):
+        asyncio.run(play())
@@ -0,0 +1,100 @@
+"""Voltar: o histórico local segue o passo do Akinator, não a posição na lista"""
+
+import asyncio
+
+from benchmarks.stubs import FakeBot, FakeContext, install_stubs, make_callback_update
+
+install_stubs()
+
+import handlers.callbacks as callbacks
+from utils.bot_registry import bot_scope
+from utils.guess_policy import ASK, DECLINE
+from utils.session_manager import clear_sessions, create_session
+
+CHAT_ID = -1001
+USER_ID = 42
+
+
+class _DeclineProposals:
+    """Recusa toda proposta do Akinator"""
+
+    def decide(self, session):
+        return DECLINE if session.aki.win else ASK
+
+    def record_decline(self, session):
+        session.declined += 1
+
+
+async def _tap(bot, ctx, session, action):
+    update = make_callback_update(bot, CHAT_ID, USER_ID, f"{action}:{session.game_id}")
+    await callbacks.button_handler(update, ctx)
+    if session.pending_back is not None:
+        await session.pending_back
+
+
+def test_back_after_declined_proposal(monkeypatch):
+    monkeypatch.setattr(callbacks, "guess_policy", _DeclineProposals())
+    bot = FakeBot()
+    ctx = FakeContext(bot)
+
+    async def play():
+        clear_sessions()
+        session = create_session(USER_ID, CHAT_ID)
+        session.aki.start_game(language=session.language, theme=session.theme)
+        session.question_count = 1
+
+        await _tap(bot, ctx, session, "yes")
+        await _tap(bot, ctx, session, "yes")
+        # A próxima resposta leva a uma proposta, recusada: o Akinator avança sem nova pergunta no histórico
+        session.aki.progression = 85.0
+        await _tap(bot, ctx, session, "yes")
+        assert session.declined == 1
+        assert session.aki.step > len(session.history)
+
+        deleted = bot.calls.get("delete_message", 0)
+        await _tap(bot, ctx, session, "back")
+        # A pergunta anterior aparece editando a mensagem do botão, sem apagar e reenviar
+        assert bot.calls.get("delete_message", 0) == deleted
+        assert bot.calls.get("edit_message_text", 0) >= 1
+        assert session.displayed_question() == session.aki.question
+        assert session.question_count == len(session.history) + 1
+
+        # O "voltar" seguinte bate com o Akinator, sem precisar corrigir a pergunta exibida
+        await _tap(bot, ctx, session, "back")
+        assert session.pending_back.result() is False
+        assert session.displayed_question() == session.aki.question
+        assert [state.step for state in session.history] == list(range(session.aki.step))
+        assert session.question_count == len(session.history) + 1
+
+    with bot_scope(None):
+        asyncio.run(play())
+
+
+def test_failed_back_restores_history_once(monkeypatch):
+    def back(self):
+        raise RuntimeError("Failed to go back to the previous question.")
+
+    bot = FakeBot()
+    ctx = FakeContext(bot)
+
+    async def play():
+        clear_sessions()
+        session = create_session(USER_ID, CHAT_ID)
+        session.aki.start_game(language=session.language, theme=session.theme)
+        session.question_count = 1
+
+        for _ in range(3):
+            await _tap(bot, ctx, session, "yes")
+        assert [state.step for state in session.history] == [0, 1, 2]
+        assert session.question_count == 4
+
+        # O Akinator recusa o "voltar" e continua na pergunta atual
+        monkeypatch.setattr(session.aki, "back", back.__get__(session.aki))
+        await _tap(bot, ctx, session, "back")
+        assert session.pending_back.result() is True
+        assert [state.step for state in session.history] == [0, 1, 2]
+        assert session.question_count == 4
+        assert session.displayed_question() == session.aki.question
+
+    with bot_scope(None):
+        asyncio.run(play())
@@ -0,0 +1,34 @@
+"""Envio em massa: a tarefa não herda o contexto do update que a iniciou"""
+
+import asyncio
+
+import utils.broadcast as broadcast
+import utils.tracing as tracing
+from utils.deadline import remaining, start_deadline
+
+
+class _NullExporter:
+    def export(self, trace):
+        pass
+
+
+def test_broadcast_job_runs_without_update_deadline_or_trace(monkeypatch):
+    seen = {}
+
+    async def run(job):
+        seen["remaining"] = remaining()
+        seen["span"] = tracing.current_span()
+
+    monkeypatch.setattr(broadcast.BroadcastJob, "run", run)
+    monkeypatch.setattr(tracing, "TRACE_ENABLED", True)
+    monkeypatch.setattr(tracing, "_exporter", _NullExporter())
+    monkeypatch.setattr(broadcast, "_current_jobs", {})
+
+    async def handler():
+        with tracing.start_trace("update") as root, start_deadline(5.0):
+            assert root is not None and remaining() is not None
+            job = broadcast._launch(object(), {"_id": "b1", "bot_id": 1})
+            await job.task
+
+    asyncio.run(handler())
+    assert seen == {"remaining": None, "span": None}
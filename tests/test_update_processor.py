@@ -0,0 +1,92 @@
+"""Fila de prioridade dos updates: vagas de execução e updates cancelados na espera"""
+
+import asyncio
+
+from utils.update_processor import PRIORITY_GAME, PRIORITY_OTHER, PriorityUpdateProcessor
+
+
+def test_cancelled_waiter_does_not_block_new_updates():
+    async def scenario():
+        processor = PriorityUpdateProcessor(workers=1, max_pending=10)
+        release = asyncio.Event()
+        ran = []
+
+        async def hold():
+            await release.wait()
+            ran.append("hold")
+
+        async def quick(name):
+            ran.append(name)
+
+        holder = asyncio.create_task(processor.do_process_update(object(), hold()))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(processor.do_process_update(object(), quick("cancelled")))
+        await asyncio.sleep(0)
+        assert processor.snapshot()["waiting"][PRIORITY_OTHER] == 1
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert processor._waiting == []
+
+        release.set()
+        await holder
+        assert processor.snapshot()["running"] == 0
+
+        # Nenhuma espera: a vaga livre é usada na hora
+        await asyncio.wait_for(processor.do_process_update(object(), quick("new")), 1)
+        assert ran == ["hold", "new"]
+
+    asyncio.run(scenario())
+
+
+def test_freed_slot_goes_to_highest_priority_waiter():
+    async def scenario():
+        processor = PriorityUpdateProcessor(workers=1, max_pending=10)
+        release = asyncio.Event()
+        ran = []
+
+        async def hold():
+            await release.wait()
+
+        async def record(name):
+            ran.append(name)
+
+        holder = asyncio.create_task(processor._run(PRIORITY_OTHER, hold()))
+        await asyncio.sleep(0)
+        other = asyncio.create_task(processor._run(PRIORITY_OTHER, record("other")))
+        cancelled = asyncio.create_task(processor._run(PRIORITY_GAME, record("cancelled")))
+        game = asyncio.create_task(processor._run(PRIORITY_GAME, record("game")))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        release.set()
+        await asyncio.gather(holder, other, game, cancelled, return_exceptions=True)
+        assert ran == ["game", "other"]
+        assert processor.snapshot()["running"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_wait_for_finished_wakes_when_an_update_ends():
+    async def scenario():
+        processor = PriorityUpdateProcessor(workers=1, max_pending=1)
+        release = asyncio.Event()
+
+        async def hold():
+            await release.wait()
+
+        holder = asyncio.create_task(processor.process_update(object(), hold()))
+        await asyncio.sleep(0)
+        assert processor.current_concurrent_updates == 1
+
+        waiter = asyncio.create_task(processor.wait_for_finished())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        release.set()
+        await asyncio.wait_for(waiter, 1)
+        # A vaga já foi devolvida quando quem esperava acorda
+        assert processor.current_concurrent_updates == 0
+        await holder
+
+    asyncio.run(scenario())
@@ -0,0 +1,51 @@
+"""Application do bot com instrumentação por update"""
+
+from telegram import Update
+from telegram.ext import Application
+
+from utils.tracing import start_trace
+from utils.traffic_recorder import recorder
+from utils.deadline import start_deadline
+from utils.bot_registry import bot_id_from_token, bot_scope
+from utils.keyboard import parse_callback_data
+from utils.dead_chats import is_chat_dead, mark_chat_alive
+
+
+def describe_update(update: object) -> dict:
+    """Extrai os campos usados para identificar um update nos traces"""
+    if not isinstance(update, Update):
+        return {"kind": type(update).__name__}
+
+    attributes = {"update_id": update.update_id}
+    if update.effective_chat:
+        attributes["chat_id"] = update.effective_chat.id
+    if update.effective_user:
+        attributes["user_id"] = update.effective_user.id
+
+    if update.callback_query:
+        # Sem o id do jogo: o tipo do update deve ter poucos valores
+        action, _ = parse_callback_data(update.callback_query.data or "")
+        attributes["kind"] = f"callback:{action}"
+    elif update.message and update.message.text and update.message.text.startswith("/"):
+        attributes["kind"] = update.message.text.split()[0].split("@")[0]
+    else:
+        attributes["kind"] = "other"
+    return attributes
+
+
+class BotApplication(Application):
+    """Application que abre um trace, define o prazo e o bot e grava (se ativo) cada update processado"""
+
+    async def process_update(self, update: object) -> None:
+        bot_id = bot_id_from_token(self.bot.token)
+        if isinstance(update, Update) and update.effective_chat and update.my_chat_member is None:
+            # Alguém falou com o bot num chat marcado como inativo (ex.: desbloqueou no privado)
+            if is_chat_dead(bot_id, update.effective_chat.id):
+                mark_chat_alive(bot_id, update.effective_chat.id)
+        with (
+            bot_scope(bot_id),
+            start_trace("update", bot_id=bot_id, **describe_update(update)),
+            start_deadline(),
+            recorder.record_update(update),
+        ):
+            await super().process_update(update)
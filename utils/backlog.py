@@ -0,0 +1,130 @@
+"""Triagem dos updates acumulados enquanto o bot estava fora do ar"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+from telegram import Bot, CallbackQuery, Update
+from telegram.error import TelegramError
+
+from utils.bot_registry import bot_id_from_token, bot_scope
+from utils.keyboard import parse_callback_data
+from utils.session_manager import get_game
+from utils.update_processor import command_of
+from config import BACKLOG_MAX_AGE, BACKLOG_ANSWER_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+# Limite do getUpdates por chamada
+_FETCH_LIMIT = 100
+
+
+async def fetch_backlog(bot: Bot, allowed_updates: Sequence[str]) -> List[Update]:
+    """Lê (e confirma) todos os updates pendentes, sem esperar por novos"""
+    updates: List[Update] = []
+    offset: Optional[int] = None
+    while True:
+        batch = await bot.get_updates(
+            offset=offset, limit=_FETCH_LIMIT, timeout=0, allowed_updates=allowed_updates
+        )
+        if not batch:
+            # A chamada vazia com o offset confirma os anteriores
+            return updates
+        updates.extend(batch)
+        offset = batch[-1].update_id + 1
+
+
+def triage(updates: Sequence[Update], bot_id: int,
+           now: Optional[datetime] = None) -> Tuple[List[Update], List[CallbackQuery], Dict[str, int]]:
+    """Separa o backlog em updates a processar e botões de jogos que não existem mais
+
+    - botões de jogos encerrados (todos, após reiniciar) só recebem uma resposta rápida
+    - comandos repetidos do mesmo usuário no mesmo chat viram um só (o último)
+    - comandos antigos demais e mensagens que não são comandos são descartados
+    """
+    now = now or datetime.now(timezone.utc)
+    stale: List[CallbackQuery] = []
+    # Último comando de cada (chat, usuário, comando), na posição em que apareceu por último
+    commands: Dict[Tuple[int, int, str], int] = {}
+    kept: List[Optional[Update]] = []
+    counts = {"total": len(updates), "stale_callbacks": 0, "duplicates": 0, "old": 0, "ignored": 0}
+
+    with bot_scope(bot_id):
+        for update in updates:
+            query = update.callback_query
+            if query is not None:
+                _, game_id = parse_callback_data(query.data or "")
+                if not game_id or get_game(game_id) is None:
+                    stale.append(query)
+                    counts["stale_callbacks"] += 1
+                    continue
+                kept.append(update)
+                continue
+
+            if update.message is not None:
+                command = command_of(update)
+                if command is None:
+                    # Nenhum handler trata mensagens comuns
+                    counts["ignored"] += 1
+                    continue
+                if (now - update.message.date).total_seconds() > BACKLOG_MAX_AGE:
+                    counts["old"] += 1
+                    continue
+                user_id = update.effective_user.id if update.effective_user else 0
+                key = (update.effective_chat.id, user_id, command)
+                if key in commands:
+                    kept[commands[key]] = None
+                    counts["duplicates"] += 1
+                commands[key] = len(kept)
+
+            kept.append(update)
+
+    return [update for update in kept if update is not None], stale, counts
+
+
+async def answer_stale_callbacks(bot: Bot, queries: Sequence[CallbackQuery]):
+    """Tira o "carregando" dos botões expirados, sem apagar nem enviar mensagens"""
+    semaphore = asyncio.Semaphore(BACKLOG_ANSWER_CONCURRENCY)
+
+    async def answer(query: CallbackQuery):
+        async with semaphore:
+            try:
+                await bot.answer_callback_query(
+                    query.id, text="⏱️ Este jogo expirou. Use /jogar para começar um novo."
+                )
+            except TelegramError:
+                # Respostas muito antigas são recusadas pelo Telegram; não há mais o que fazer
+                pass
+
+    await asyncio.gather(*(answer(query) for query in queries))
+
+
+async def process_backlog(app, allowed_updates: Sequence[str]) -> int:
+    """Lê o backlog, responde os botões expirados e enfileira o resto antes do polling
+
+    Retorna quantos updates foram enfileirados.
+    """
+    try:
+        updates = await fetch_backlog(app.bot, allowed_updates)
+    except TelegramError as e:
+        # O polling lê os pendentes normalmente
+        logger.warning(f"⚠️ Não foi possível ler o backlog: {e}")
+        return 0
+    if not updates:
+        return 0
+
+    kept, stale, counts = triage(updates, bot_id_from_token(app.bot.token))
+    for update in kept:
+        await app.update_queue.put(update)
+    # Em segundo plano: os updates mantidos não esperam pelas respostas
+    if stale:
+        asyncio.create_task(answer_stale_callbacks(app.bot, stale), name="backlog:stale_callbacks")
+
+    logger.info(
+        "📥 Backlog de %s updates - %s enfileirados, %s botões expirados, %s comandos repetidos, "
+        "%s comandos antigos, %s mensagens ignoradas",
+        counts["total"], len(kept), counts["stale_callbacks"], counts["duplicates"],
+        counts["old"], counts["ignored"],
+        extra={"event": "backlog"}
+    )
+    return len(kept)
@@ -0,0 +1,62 @@
+"""Registro das aplicações (uma por token) e do bot que está tratando o update atual"""
+
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from telegram.ext import Application
+
+# Aplicações ativas
+# Estrutura: {bot_id: Application}
+_applications: Dict[int, Application] = {}
+
+# Bot do primeiro token: dono dos dados salvos antes do suporte a vários tokens
+_primary_bot_id: Optional[int] = None
+
+# Bot do update (ou tarefa) atual
+_current_bot_id: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("current_bot_id", default=None)
+
+
+def bot_id_from_token(token: str) -> int:
+    """Extrai o ID do bot do token (formato <id>:<segredo>)"""
+    return int(token.split(":", 1)[0])
+
+
+def register_application(app: Application) -> int:
+    """Registra uma aplicação e retorna o ID do bot"""
+    global _primary_bot_id
+    bot_id = bot_id_from_token(app.bot.token)
+    _applications[bot_id] = app
+    if _primary_bot_id is None:
+        _primary_bot_id = bot_id
+    return bot_id
+
+
+def get_application(bot_id: Optional[int]) -> Optional[Application]:
+    """Retorna a aplicação de um bot"""
+    return _applications.get(bot_id)
+
+
+def get_applications() -> List[Application]:
+    """Retorna todas as aplicações registradas"""
+    return list(_applications.values())
+
+
+def primary_bot_id() -> Optional[int]:
+    """Retorna o ID do bot principal"""
+    return _primary_bot_id
+
+
+def current_bot_id() -> Optional[int]:
+    """Retorna o bot do contexto atual (o principal fora de um update)"""
+    bot_id = _current_bot_id.get()
+    return bot_id if bot_id is not None else _primary_bot_id
+
+
+@contextmanager
+def bot_scope(bot_id: int):
+    """Define o bot do contexto atual"""
+    token = _current_bot_id.set(bot_id)
+    try:
+        yield
+    finally:
+        _current_bot_id.reset(token)
@@ -0,0 +1,271 @@
+"""Envio em massa para os usuários salvos, com limite de taxa e retomada"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+
+from utils.bot_registry import bot_scope, bot_id_from_token, current_bot_id
+from utils.dead_chats import is_chat_dead
+from database.storage import (
+    iter_user_ids,
+    count_users_after,
+    create_broadcast,
+    update_broadcast,
+    get_running_broadcast,
+)
+from config import (
+    BROADCAST_RATE,
+    BROADCAST_CONCURRENCY,
+    BROADCAST_BATCH_SIZE,
+    BROADCAST_MAX_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Distribui os envios em intervalos fixos e pausa tudo após um RetryAfter"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        """Aguarda o próximo horário livre"""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, seconds: float):
+        """Adia todos os envios seguintes"""
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+def _retry_seconds(error: RetryAfter) -> float:
+    """Converte o retry_after (int ou timedelta, conforme a versão) em segundos"""
+    value = error.retry_after
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+class BroadcastJob:
+    """Um envio em massa em andamento"""
+
+    def __init__(self, bot: Bot, doc: dict):
+        self.bot = bot
+        self.doc = doc
+        self.broadcast_id = doc["_id"]
+        self.sent = doc.get("sent", 0)
+        self.failed = doc.get("failed", 0)
+        self.blocked = doc.get("blocked", 0)
+        self.last_user_id: Optional[int] = doc.get("last_user_id")
+        self.remaining = 0
+        self.cancelled = False
+        self._processed_now = 0
+        self._started = time.monotonic()
+        self._limiter = RateLimiter(BROADCAST_RATE)
+        self._semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed + self.blocked
+
+    def throughput(self) -> float:
+        """Mensagens processadas por segundo nesta execução"""
+        elapsed = time.monotonic() - self._started
+        return self._processed_now / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        """Segundos estimados até o fim"""
+        rate = self.throughput()
+        if rate <= 0:
+            return None
+        return self.remaining / rate
+
+    def progress_text(self) -> str:
+        """Resumo do progresso"""
+        eta = self.eta()
+        eta_text = str(timedelta(seconds=int(eta))) if eta is not None else "calculando..."
+        return (
+            f"📣 <b>Broadcast {'cancelado' if self.cancelled else 'em andamento'}</b>\n\n"
+            f"✅ Enviadas: {self.sent}\n"
+            f"🚫 Bloqueado/removido: {self.blocked}\n"
+            f"❌ Falhas: {self.failed}\n"
+            f"⏳ Restantes: {self.remaining}\n\n"
+            f"⚡ {self.throughput():.1f} msg/s - ETA {eta_text}"
+        )
+
+    async def _deliver(self, user_id: int):
+        """Envia a mensagem do broadcast para um usuário"""
+        if self.doc.get("message_id"):
+            await self.bot.copy_message(
+                chat_id=user_id,
+                from_chat_id=self.doc["from_chat_id"],
+                message_id=self.doc["message_id"]
+            )
+        else:
+            await self.bot.send_message(
+                chat_id=user_id,
+                text=self.doc["text"],
+                parse_mode='HTML'
+            )
+
+    async def _send(self, user_id: int):
+        """Envia para um usuário, tratando limite de taxa e erros temporários"""
+        if is_chat_dead(current_bot_id(), user_id):
+            # Bloqueou o bot: nem gasta uma vaga do limite de taxa
+            self.blocked += 1
+            return
+        async with self._semaphore:
+            for _ in range(BROADCAST_MAX_RETRIES):
+                if self.cancelled:
+                    return
+                await self._limiter.acquire()
+                try:
+                    await self._deliver(user_id)
+                    self.sent += 1
+                    return
+                except RetryAfter as e:
+                    seconds = _retry_seconds(e)
+                    logger.warning(f"⏸️ Broadcast: limite do Telegram, pausando {seconds:.0f}s")
+                    self._limiter.pause(seconds)
+                except Forbidden:
+                    self.blocked += 1
+                    return
+                except BadRequest:
+                    self.failed += 1
+                    return
+                except (TimedOut, NetworkError):
+                    await asyncio.sleep(1)
+            self.failed += 1
+
+    async def _checkpoint(self, status: str = "running"):
+        """Salva o progresso para permitir a retomada"""
+        await update_broadcast(self.broadcast_id, {
+            "status": status,
+            "last_user_id": self.last_user_id,
+            "sent": self.sent,
+            "failed": self.failed,
+            "blocked": self.blocked,
+            "updated_at": datetime.utcnow(),
+        })
+
+    async def _send_batch(self, batch: List[int]):
+        before = self.processed
+        await asyncio.gather(*(self._send(user_id) for user_id in batch))
+        done = self.processed - before
+        self._processed_now += done
+        self.remaining = max(0, self.remaining - done)
+        if not self.cancelled:
+            self.last_user_id = batch[-1]
+            await self._checkpoint()
+        logger.info(
+            "📣 Broadcast: %s processados, %.1f msg/s, %s restantes",
+            self.processed, self.throughput(), self.remaining
+        )
+
+    async def run(self):
+        """Executa o broadcast no contexto do bot que o criou"""
+        with bot_scope(self.doc["bot_id"]):
+            await self._run()
+
+    async def _run(self):
+        """Percorre os usuários a partir do checkpoint e envia em lotes"""
+        self.remaining = await count_users_after(self.last_user_id)
+        logger.info(f"📣 Broadcast {self.broadcast_id} iniciado - {self.remaining} usuários restantes")
+
+        batch: List[int] = []
+        async for user_id in iter_user_ids(self.last_user_id, BROADCAST_BATCH_SIZE):
+            if self.cancelled:
+                break
+            batch.append(user_id)
+            if len(batch) >= BROADCAST_BATCH_SIZE:
+                await self._send_batch(batch)
+                batch = []
+        if batch and not self.cancelled:
+            await self._send_batch(batch)
+
+        await self._checkpoint("cancelled" if self.cancelled else "done")
+        logger.info(f"📣 Broadcast {self.broadcast_id} finalizado - {self.sent} enviadas")
+
+        try:
+            await self.bot.send_message(
+                chat_id=self.doc["owner_chat_id"],
+                text=self.progress_text().replace("em andamento", "finalizado"),
+                parse_mode='HTML'
+            )
+        except Exception as e:
+            logger.error(f"❌ Erro ao enviar relatório do broadcast: {e}")
+
+
+# Broadcast em andamento (apenas um por vez em cada bot)
+# Estrutura: {bot_id: BroadcastJob}
+_current_jobs: Dict[Optional[int], BroadcastJob] = {}
+
+
+def get_current_broadcast() -> Optional[BroadcastJob]:
+    """Retorna o broadcast em andamento do bot atual, se houver"""
+    job = _current_jobs.get(current_bot_id())
+    if job is not None and job.task is not None and not job.task.done():
+        return job
+    return None
+
+
+def _launch(bot: Bot, doc: dict) -> BroadcastJob:
+    job = BroadcastJob(bot, doc)
+    # Contexto limpo: o envio dura muito mais que o update que o iniciou (sem prazo nem trace dele)
+    job.task = asyncio.create_task(job.run(), context=contextvars.Context())
+    _current_jobs[doc["bot_id"]] = job
+    return job
+
+
+async def start_broadcast(bot: Bot, owner_chat_id: int, text: Optional[str] = None,
+                          from_chat_id: Optional[int] = None,
+                          message_id: Optional[int] = None) -> Optional[BroadcastJob]:
+    """Cria e inicia um broadcast (texto ou cópia de uma mensagem)"""
+    doc = {
+        "bot_id": current_bot_id(),
+        "status": "running",
+        "text": text,
+        "from_chat_id": from_chat_id,
+        "message_id": message_id,
+        "owner_chat_id": owner_chat_id,
+        "last_user_id": None,
+        "sent": 0,
+        "failed": 0,
+        "blocked": 0,
+        "created_at": datetime.utcnow(),
+    }
+    broadcast_id = await create_broadcast(doc)
+    if broadcast_id is None:
+        return None
+    doc["_id"] = broadcast_id
+    return _launch(bot, doc)
+
+
+async def resume_broadcast(bot: Bot) -> Optional[BroadcastJob]:
+    """Retoma um broadcast interrompido por reinício do processo"""
+    with bot_scope(bot_id_from_token(bot.token)):
+        doc = await get_running_broadcast()
+    if doc is None:
+        return None
+    logger.info(f"📣 Retomando broadcast {doc['_id']} a partir do user_id {doc.get('last_user_id')}")
+    return _launch(bot, doc)
+
+
+def cancel_broadcast() -> bool:
+    """Cancela o broadcast em andamento"""
+    job = get_current_broadcast()
+    if job is None:
+        return False
+    job.cancelled = True
+    return True
@@ -0,0 +1,78 @@
+"""Configurações por chat (idioma e tema) com cache em memória"""
+
+import logging
+from typing import Dict, NamedTuple, Optional, Tuple
+from akinator.client import LANG_MAP, THEME_MAP
+from database.storage import get_chat_settings, save_chat_settings
+from utils.bot_registry import current_bot_id
+from config import AKINATOR_LANGUAGE, AKINATOR_THEME
+
+logger = logging.getLogger(__name__)
+
+# Idiomas suportados pelo Akinator (códigos)
+SUPPORTED_LANGUAGES = sorted(LANG_MAP.values())
+
+# Nomes dos temas
+THEME_NAMES = {
+    "c": "Personagens",
+    "a": "Animais",
+    "o": "Objetos",
+}
+
+
+class ChatSettings(NamedTuple):
+    """Idioma e tema usados nos jogos de um chat"""
+    language: str
+    theme: str
+
+
+DEFAULT_SETTINGS = ChatSettings(AKINATOR_LANGUAGE, AKINATOR_THEME)
+
+# Cache das configurações (compartilhado pelos bots, com chave separada por bot)
+# Estrutura: {(bot_id, chat_id): ChatSettings}
+_settings_cache: Dict[Tuple[Optional[int], int], ChatSettings] = {}
+
+
+def available_themes(language: str) -> list:
+    """Retorna os temas disponíveis para um idioma"""
+    return THEME_MAP.get(language, ["c"])
+
+
+async def get_settings(chat_id: int) -> ChatSettings:
+    """Retorna as configurações do chat, consultando o banco apenas uma vez"""
+    settings = _settings_cache.get((current_bot_id(), chat_id))
+    if settings is not None:
+        return settings
+
+    doc = await get_chat_settings(chat_id) or {}
+    settings = ChatSettings(
+        doc.get("language") or DEFAULT_SETTINGS.language,
+        doc.get("theme") or DEFAULT_SETTINGS.theme
+    )
+    _settings_cache[(current_bot_id(), chat_id)] = settings
+    return settings
+
+
+async def set_language(chat_id: int, language: str) -> ChatSettings:
+    """Altera o idioma do chat, voltando ao tema padrão se o atual não existir no idioma"""
+    current = await get_settings(chat_id)
+    theme = current.theme if current.theme in available_themes(language) else "c"
+    return await _save(chat_id, ChatSettings(language, theme))
+
+
+async def set_theme(chat_id: int, theme: str) -> ChatSettings:
+    """Altera o tema do chat"""
+    current = await get_settings(chat_id)
+    return await _save(chat_id, ChatSettings(current.language, theme))
+
+
+async def _save(chat_id: int, settings: ChatSettings) -> ChatSettings:
+    """Atualiza o cache e persiste no banco"""
+    _settings_cache[(current_bot_id(), chat_id)] = settings
+    await save_chat_settings(chat_id, settings.language, settings.theme)
+    return settings
+
+
+def forget_settings(chat_id: int):
+    """Descarta as configurações de um chat guardadas em memória"""
+    _settings_cache.pop((current_bot_id(), chat_id), None)
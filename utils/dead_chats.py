@@ -0,0 +1,111 @@
+"""Chats em que o bot não consegue mais enviar mensagens (removido, bloqueado ou chat apagado)
+
+Alimentado pelos updates my_chat_member e pelos erros da Bot API; enquanto um chat
+estiver aqui, as chamadas para ele nem chegam a sair (ver utils.telegram_request).
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+from utils.bot_registry import bot_scope
+from utils.deadline import detached
+from utils.session_manager import delete_chat_sessions
+from utils.chat_settings import forget_settings
+from database.storage import forget_chat, set_chat_dead, get_dead_chats
+
+logger = logging.getLogger(__name__)
+
+# Estrutura: {bot_id: {chat_id}}
+_dead_by_bot: Dict[Optional[int], Set[int]] = {}
+
+# Trechos das descrições de erro do Telegram que indicam que o chat não aceita mais mensagens
+# (sem permissão para escrever NÃO entra: o bot continua no chat)
+_DEAD_CHAT_ERRORS = (
+    b"bot was blocked by the user",
+    b"bot was kicked",
+    b"bot is not a member",
+    b"user is deactivated",
+    b"chat not found",
+    b"bot can't initiate conversation",
+    b"group chat was deleted",
+)
+
+# Gravações em andamento (referência para não serem coletadas antes de terminar)
+_pending: Set[asyncio.Task] = set()
+
+
+def is_chat_dead(bot_id: Optional[int], chat_id: int) -> bool:
+    """Verifica se o bot não pode mais falar com um chat"""
+    dead = _dead_by_bot.get(bot_id)
+    return dead is not None and chat_id in dead
+
+
+def dead_chat_reason(code: int, payload: bytes) -> Optional[str]:
+    """Motivo, se a resposta de erro da Bot API indicar um chat inativo"""
+    if code not in (400, 403):
+        return None
+    lowered = payload.lower()
+    for error in _DEAD_CHAT_ERRORS:
+        if error in lowered:
+            return error.decode()
+    return None
+
+
+def count_dead_chats(bot_id: Optional[int]) -> int:
+    return len(_dead_by_bot.get(bot_id, ()))
+
+
+async def load_dead_chats(bot_id: Optional[int]) -> int:
+    """Carrega do armazenamento os chats inativos de um bot"""
+    with bot_scope(bot_id):
+        chat_ids = await get_dead_chats()
+    _dead_by_bot.setdefault(bot_id, set()).update(chat_ids)
+    if chat_ids:
+        logger.info(f"💀 {len(chat_ids)} chats inativos carregados")
+    return len(chat_ids)
+
+
+def _persist(bot_id: Optional[int], chat_id: int, dead: bool):
+    async def save():
+        with bot_scope(bot_id):
+            await set_chat_dead(chat_id, dead)
+
+    # Pode ser chamado de dentro de um update: a gravação não usa o prazo dele
+    task = asyncio.get_running_loop().create_task(detached(save()))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def mark_chat_dead(bot_id: Optional[int], chat_id: int, reason: str) -> bool:
+    """Marca o chat como inativo e descarta o que o bot mantinha dele em memória"""
+    dead = _dead_by_bot.setdefault(bot_id, set())
+    if chat_id in dead:
+        return False
+    dead.add(chat_id)
+
+    with bot_scope(bot_id):
+        removed = delete_chat_sessions(chat_id)
+        forget_chat(chat_id)
+        forget_settings(chat_id)
+
+    logger.info(
+        "💀 Chat inativo: %s (%s) - %s jogos encerrados", chat_id, reason, removed,
+        extra={"event": "chat_dead", "chat_id": chat_id}
+    )
+    _persist(bot_id, chat_id, True)
+    return True
+
+
+def mark_chat_alive(bot_id: Optional[int], chat_id: int) -> bool:
+    """Volta a falar com um chat (bot adicionado de novo ou desbloqueado)"""
+    dead = _dead_by_bot.get(bot_id)
+    if dead is None or chat_id not in dead:
+        return False
+    dead.discard(chat_id)
+    logger.info(
+        "💚 Chat ativo novamente: %s", chat_id,
+        extra={"event": "chat_alive", "chat_id": chat_id}
+    )
+    _persist(bot_id, chat_id, False)
+    return True
@@ -0,0 +1,115 @@
+"""Orçamento de tempo por update, repassado para MongoDB, Akinator e Bot API"""
+
+import asyncio
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from typing import Optional
+from requests.exceptions import Timeout as RequestsTimeout
+from config import UPDATE_DEADLINE
+
+
+class DeadlineExceeded(Exception):
+    """O orçamento de tempo da operação acabou"""
+
+
+# Instante (time.monotonic) em que o update atual deve terminar
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def start_deadline(budget: float = UPDATE_DEADLINE):
+    """Define o prazo do update atual"""
+    token = _deadline.set(time.monotonic() + budget)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+async def detached(coroutine):
+    """Executa uma tarefa em segundo plano sem o prazo do update que a criou
+
+    As tarefas copiam o contexto de quem as cria; sem isso, herdariam um prazo
+    que já pode ter acabado.
+    """
+    _deadline.set(None)
+    return await coroutine
+
+
+def remaining() -> Optional[float]:
+    """Tempo restante do update atual (None fora de um update)"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def timeout_for(limit: float) -> float:
+    """Tempo disponível para uma dependência: a fatia dela, limitada ao que resta do update"""
+    left = remaining()
+    if left is None:
+        return limit
+    return max(0.0, min(limit, left))
+
+
+async def with_deadline(awaitable, limit: float):
+    """Aguarda uma operação dentro da fatia de tempo da dependência"""
+    timeout = timeout_for(limit)
+    if timeout <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Orçamento do update esgotado")
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError as e:
+        raise DeadlineExceeded(f"Operação excedeu {timeout:.1f}s") from e
+
+
+def _is_timeout(error: BaseException) -> bool:
+    """Verifica se o erro (ou a causa dele) é um timeout de rede"""
+    while error is not None:
+        if isinstance(error, (RequestsTimeout, TimeoutError)):
+            return True
+        error = error.__cause__
+    return False
+
+
+def _consume(future: asyncio.Future):
+    # Chamadas abandonadas pelo prazo não geram "exception was never retrieved"
+    if not future.cancelled():
+        future.exception()
+
+
+def start_thread(func, *args, **kwargs) -> asyncio.Future:
+    """Inicia uma chamada bloqueante em thread (com o contexto atual) e retorna o future
+
+    A chamada continua até o fim mesmo que quem espera por ela desista.
+    """
+    context = contextvars.copy_context()
+    future = asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(context.run, func, *args, **kwargs)
+    )
+    future.add_done_callback(_consume)
+    return future
+
+
+async def wait_thread(future: asyncio.Future, limit: float):
+    """Aguarda uma chamada em thread dentro da fatia de tempo, sem cancelá-la no timeout"""
+    try:
+        return await with_deadline(asyncio.shield(future), limit)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        if _is_timeout(e):
+            raise DeadlineExceeded("Timeout na chamada") from e
+        raise
+
+
+async def run_in_thread(func, *args, limit: float, **kwargs):
+    """Executa uma chamada bloqueante em thread, respeitando o orçamento"""
+    if timeout_for(limit) <= 0:
+        # Sem orçamento, a chamada nem começa
+        raise DeadlineExceeded("Orçamento do update esgotado")
+    return await wait_thread(start_thread(func, *args, **kwargs), limit)
@@ -0,0 +1,202 @@
+"""Seleção do servidor do Akinator por latência e taxa de erro"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from cloudscraper import create_scraper
+from utils.tracing import span
+from utils.deadline import timeout_for
+from utils.traffic_recorder import recorder
+from config import (
+    AKINATOR_ENDPOINTS,
+    ENDPOINT_PROBE_INTERVAL,
+    ENDPOINT_MAX_ERROR_RATE,
+    AKINATOR_TIMEOUT,
+    AKINATOR_SCRAPER_POOL_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Peso das novas medições na média móvel exponencial
+EWMA_ALPHA = 0.3
+
+# Timeout das medições periódicas (em segundos)
+PROBE_TIMEOUT = 10
+
+
+def default_endpoint(language: str) -> str:
+    """Retorna o servidor oficial do Akinator para um idioma"""
+    return f"https://{language}.akinator.com"
+
+
+class EndpointStats:
+    """Estatísticas de latência e erro de um servidor"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.rtt: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = 0
+
+    def record(self, rtt: float, ok: bool):
+        """Registra uma nova medição"""
+        if ok:
+            self.rtt = rtt if self.rtt is None else (1 - EWMA_ALPHA) * self.rtt + EWMA_ALPHA * rtt
+        self.error_rate = (1 - EWMA_ALPHA) * self.error_rate + EWMA_ALPHA * (0.0 if ok else 1.0)
+        self.samples += 1
+
+    def is_healthy(self) -> bool:
+        """Verifica se o servidor está saudável"""
+        return self.error_rate <= ENDPOINT_MAX_ERROR_RATE
+
+
+class EndpointSelector:
+    """Mantém as medições dos servidores e escolhe o mais rápido e saudável"""
+
+    def __init__(self, endpoints: Dict[str, List[str]]):
+        self._lock = threading.Lock()
+        self._by_language: Dict[str, List[EndpointStats]] = {
+            language: [EndpointStats(url.rstrip("/")) for url in urls]
+            for language, urls in endpoints.items()
+        }
+
+    def candidates(self, language: str) -> List[EndpointStats]:
+        """Retorna os servidores candidatos de um idioma"""
+        with self._lock:
+            if language not in self._by_language:
+                self._by_language[language] = [EndpointStats(default_endpoint(language))]
+            return list(self._by_language[language])
+
+    def choose(self, language: str) -> str:
+        """Escolhe o servidor para um novo jogo"""
+        candidates = self.candidates(language)
+        healthy = [stats for stats in candidates if stats.is_healthy()]
+        if not healthy:
+            # Nenhum saudável: usa o que está falhando menos
+            return min(candidates, key=lambda stats: stats.error_rate).url
+        # Servidores ainda não medidos têm prioridade para serem avaliados
+        return min(healthy, key=lambda stats: stats.rtt if stats.rtt is not None else 0.0).url
+
+    def has_healthy(self, language: str) -> bool:
+        """Verifica se algum servidor do idioma está saudável"""
+        return any(stats.is_healthy() for stats in self.candidates(language))
+
+    def record(self, url: str, rtt: float, ok: bool):
+        """Registra uma medição para um servidor conhecido"""
+        with self._lock:
+            for candidates in self._by_language.values():
+                for stats in candidates:
+                    if stats.url == url:
+                        stats.record(rtt, ok)
+
+    def snapshot(self) -> Dict[str, List[dict]]:
+        """Retorna o estado atual das medições"""
+        with self._lock:
+            return {
+                language: [
+                    {
+                        "url": stats.url,
+                        "rtt": stats.rtt,
+                        "error_rate": stats.error_rate,
+                        "healthy": stats.is_healthy(),
+                    }
+                    for stats in candidates
+                ]
+                for language, candidates in self._by_language.items()
+            }
+
+    async def probe(self, url: str):
+        """Mede o tempo de resposta de um servidor"""
+        # Sessão do pool compartilhado: devolvida (ou fechada, com o pool cheio) ao fim da medição
+        scraper = scraper_pool.acquire()
+        started = time.perf_counter()
+        try:
+            response = await asyncio.to_thread(scraper.get, url, timeout=PROBE_TIMEOUT)
+            ok = response.status_code < 500
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao medir servidor {url}: {e}")
+            ok = False
+        finally:
+            scraper_pool.release(scraper)
+        self.record(url, time.perf_counter() - started, ok)
+
+    async def run_probes(self):
+        """Mede periodicamente todos os servidores conhecidos"""
+        while True:
+            with self._lock:
+                urls = [stats.url for candidates in self._by_language.values() for stats in candidates]
+            await asyncio.gather(*(self.probe(url) for url in urls))
+            await asyncio.sleep(ENDPOINT_PROBE_INTERVAL)
+
+
+class ScraperPool:
+    """Reaproveita as sessões HTTP entre jogos (e entre bots), já que criá-las é caro"""
+
+    def __init__(self, max_idle: int):
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Retorna uma sessão livre ou cria uma nova"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return create_scraper()
+
+    def release(self, scraper):
+        """Devolve uma sessão ao pool, sem os cookies do jogo anterior"""
+        scraper.cookies.clear()
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(scraper)
+                return
+        scraper.close()
+
+
+class EndpointScraper:
+    """Sessão HTTP do Akinator presa a um servidor, que mede cada requisição"""
+
+    def __init__(self, selector: EndpointSelector, base_url: str, language: str):
+        self.scraper = scraper_pool.acquire()
+        self.selector = selector
+        self.base_url = base_url
+        self._default_prefix = default_endpoint(language)
+        # Chamadas feitas por esta sessão (estatísticas por jogo)
+        self.requests = 0
+
+    def post(self, url: str, **kwargs):
+        """Envia um POST para o servidor escolhido"""
+        if url.startswith(self._default_prefix):
+            url = self.base_url + url[len(self._default_prefix):]
+        # O prazo do update é propagado para a thread via contextvars
+        kwargs.setdefault("timeout", max(timeout_for(AKINATOR_TIMEOUT), 0.1))
+
+        path = url.rsplit('/', 1)[-1]
+        self.requests += 1
+        with span(f"akinator.{path}", endpoint=self.base_url) as current:
+            started = time.perf_counter()
+            try:
+                response = self.scraper.post(url, **kwargs)
+            except Exception:
+                self.selector.record(self.base_url, time.perf_counter() - started, False)
+                raise
+            elapsed = time.perf_counter() - started
+            self.selector.record(self.base_url, elapsed, response.status_code < 500)
+            recorder.record_akinator(path, response, elapsed)
+            if current is not None:
+                current.set(status=response.status_code)
+            return response
+
+    def close(self):
+        """Devolve a sessão HTTP ao pool"""
+        if self.scraper is not None:
+            scraper_pool.release(self.scraper)
+            self.scraper = None
+
+
+# Seletor e pool globais, compartilhados por todas as sessões de todos os bots
+endpoint_selector = EndpointSelector(AKINATOR_ENDPOINTS)
+scraper_pool = ScraperPool(AKINATOR_SCRAPER_POOL_SIZE)
@@ -0,0 +1,138 @@
+"""Decide quando mostrar o palpite, a partir da proposta do Akinator e da trajetória do progresso
+
+Na versão 2.0.2, o palpite só existe quando o servidor o propõe (aki.win); enquanto a
+proposta estiver pendente, a próxima resposta vira "escolher" ou "excluir" a proposta.
+Por isso a política não espera um progresso fixo: a cada resposta ela mostra a proposta,
+recusa (exclui e segue perguntando) ou continua perguntando quando não há proposta.
+"""
+
+import logging
+from typing import Dict, List
+
+from config import (
+    GUESS_POLICY,
+    GUESS_THRESHOLD,
+    GUESS_MIN_PROGRESSION,
+    GUESS_PLATEAU_WINDOW,
+    GUESS_PLATEAU_DELTA,
+    GUESS_MAX_QUESTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Decisões
+ASK = "ask"          # sem proposta: próxima pergunta
+GUESS = "guess"      # mostra a proposta
+DECLINE = "decline"  # cedo demais: exclui a proposta e continua
+
+# Resultado de um jogo encerrado sem vitória nem desistência (cancelado, expirado, erro)
+ABANDONED = "abandoned"
+
+
+def is_plateau(trail: List[float], window: int, delta: float) -> bool:
+    """O progresso variou no máximo `delta` pontos nas últimas `window` respostas"""
+    if window <= 0 or len(trail) < window:
+        return False
+    recent = trail[-window:]
+    return max(recent) - min(recent) <= delta
+
+
+class GuessPolicy:
+    """Política de palpite e estatísticas dos jogos (somadas entre os bots)"""
+
+    def __init__(self, mode: str = GUESS_POLICY, threshold: float = GUESS_THRESHOLD,
+                 min_progression: float = GUESS_MIN_PROGRESSION,
+                 plateau_window: int = GUESS_PLATEAU_WINDOW, plateau_delta: float = GUESS_PLATEAU_DELTA,
+                 max_questions: int = GUESS_MAX_QUESTIONS):
+        if mode not in ("adaptive", "threshold", "server"):
+            raise ValueError(f"GUESS_POLICY inválida: {mode}")
+        self.mode = mode
+        self.threshold = threshold
+        self.min_progression = min_progression
+        self.plateau_window = plateau_window
+        self.plateau_delta = plateau_delta
+        self.max_questions = max_questions
+
+        self.games = 0
+        self.questions = 0
+        self.upstream_calls = 0
+        self.guesses = 0
+        self.correct = 0
+        self.declined = 0
+        # Estrutura: {resultado: jogos}
+        self.outcomes: Dict[str, int] = {}
+
+    def _accepts(self, session) -> bool:
+        if self.mode == "server":
+            return True
+        progress = session.get_progress()
+        if progress >= self.threshold:
+            return True
+        if self.mode == "threshold":
+            return False
+        if session.question_count >= self.max_questions:
+            return True
+        return progress >= self.min_progression or is_plateau(
+            session.progress_trail, self.plateau_window, self.plateau_delta
+        )
+
+    def decide(self, session) -> str:
+        """O que fazer depois de uma resposta do jogador"""
+        if not session.aki.win:
+            return ASK
+        if session.declined or self._accepts(session):
+            # No máximo uma proposta recusada por jogo: cada recusa custa uma chamada
+            return GUESS
+        return DECLINE
+
+    def record_decline(self, session):
+        session.declined += 1
+        self.declined += 1
+        logger.info(
+            "🙈 Proposta recusada cedo - Chat: %s, pergunta %s, progresso %.0f%%",
+            session.chat_id, session.question_count, session.get_progress(),
+            extra={"event": "guess_declined", "chat_id": session.chat_id, "user_id": session.user_id}
+        )
+
+    def record_guess(self, session, correct: bool):
+        """Registra a resposta do jogador a um palpite"""
+        self.guesses += 1
+        session.guesses += 1
+        if correct:
+            self.correct += 1
+            session.outcome = "win"
+
+    def accuracy(self) -> float:
+        return self.correct / self.guesses if self.guesses else 0.0
+
+    def record_game(self, session):
+        """Registra um jogo encerrado e loga perguntas, chamadas ao Akinator e acerto"""
+        outcome = session.outcome or ABANDONED
+        calls = session.transport.requests
+        self.games += 1
+        self.questions += session.question_count
+        self.upstream_calls += calls
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        logger.info(
+            "📊 Fim de jogo (%s) - %s perguntas, %s chamadas ao Akinator, %s palpites, %s recusados - "
+            "média %.1f perguntas/jogo, %.1f chamadas/jogo, acerto %.0f%% (%s)",
+            outcome, session.question_count, calls, session.guesses, session.declined,
+            self.questions / self.games, self.upstream_calls / self.games, self.accuracy() * 100, self.mode,
+            extra={"event": "game_stats", "chat_id": session.chat_id, "user_id": session.user_id}
+        )
+
+    def snapshot(self) -> dict:
+        return {
+            "mode": self.mode,
+            "games": self.games,
+            "questions_per_game": self.questions / self.games if self.games else 0.0,
+            "calls_per_game": self.upstream_calls / self.games if self.games else 0.0,
+            "guesses": self.guesses,
+            "accuracy": self.accuracy(),
+            "declined": self.declined,
+            "outcomes": dict(self.outcomes),
+        }
+
+
+# Política global, compartilhada por todos os bots
+guess_policy = GuessPolicy()
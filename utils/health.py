@@ -0,0 +1,71 @@
+"""Endpoints de saúde (/healthz) e prontidão (/readyz) para a plataforma de deploy"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from database.storage import get_storage
+from utils.endpoint_selector import endpoint_selector
+from utils.http_server import HttpServer, Request, Response
+from utils.loop_monitor import loop_monitor
+from utils.logging_setup import get_log_stats
+from config import AKINATOR_LANGUAGE, READY_MAX_LOOP_LAG, READY_CHECK_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+async def _storage_ready() -> bool:
+    storage = get_storage()
+    if storage is None:
+        return False
+    try:
+        await asyncio.wait_for(storage.ping(), READY_CHECK_TIMEOUT)
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ Prontidão: armazenamento não respondeu: {e}")
+        return False
+
+
+async def readiness() -> dict:
+    """Verifica armazenamento, servidores do Akinator e atraso do event loop"""
+    checks = {
+        "storage": await _storage_ready(),
+        "akinator": endpoint_selector.has_healthy(AKINATOR_LANGUAGE),
+        "event_loop": loop_monitor.current_lag() <= READY_MAX_LOOP_LAG,
+    }
+    return {
+        "ready": all(checks.values()),
+        "checks": checks,
+        "loop": loop_monitor.snapshot(),
+        "logs": get_log_stats(),
+    }
+
+
+async def healthz(request: Request) -> Response:
+    # Responder já prova que o loop está girando; os descartes de log aparecem durante a execução
+    return Response.json({"status": "ok", "loop": loop_monitor.snapshot(), "logs": get_log_stats()})
+
+
+async def readyz(request: Request) -> Response:
+    result = await readiness()
+    return Response.json(result, 200 if result["ready"] else 503)
+
+
+def add_health_routes(server: HttpServer):
+    """Registra /healthz e /readyz em um servidor HTTP"""
+    server.route("GET", "/healthz", healthz)
+    server.route("GET", "/readyz", readyz)
+
+
+async def start_health_server(host: str, port: Optional[int]) -> Optional[HttpServer]:
+    """Inicia o servidor de health check (porta None desativa)"""
+    if port is None:
+        return None
+    server = HttpServer(host, port)
+    add_health_routes(server)
+    try:
+        await server.start()
+    except OSError as e:
+        logger.error(f"❌ Não foi possível abrir o health check em {host}:{port}: {e}")
+        return None
+    return server
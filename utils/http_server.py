@@ -0,0 +1,161 @@
+"""Servidor HTTP mínimo em asyncio (health checks e outras rotas internas)"""
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Limites de leitura de uma requisição
+MAX_HEADER_LINES = 100
+DEFAULT_MAX_BODY = 1024 * 1024
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class Request:
+    """Requisição HTTP recebida"""
+
+    __slots__ = ("method", "path", "query", "headers", "body")
+
+    def __init__(self, method: str, path: str, query: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+
+class Response:
+    """Resposta HTTP a ser enviada"""
+
+    __slots__ = ("status", "body", "content_type", "headers")
+
+    def __init__(self, status: int = 200, body: bytes = b"", content_type: str = "text/plain; charset=utf-8",
+                 headers: Optional[Dict[str, str]] = None):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers or {}
+
+    @classmethod
+    def json(cls, data, status: int = 200) -> "Response":
+        return cls(status, json.dumps(data, default=str).encode(), "application/json")
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class HttpServer:
+    """Servidor HTTP/1.1 com keep-alive e rotas exatas (método, caminho)"""
+
+    def __init__(self, host: str, port: int, max_body: int = DEFAULT_MAX_BODY,
+                 max_connections: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self._routes: Dict[Tuple[str, str], Handler] = {}
+        self._server: Optional[asyncio.Server] = None
+        self._connections = asyncio.Semaphore(max_connections) if max_connections else None
+
+    def route(self, method: str, path: str, handler: Handler):
+        """Registra o handler de uma rota"""
+        self._routes[(method.upper(), path)] = handler
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info(f"🌐 Servidor HTTP ouvindo em {self.host}:{self.port}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise ValueError("linha de requisição inválida")
+
+        headers: Dict[str, str] = {}
+        for _ in range(MAX_HEADER_LINES):
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise ValueError("cabeçalhos demais")
+
+        length = int(headers.get("content-length") or 0)
+        if length > self.max_body:
+            raise OverflowError(length)
+        body = await reader.readexactly(length) if length else b""
+        path, _, query = target.partition("?")
+        return Request(method.upper(), path, query, headers, body)
+
+    async def _dispatch(self, request: Request) -> Response:
+        handler = self._routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self._routes):
+                return Response(405, b"method not allowed")
+            return Response(404, b"not found")
+        try:
+            return await handler(request)
+        except Exception as e:
+            logger.error(f"❌ Erro na rota {request.method} {request.path}: {e}")
+            return Response(500, b"internal error")
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, response: Response, keep_alive: bool):
+        headers = {
+            "Content-Type": response.content_type,
+            "Content-Length": str(len(response.body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+            **response.headers,
+        }
+        head = f"HTTP/1.1 {response.status} {_REASONS.get(response.status, 'Unknown')}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + response.body)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if self._connections is not None:
+            await self._connections.acquire()
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except OverflowError:
+                    self._write_response(writer, Response(413, b"payload too large"), False)
+                    break
+                except (ValueError, asyncio.IncompleteReadError):
+                    self._write_response(writer, Response(400, b"bad request"), False)
+                    break
+                if request is None:
+                    break
+
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                self._write_response(writer, await self._dispatch(request), keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            if self._connections is not None:
+                self._connections.release()
+            writer.close()
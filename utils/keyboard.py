@@ -1,46 +1,58 @@
 """Criação de teclados inline"""
 
+from typing import Optional, Tuple
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 
-def create_game_keyboard() -> InlineKeyboardMarkup:
+def game_callback_data(action: str, game_id: str) -> str:
+    """callback_data de um botão: "<ação>:<id do jogo>" """
+    return f"{action}:{game_id}"
+
+
+def parse_callback_data(data: str) -> Tuple[str, Optional[str]]:
+    """Separa a ação do id do jogo (botões antigos não têm o id)"""
+    action, _, game_id = data.partition(":")
+    return action, game_id or None
+
+
+def create_game_keyboard(game_id: str) -> InlineKeyboardMarkup:
     """Cria o teclado de respostas do jogo"""
     keyboard = [
         [
-            InlineKeyboardButton("✅ Sim", callback_data="yes"),
-            InlineKeyboardButton("❌ Não", callback_data="no")
+            InlineKeyboardButton("✅ Sim", callback_data=game_callback_data("yes", game_id)),
+            InlineKeyboardButton("❌ Não", callback_data=game_callback_data("no", game_id))
         ],
         [
-            InlineKeyboardButton("🤔 Não sei", callback_data="idk")
+            InlineKeyboardButton("🤔 Não sei", callback_data=game_callback_data("idk", game_id))
         ],
         [
-            InlineKeyboardButton("👍 Provavelmente sim", callback_data="probably"),
-            InlineKeyboardButton("👎 Provavelmente não", callback_data="probably_not")
+            InlineKeyboardButton("👍 Provavelmente sim", callback_data=game_callback_data("probably", game_id)),
+            InlineKeyboardButton("👎 Provavelmente não", callback_data=game_callback_data("probably_not", game_id))
         ],
         [
-            InlineKeyboardButton("↩️ Corrigir resposta", callback_data="back")
+            InlineKeyboardButton("↩️ Corrigir resposta", callback_data=game_callback_data("back", game_id))
         ]
     ]
     return InlineKeyboardMarkup(keyboard)
 
 
-def create_guess_keyboard() -> InlineKeyboardMarkup:
+def create_guess_keyboard(game_id: str) -> InlineKeyboardMarkup:
     """Cria o teclado de confirmação do palpite"""
     keyboard = [
         [
-            InlineKeyboardButton("✅ Acertou!", callback_data="correct"),
-            InlineKeyboardButton("❌ Errou", callback_data="wrong")
+            InlineKeyboardButton("✅ Acertou!", callback_data=game_callback_data("correct", game_id)),
+            InlineKeyboardButton("❌ Errou", callback_data=game_callback_data("wrong", game_id))
         ]
     ]
     return InlineKeyboardMarkup(keyboard)
 
 
-def create_continue_keyboard() -> InlineKeyboardMarkup:
+def create_continue_keyboard(game_id: str) -> InlineKeyboardMarkup:
     """Cria o teclado para perguntar se quer continuar após erro"""
     keyboard = [
         [
-            InlineKeyboardButton("🔄 Continuar tentando", callback_data="continue"),
-            InlineKeyboardButton("❌ Desistir", callback_data="give_up")
+            InlineKeyboardButton("🔄 Continuar tentando", callback_data=game_callback_data("continue", game_id)),
+            InlineKeyboardButton("❌ Desistir", callback_data=game_callback_data("give_up", game_id))
         ]
     ]
-    return InlineKeyboardMarkup(keyboard)
\ No newline at end of file
+    return InlineKeyboardMarkup(keyboard)
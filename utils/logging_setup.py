@@ -0,0 +1,118 @@
+"""Logging assíncrono: fila em memória, escrita em thread separada e amostragem"""
+
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+from typing import Dict, Optional
+from config import LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLING
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Campos estruturados aceitos via extra={...}
+STRUCTURED_FIELDS = ("chat_id", "user_id", "handler", "latency")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_stats_lock = threading.Lock()
+_dropped = 0
+_sampled_out: Dict[str, int] = {}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Acrescenta os campos estruturados ao final da linha"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = []
+        for name in STRUCTURED_FIELDS:
+            value = getattr(record, name, None)
+            if value is None:
+                continue
+            if name == "latency":
+                fields.append(f"latency={value * 1000:.1f}ms")
+            else:
+                fields.append(f"{name}={value}")
+        if fields:
+            line = f"{line} | {' '.join(fields)}"
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Descarta parte dos eventos de alto volume (extra={"event": ...})"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        # Avisos e erros nunca são amostrados
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(event, 1.0)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        with _stats_lock:
+            _sampled_out[event] = _sampled_out.get(event, 0) + 1
+        return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que nunca bloqueia: se a fila estiver cheia, descarta e conta"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # A formatação fica para a thread de escrita
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        global _dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with _stats_lock:
+                _dropped += 1
+
+
+def setup_logging():
+    """Configura o logging raiz para escrever através da fila"""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(StructuredFormatter(LOG_FORMAT))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(LOG_SAMPLING))
+
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Escreve o que restou na fila e encerra a thread de escrita"""
+    global _listener
+    if _listener is None:
+        return
+    stats = get_log_stats()
+    if stats["dropped"] or stats["sampled_out"]:
+        logging.getLogger(__name__).info(
+            "📉 Logs descartados: %d (fila cheia), amostrados: %s",
+            stats["dropped"], stats["sampled_out"]
+        )
+    _listener.stop()
+    _listener = None
+
+
+def get_log_stats() -> dict:
+    """Retorna os contadores de descarte"""
+    with _stats_lock:
+        return {"dropped": _dropped, "sampled_out": dict(_sampled_out)}
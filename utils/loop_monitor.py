@@ -0,0 +1,95 @@
+"""Monitor do atraso do event loop, com a pilha do código que o travou"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from config import LOOP_MONITOR_INTERVAL, LOOP_STALL_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """Mede o atraso de agendamento do loop e registra travamentos
+
+    Uma tarefa no loop acorda a cada intervalo e atualiza um batimento; uma thread
+    separada confere o batimento e, se o loop passar do limite sem responder, captura
+    a pilha da thread do loop enquanto ela ainda está presa.
+    """
+
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL, stall_threshold: float = LOOP_STALL_THRESHOLD):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.last_stall_stack: Optional[str] = None
+        self._heartbeat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._stall_reported = False
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Inicia a medição no loop atual"""
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._measure(), name="loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _measure(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.lag = max(0.0, now - expected)
+            self.max_lag = max(self.max_lag, self.lag)
+            self._heartbeat = now
+            if self._stall_reported:
+                logger.warning(
+                    "🧊 Event loop voltou a responder após %.2fs", self.lag,
+                    extra={"event": "loop_stall_end", "latency": self.lag}
+                )
+                self._stall_reported = False
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            blocked = time.monotonic() - self._heartbeat - self.interval
+            if blocked < self.stall_threshold or self._stall_reported:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            self._stall_reported = True
+            self.stalls += 1
+            self.last_stall_stack = "".join(traceback.format_stack(frame))
+            logger.warning(
+                "🧊 Event loop travado há %.2fs - pilha:\n%s", blocked, self.last_stall_stack,
+                extra={"event": "loop_stall", "latency": blocked}
+            )
+
+    def current_lag(self) -> float:
+        """Atraso atual, incluindo um travamento ainda em andamento"""
+        blocked = time.monotonic() - self._heartbeat - self.interval
+        return max(self.lag, blocked, 0.0)
+
+    def snapshot(self) -> dict:
+        return {
+            "lag": round(self.current_lag(), 4),
+            "max_lag": round(self.max_lag, 4),
+            "stalls": self.stalls,
+        }
+
+
+loop_monitor = LoopMonitor()
@@ -1,13 +1,17 @@
 """Formatação de mensagens"""
 
+import html
 from models.session import AkinatorSession
 
 
 def format_question(session: AkinatorSession, question: str) -> str:
     """Formata a pergunta com informações de progresso"""
     progress = int(session.get_progress())
+    # Em grupos pode haver vários jogos ao mesmo tempo: identifica o jogador
+    player = f"🎮 <b>Jogo de {html.escape(session.player_name)}</b>\n" if session.player_name else ""
     
     return (
+        f"{player}"
         f"📋 <b>Pergunta {session.question_count}</b>\n"
         f"📊 <b>Progresso:</b> {progress}%\n"
         f"\n"
@@ -15,6 +19,14 @@ def format_question(session: AkinatorSession, question: str) -> str:
     )
 
 
+def format_retry(session: AkinatorSession, question: str) -> str:
+    """Formata o aviso de resposta não processada, repetindo a pergunta"""
+    return (
+        f"⏳ <i>O Akinator demorou para responder. Toque na sua resposta novamente.</i>\n\n"
+        f"{format_question(session, question)}"
+    )
+
+
 def format_guess(name: str, description: str) -> str:
     """Formata a mensagem de palpite"""
     return (
@@ -36,7 +48,9 @@ def format_welcome(user_name: str) -> str:
         f"\n"
         f"<b>Como jogar:</b>\n"
         f"🎲 /jogar - Iniciar novo jogo\n"
-        f"❌ /cancelar - Cancelar jogo atual\n\n"
+        f"❌ /cancelar - Cancelar jogo atual\n"
+        f"🌐 /idioma - Idioma dos jogos\n"
+        f"🎭 /tema - Tema dos jogos\n\n"
         f"\n"
         f"Pronto? Use /jogar para começar!"
     )
@@ -71,4 +85,17 @@ def format_give_up() -> str:
         f"\n"
         f"Você me venceu desta vez! Parabéns! 🏆\n\n"
         f"Use /jogar para uma nova partida."
-    )
\ No newline at end of file
+    )
+
+def format_pool_stats(stats: list) -> str:
+    """Resumo das conexões com a Bot API"""
+    lines = ["🔌 <b>Conexões com o Telegram</b>"]
+    for item in stats:
+        lines.append(
+            f"\n<b>{item['name']}</b> ({item['in_use']}/{item['pool_size']} em uso, "
+            f"{item['waiting']} aguardando)\n"
+            f"Requisições: {item['requests']} - esperaram: {item['waited']}\n"
+            f"Espera média: {item['avg_wait'] * 1000:.1f} ms - máxima: {item['max_wait'] * 1000:.0f} ms\n"
+            f"Sem conexão livre (timeout): {item['timeouts']}"
+        )
+    return "\n".join(lines)
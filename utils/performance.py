@@ -0,0 +1,75 @@
+"""Modo de alto desempenho: event loop e codec JSON mais rápidos, quando instalados"""
+
+import asyncio
+import json
+import logging
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Decodificador usado pela camada de requisições (None = json padrão)
+fast_json_loads: Optional[Callable] = None
+
+
+class _FastJsonModule:
+    """Substitui o módulo json nos pontos de serialização da python-telegram-bot"""
+
+    def __init__(self, dumps: Callable, loads: Callable):
+        self._dumps = dumps
+        self.loads = loads
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            # Opções específicas do json padrão: mantém o comportamento original
+            return json.dumps(obj, **kwargs)
+        return self._dumps(obj)
+
+
+def install_fast_event_loop() -> str:
+    """Instala o uvloop como event loop, se disponível"""
+    try:
+        import uvloop
+    except ImportError:
+        return "asyncio"
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return "uvloop"
+
+
+def enable_fast_json() -> str:
+    """Troca o codec JSON da Bot API pelo orjson, se disponível"""
+    global fast_json_loads
+    try:
+        import orjson
+    except ImportError:
+        return "json"
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    # A python-telegram-bot não tem gancho público para a serialização dos parâmetros
+    try:
+        from telegram.request import _requestdata, _requestparameter
+        fast_module = _FastJsonModule(dumps, orjson.loads)
+        _requestparameter.json = fast_module
+        _requestdata.json = fast_module
+    except (ImportError, AttributeError) as e:
+        logger.warning(f"⚠️ Não foi possível trocar o codificador JSON: {e}")
+
+    fast_json_loads = orjson.loads
+    return "orjson"
+
+
+def disable_fast_json():
+    """Volta ao json padrão"""
+    global fast_json_loads
+    from telegram.request import _requestdata, _requestparameter
+    _requestparameter.json = json
+    _requestdata.json = json
+    fast_json_loads = None
+
+
+def enable_performance_mode() -> dict:
+    """Ativa o que estiver instalado e retorna os componentes em uso"""
+    modes = {"loop": install_fast_event_loop(), "json": enable_fast_json()}
+    logger.info(f"🚀 Modo de desempenho: loop={modes['loop']}, json={modes['json']}")
+    return modes
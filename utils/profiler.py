@@ -0,0 +1,128 @@
+"""Profiler por amostragem (pilhas colapsadas para flamegraph) e dump das tarefas asyncio"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Prefixo removido dos caminhos para encurtar os nomes das funções
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+
+def _frame_name(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_ROOT):
+        filename = filename[len(_ROOT):]
+    else:
+        # Bibliotecas: a partir de site-packages (ou só o nome do arquivo)
+        marker = filename.rfind("site-packages" + os.sep)
+        filename = filename[marker + 14:] if marker >= 0 else os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Amostra as pilhas de todas as threads em intervalos fixos a partir de uma thread separada"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.samples[";".join(reversed(stack))] += 1
+        self.sample_count += 1
+
+    def _run(self):
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            self._sample()
+            next_sample += self.interval
+            self._stop.wait(max(0.0, next_sample - time.perf_counter()))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """Pilhas no formato colapsado (flamegraph.pl, speedscope, inferno)"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def _awaiting_chain(coro) -> list:
+    """Segue a cadeia de awaits de uma corrotina até o que ela está esperando"""
+    chain = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is not None:
+            chain.append(f"{_frame_name(frame.f_code)} linha {frame.f_lineno}")
+        awaited = getattr(coro, "cr_await", None) or getattr(coro, "ag_await", None)
+        if awaited is None:
+            break
+        if not hasattr(awaited, "cr_frame") and not hasattr(awaited, "ag_frame"):
+            # Future, Task ou outro awaitable: é o ponto de espera
+            description = repr(awaited)[:300] if isinstance(awaited, asyncio.Future) else type(awaited).__name__
+            chain.append(f"aguardando {description}")
+            break
+        coro = awaited
+    return chain
+
+
+def dump_tasks() -> str:
+    """Lista as tarefas asyncio pendentes e onde cada uma está parada"""
+    tasks = sorted(asyncio.all_tasks(), key=lambda task: task.get_name())
+    lines = [f"{len(tasks)} tarefas pendentes\n"]
+    for task in tasks:
+        coro = task.get_coro()
+        lines.append(f"== {task.get_name()} - {getattr(coro, '__qualname__', coro)}")
+        lines.extend(f"    {step}" for step in _awaiting_chain(coro))
+        lines.append("")
+    return "\n".join(lines)
+
+
+# Perfil em andamento (apenas um por vez)
+_running: Optional[SamplingProfiler] = None
+
+
+def start_profiling(interval: float) -> Optional[SamplingProfiler]:
+    """Inicia a amostragem; retorna None se já houver um perfil em andamento"""
+    global _running
+    if _running is not None:
+        return None
+    _running = SamplingProfiler(interval)
+    _running.start()
+    return _running
+
+
+async def finish_profiling(profiler: SamplingProfiler, seconds: float) -> SamplingProfiler:
+    """Aguarda a duração do perfil sem bloquear o event loop e encerra a amostragem"""
+    global _running
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+        _running = None
+    logger.info(f"🔬 Perfil concluído - {profiler.sample_count} amostras em {seconds:.0f}s")
+    return profiler
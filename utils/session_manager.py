@@ -1,53 +1,145 @@
 """Gerenciador de sessões ativas"""
 
 import asyncio
+import html
 import logging
-from typing import Dict, Optional
-from telegram.ext import Application
+import secrets
+from typing import Dict, List, Optional
 from models.session import AkinatorSession
-from config import CLEANUP_INTERVAL
+from utils.bot_registry import current_bot_id, get_application
+from utils.guess_policy import guess_policy
+from config import CLEANUP_INTERVAL, AKINATOR_LANGUAGE, AKINATOR_THEME
 
 logger = logging.getLogger(__name__)
 
-# Armazenamento de sessões ativas
-# Estrutura: {chat_id: AkinatorSession}
-active_sessions: Dict[int, AkinatorSession] = {}
+# Armazenamento de sessões ativas, separado por bot, com um jogo por jogador em cada chat
+# Estrutura: {bot_id: {chat_id: {user_id: AkinatorSession}}}
+sessions_by_bot: Dict[Optional[int], Dict[int, Dict[int, AkinatorSession]]] = {}
 
-# Referência para a aplicação do bot
-_bot_app: Optional[Application] = None
+# Índice pelo id do jogo (usado pelos botões)
+# Estrutura: {bot_id: {game_id: AkinatorSession}}
+games_by_bot: Dict[Optional[int], Dict[str, AkinatorSession]] = {}
 
 
-def set_bot_application(app: Application):
-    """Define a referência da aplicação do bot"""
-    global _bot_app
-    _bot_app = app
+def _active_sessions() -> Dict[int, Dict[int, AkinatorSession]]:
+    """Retorna as sessões do bot atual"""
+    bot_id = current_bot_id()
+    sessions = sessions_by_bot.get(bot_id)
+    if sessions is None:
+        sessions = sessions_by_bot[bot_id] = {}
+    return sessions
 
 
-def create_session(user_id: int, chat_id: int) -> AkinatorSession:
-    """Cria uma nova sessão"""
-    session = AkinatorSession(user_id, chat_id)
-    active_sessions[chat_id] = session
-    logger.info(f"✅ Nova sessão criada - Chat: {chat_id}, User: {user_id}")
+def _active_games() -> Dict[str, AkinatorSession]:
+    """Retorna o índice de jogos do bot atual"""
+    bot_id = current_bot_id()
+    games = games_by_bot.get(bot_id)
+    if games is None:
+        games = games_by_bot[bot_id] = {}
+    return games
+
+
+def _new_game_id(games: Dict[str, AkinatorSession]) -> str:
+    # Aleatório: botões de um jogo anterior (mesmo de antes de reiniciar o bot) não valem no novo
+    while True:
+        game_id = secrets.token_hex(4)
+        if game_id not in games:
+            return game_id
+
+
+def _remove(bot_id: Optional[int], session: AkinatorSession) -> bool:
+    """Remove a sessão dos índices, se ainda for a ativa do jogador"""
+    chat_sessions = sessions_by_bot.get(bot_id, {}).get(session.chat_id)
+    if not chat_sessions or chat_sessions.get(session.user_id) is not session:
+        return False
+    del chat_sessions[session.user_id]
+    if not chat_sessions:
+        del sessions_by_bot[bot_id][session.chat_id]
+    games_by_bot.get(bot_id, {}).pop(session.game_id, None)
+    session.close()
+    guess_policy.record_game(session)
+    return True
+
+
+def create_session(user_id: int, chat_id: int,
+                   language: str = AKINATOR_LANGUAGE, theme: str = AKINATOR_THEME,
+                   player_name: Optional[str] = None) -> AkinatorSession:
+    """Cria uma nova sessão (substitui a do jogador no chat, se houver)"""
+    previous = get_session(chat_id, user_id)
+    if previous is not None:
+        _remove(current_bot_id(), previous)
+
+    games = _active_games()
+    session = AkinatorSession(user_id, chat_id, language, theme, player_name)
+    session.bot_id = current_bot_id()
+    session.game_id = _new_game_id(games)
+    _active_sessions().setdefault(chat_id, {})[user_id] = session
+    games[session.game_id] = session
+    logger.info(
+        "✅ Nova sessão criada - Chat: %s, User: %s, Jogo: %s", chat_id, user_id, session.game_id,
+        extra={"event": "session_created", "chat_id": chat_id, "user_id": user_id}
+    )
     return session
 
 
-def get_session(chat_id: int) -> Optional[AkinatorSession]:
-    """Retorna a sessão de um chat, se existir"""
-    return active_sessions.get(chat_id)
+def get_session(chat_id: int, user_id: int) -> Optional[AkinatorSession]:
+    """Retorna a sessão de um jogador em um chat, se existir"""
+    return _active_sessions().get(chat_id, {}).get(user_id)
+
+
+def get_game(game_id: str) -> Optional[AkinatorSession]:
+    """Retorna a sessão pelo id do jogo (callback_data dos botões)"""
+    return _active_games().get(game_id)
+
+
+def chat_sessions(chat_id: int) -> List[AkinatorSession]:
+    """Sessões ativas em um chat"""
+    return list(_active_sessions().get(chat_id, {}).values())
+
 
+def count_chat_sessions(chat_id: int) -> int:
+    """Quantidade de jogos ativos em um chat"""
+    return len(_active_sessions().get(chat_id, {}))
 
-def delete_session(chat_id: int) -> bool:
-    """Remove uma sessão"""
-    if chat_id in active_sessions:
-        del active_sessions[chat_id]
-        logger.info(f"🗑️ Sessão removida - Chat: {chat_id}")
+
+def delete_session(chat_id: int, user_id: int) -> bool:
+    """Remove a sessão de um jogador"""
+    session = get_session(chat_id, user_id)
+    if session is not None and _remove(current_bot_id(), session):
+        logger.info(
+            "🗑️ Sessão removida - Chat: %s, User: %s", chat_id, user_id,
+            extra={"event": "session_deleted", "chat_id": chat_id, "user_id": user_id}
+        )
         return True
     return False
 
 
-def has_active_session(chat_id: int) -> bool:
-    """Verifica se existe uma sessão ativa em um chat"""
-    return chat_id in active_sessions
+def delete_chat_sessions(chat_id: int) -> int:
+    """Remove todas as sessões de um chat e retorna quantas eram"""
+    bot_id = current_bot_id()
+    removed = sum(_remove(bot_id, session) for session in chat_sessions(chat_id))
+    if removed:
+        logger.info(
+            "🗑️ %s sessões removidas - Chat: %s", removed, chat_id,
+            extra={"event": "session_deleted", "chat_id": chat_id}
+        )
+    return removed
+
+
+def has_active_session(chat_id: int, user_id: int) -> bool:
+    """Verifica se um jogador tem uma sessão ativa em um chat"""
+    return user_id in _active_sessions().get(chat_id, {})
+
+
+def clear_sessions():
+    """Remove todas as sessões de todos os bots"""
+    for sessions in sessions_by_bot.values():
+        for chat in sessions.values():
+            for session in chat.values():
+                session.close()
+        sessions.clear()
+    for games in games_by_bot.values():
+        games.clear()
 
 
 async def cleanup_expired_sessions():
@@ -55,20 +147,33 @@ async def cleanup_expired_sessions():
     while True:
         await asyncio.sleep(CLEANUP_INTERVAL)
         expired = [
-            (chat_id, session) for chat_id, session in active_sessions.items()
+            (bot_id, session)
+            for bot_id, sessions in sessions_by_bot.items()
+            for chat in sessions.values()
+            for session in chat.values()
             if session.is_expired()
         ]
-        
-        for chat_id, session in expired:
-            logger.info(f"⏱️ Sessão expirada removida - Chat: {chat_id}")
-            
-            # Envia mensagem de notificação
-            if _bot_app:
+
+        for bot_id, session in expired:
+            chat_id = session.chat_id
+            logger.info(
+                "⏱️ Sessão expirada removida - Chat: %s, User: %s", chat_id, session.user_id,
+                extra={"chat_id": chat_id, "user_id": session.user_id}
+            )
+
+            # Em grupos, diz de quem era o jogo
+            title = "Jogo encerrado por inatividade!"
+            if session.player_name:
+                title = f"Jogo de {html.escape(session.player_name)} encerrado por inatividade!"
+
+            # Envia mensagem de notificação pelo bot dono da sessão
+            app = get_application(bot_id)
+            if app:
                 try:
-                    await _bot_app.bot.send_message(
+                    await app.bot.send_message(
                         chat_id=chat_id,
                         text=(
-                            "⏱️ <b>Jogo encerrado por inatividade!</b>\n\n"
+                            f"⏱️ <b>{title}</b>\n\n"
                             "O tempo limite foi atingido.\n"
                             "Use /jogar para começar um novo jogo."
                         ),
@@ -76,5 +181,6 @@ async def cleanup_expired_sessions():
                     )
                 except Exception as e:
                     logger.error(f"❌ Erro ao notificar expiração - Chat {chat_id}: {e}")
-            
-            delete_session(chat_id)
\ No newline at end of file
+
+            # Só remove se não foi substituída por um novo jogo durante o envio
+            _remove(bot_id, session)
@@ -0,0 +1,227 @@
+"""Camada de requisições da Bot API"""
+
+import asyncio
+import logging
+import time
+from importlib.util import find_spec
+from typing import Dict, Optional, Tuple
+import httpx
+from telegram._utils.defaultvalue import DefaultValue
+from telegram._utils.types import JSONDict
+from telegram.error import Forbidden, TelegramError, TimedOut
+from telegram.request import BaseRequest, HTTPXRequest, RequestData
+
+from utils import performance
+from utils.tracing import span
+from utils.deadline import remaining
+from utils.dead_chats import is_chat_dead, dead_chat_reason, mark_chat_dead
+from config import TELEGRAM_TIMEOUT, TELEGRAM_MIN_TIMEOUT, TELEGRAM_POOL_WAIT_WARNING
+
+logger = logging.getLogger(__name__)
+
+
+def _clamp(value, default: Optional[float], budget: float) -> Optional[float]:
+    """Limita um timeout ao orçamento disponível"""
+    if isinstance(value, DefaultValue):
+        value = default
+    if value is None:
+        return budget
+    return min(value, budget)
+
+
+class PoolStats:
+    """Uso e espera por conexões de um tipo de requisição (somado entre os bots)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool_size = 0
+        self.requests = 0
+        self.waited = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.in_use = 0
+        self.waiting = 0
+
+    def record_wait(self, seconds: float):
+        self.requests += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+        if seconds >= 0.001:
+            self.waited += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "pool_size": self.pool_size,
+            "requests": self.requests,
+            "waited": self.waited,
+            "timeouts": self.timeouts,
+            "avg_wait": self.total_wait / self.requests if self.requests else 0.0,
+            "max_wait": self.max_wait,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+        }
+
+
+# Parâmetros que indicam um segundo chat na chamada (ex.: copyMessage, forwardMessage)
+_OTHER_CHAT_PARAMETERS = frozenset({"from_chat_id", "sender_chat_id"})
+
+
+# Estrutura: {nome: PoolStats}
+_pool_stats: Dict[str, PoolStats] = {}
+
+
+def get_pool_stats() -> list:
+    """Retorna as métricas de espera por conexão de cada tipo de requisição"""
+    return [stats.snapshot() for stats in _pool_stats.values()]
+
+
+def _http_version(http2: bool) -> str:
+    """HTTP/2 só quando o pacote h2 está instalado"""
+    if http2 and find_spec("h2") is None:
+        logger.warning("⚠️ HTTP/2 pedido, mas o pacote h2 não está instalado; usando HTTP/1.1")
+        return "1.1"
+    return "2" if http2 else "1.1"
+
+
+class BotRequest(HTTPXRequest):
+    """HTTPXRequest que registra cada chamada da Bot API como um span e respeita o prazo do update
+
+    O pool de conexões é controlado por um semáforo do mesmo tamanho, o que permite
+    medir quanto tempo cada chamada esperou por uma conexão livre. Chamadas para chats
+    em que o bot foi removido ou bloqueado falham antes de sair (ver utils.dead_chats).
+    """
+
+    def __init__(
+        self,
+        name: str = "requests",
+        pool_size: int = 256,
+        connect_timeout: Optional[float] = 5.0,
+        read_timeout: Optional[float] = 5.0,
+        write_timeout: Optional[float] = 5.0,
+        media_write_timeout: Optional[float] = 20.0,
+        pool_timeout: Optional[float] = 1.0,
+        http2: bool = False,
+        max_keepalive: Optional[int] = None,
+        keepalive_expiry: Optional[float] = 5.0,
+        bot_id: Optional[int] = None,
+    ):
+        super().__init__(
+            connection_pool_size=pool_size,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            write_timeout=write_timeout,
+            media_write_timeout=media_write_timeout,
+            pool_timeout=pool_timeout,
+            http_version=_http_version(http2),
+            httpx_kwargs={"limits": httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size if max_keepalive is None else max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            )},
+        )
+        self.name = name
+        self.bot_id = bot_id
+        self._slots = asyncio.Semaphore(pool_size)
+        self.stats = _pool_stats.get(name)
+        if self.stats is None:
+            self.stats = _pool_stats[name] = PoolStats(name)
+        self.stats.pool_size += pool_size
+
+    async def _acquire_slot(self, pool_timeout: Optional[float], endpoint: str) -> float:
+        """Aguarda uma conexão livre e retorna o tempo de espera"""
+        stats = self.stats
+        started = time.perf_counter()
+        stats.waiting += 1
+        try:
+            if pool_timeout is None:
+                await self._slots.acquire()
+            else:
+                await asyncio.wait_for(self._slots.acquire(), pool_timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            logger.warning(
+                "⏳ Nenhuma conexão livre para %s após %.1fs (%s)", endpoint, pool_timeout, self.name,
+                extra={"event": "pool_timeout"}
+            )
+            raise TimedOut("Pool timeout: All connections in the connection pool are occupied.")
+        finally:
+            stats.waiting -= 1
+
+        wait = time.perf_counter() - started
+        stats.record_wait(wait)
+        stats.in_use += 1
+        if wait >= TELEGRAM_POOL_WAIT_WARNING:
+            logger.warning(
+                "⏳ %s esperou %.2fs por uma conexão (%s)", endpoint, wait, self.name,
+                extra={"event": "pool_wait", "latency": wait}
+            )
+        return wait
+
+    def parse_json_payload(self, payload: bytes) -> JSONDict:
+        """Decodifica a resposta com o codec rápido quando o modo de desempenho está ativo"""
+        if performance.fast_json_loads is None:
+            return super().parse_json_payload(payload)
+        try:
+            return performance.fast_json_loads(payload)
+        except ValueError as exc:
+            logger.error(f"❌ JSON inválido recebido do Telegram: {payload[:200]!r}")
+            raise TelegramError("Invalid server response") from exc
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=BaseRequest.DEFAULT_NONE,
+        write_timeout=BaseRequest.DEFAULT_NONE,
+        connect_timeout=BaseRequest.DEFAULT_NONE,
+        pool_timeout=BaseRequest.DEFAULT_NONE,
+    ) -> Tuple[int, bytes]:
+        left = remaining()
+        if left is not None:
+            # Dentro de um update: nunca passa do prazo, mas garante um mínimo para avisar o jogador
+            budget = max(min(left, TELEGRAM_TIMEOUT), TELEGRAM_MIN_TIMEOUT)
+            defaults = self._client.timeout
+            read_timeout = _clamp(read_timeout, defaults.read, budget)
+            has_files = request_data is not None and request_data.contains_files
+            write_default = self._media_write_timeout if has_files else defaults.write
+            write_timeout = _clamp(write_timeout, write_default, budget)
+            connect_timeout = _clamp(connect_timeout, defaults.connect, budget)
+            pool_timeout = _clamp(pool_timeout, defaults.pool, budget)
+
+        endpoint = url.rsplit("/", 1)[-1]
+        chat_id = request_data.parameters.get("chat_id") if request_data is not None else None
+        if not isinstance(chat_id, int):
+            # @canal (str) não é rastreado
+            chat_id = None
+        elif is_chat_dead(self.bot_id, chat_id):
+            raise Forbidden("Chat inativo: o bot foi removido ou bloqueado")
+        # Com outro chat na chamada (cópia ou encaminhamento), o erro pode ser sobre ele
+        marks_dead = chat_id is not None and not _OTHER_CHAT_PARAMETERS & request_data.parameters.keys()
+
+        with span(f"telegram.{endpoint}") as current:
+            if isinstance(pool_timeout, DefaultValue):
+                pool_timeout = self._client.timeout.pool
+            wait = await self._acquire_slot(pool_timeout, endpoint)
+            try:
+                code, payload = await super().do_request(
+                    url,
+                    method,
+                    request_data=request_data,
+                    read_timeout=read_timeout,
+                    write_timeout=write_timeout,
+                    connect_timeout=connect_timeout,
+                    pool_timeout=pool_timeout,
+                )
+            finally:
+                self._slots.release()
+                self.stats.in_use -= 1
+            if current is not None:
+                current.set(status=code, pool_wait=round(wait, 4))
+            if marks_dead and code in (400, 403):
+                reason = dead_chat_reason(code, payload)
+                if reason:
+                    mark_chat_dead(self.bot_id, chat_id, reason)
+            return code, payload
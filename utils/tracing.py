@@ -0,0 +1,216 @@
+"""Rastreamento por update: um trace por update com spans para MongoDB, Akinator e Bot API"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional
+from config import (
+    TRACE_ENABLED,
+    TRACE_EXPORT_FILE,
+    TRACE_EXPORT_MAX_BYTES,
+    TRACE_EXPORT_BACKUPS,
+    TRACE_COLLECTOR_URL,
+    TRACE_SAMPLE_RATE,
+    TRACE_SLOW_THRESHOLD,
+)
+
+logger = logging.getLogger(__name__)
+
+# Span ativo no contexto atual (propagado para asyncio.to_thread)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """Uma operação medida dentro de um trace"""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start", "end", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def set(self, **attributes):
+        """Adiciona atributos ao span"""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "offset_ms": round((self.start - self.trace.root.start) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """Conjunto de spans de um update"""
+
+    def __init__(self, name: str, attributes: dict):
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self.spans: List[Span] = []
+        self.root = Span(self, name, None, attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "timestamp": self.started_at,
+            "root": self.root.to_dict(),
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+class TraceExporter:
+    """Exporta os traces mantidos em uma thread separada (arquivo JSON lines e/ou coletor HTTP)
+
+    O arquivo é rotacionado ao passar de max_bytes, mantendo `backups` cópias antigas.
+    """
+
+    def __init__(self, path: Optional[str], collector_url: Optional[str], max_queue: int = 1000,
+                 max_bytes: int = TRACE_EXPORT_MAX_BYTES, backups: int = TRACE_EXPORT_BACKUPS):
+        self.path = path
+        self.collector_url = collector_url
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self.exported = 0
+        self.dropped = 0
+
+    def export(self, trace: Trace):
+        """Enfileira um trace sem bloquear"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(trace.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 100:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                logger.error(f"❌ Erro ao exportar traces: {e}")
+
+    def _rotate(self):
+        """Renomeia traces.jsonl -> .1 -> .2 ..., descartando a mais antiga"""
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def _write(self, batch: List[dict]):
+        if self.path:
+            if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                for item in batch:
+                    f.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+        if self.collector_url:
+            import httpx
+            httpx.post(self.collector_url, json={"traces": batch}, timeout=5.0)
+
+
+_exporter = TraceExporter(TRACE_EXPORT_FILE, TRACE_COLLECTOR_URL)
+
+
+def _should_keep(trace: Trace) -> bool:
+    """Traces lentos ou com erro são sempre mantidos; os demais são amostrados"""
+    if trace.root.duration >= TRACE_SLOW_THRESHOLD or trace.root.error:
+        return True
+    if any(span.error for span in trace.spans):
+        return True
+    return random.random() < TRACE_SAMPLE_RATE
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """Abre o span raiz de um update"""
+    if not TRACE_ENABLED:
+        yield None
+        return
+
+    trace = Trace(name, attributes)
+    token = _current_span.set(trace.root)
+    try:
+        yield trace.root
+    except BaseException as e:
+        trace.root.error = repr(e)
+        raise
+    finally:
+        trace.root.end = time.perf_counter()
+        _current_span.reset(token)
+        if _should_keep(trace):
+            _exporter.export(trace)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Abre um span filho do span atual (não faz nada fora de um trace)"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    parent.trace.spans.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = repr(e)
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def current_span() -> Optional[Span]:
+    """Retorna o span ativo"""
+    return _current_span.get()
+
+
+def traced(name: str):
+    """Decorator que envolve uma corrotina em um span"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,151 @@
+"""Gravação do tráfego real (updates anonimizados e respostas do Akinator) para replay"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+from telegram import Update
+
+from config import TRAFFIC_RECORD_FILE
+
+logger = logging.getLogger(__name__)
+
+# Chat (já anonimizado) do update sendo gravado, propagado para as threads do Akinator
+_recording_chat: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("recording_chat", default=None)
+
+# Campos com dados pessoais: substituídos por um texto fixo
+_PERSONAL_FIELDS = {"first_name", "last_name", "username", "title", "bio", "description", "invite_link"}
+
+# Campos removidos por completo
+_DROPPED_FIELDS = {"contact", "location", "venue", "phone_number", "photo", "document", "sticker", "voice", "video"}
+
+
+def _anonymize_text(text: str) -> str:
+    """Mantém comandos do bot (com argumentos, ex.: /idioma en); o resto vira texto do mesmo tamanho"""
+    command = text.split()[0].split("@")[0] if text.startswith("/") else ""
+    if command and command != "/broadcast":
+        return text
+    return command + "x" * (len(text) - len(command))
+
+
+class TrafficRecorder:
+    """Grava o tráfego em JSON lines a partir de uma thread separada"""
+
+    def __init__(self, path: Optional[str], max_queue: int = 10000):
+        self.path = path
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._started: Optional[float] = None
+        # Sal aleatório por gravação: os IDs são consistentes no arquivo, mas não reversíveis
+        self._salt = os.urandom(16)
+        self.recorded = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def anonymize_id(self, value: int) -> int:
+        """Troca um ID do Telegram por outro estável dentro da gravação (mantém o sinal)"""
+        digest = hashlib.blake2b(str(abs(value)).encode(), key=self._salt, digest_size=6).digest()
+        anonymous = int.from_bytes(digest, "big") % 10 ** 12 + 1
+        return -anonymous if value < 0 else anonymous
+
+    def _anonymize(self, value):
+        if isinstance(value, list):
+            return [self._anonymize(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+
+        result = {}
+        # Dicionários de usuário ("is_bot") e de chat ("type") têm o ID trocado
+        is_entity = "id" in value and ("is_bot" in value or "type" in value)
+        for key, item in value.items():
+            if key in _DROPPED_FIELDS:
+                continue
+            if key in _PERSONAL_FIELDS:
+                result[key] = "anon"
+            elif key == "id" and is_entity:
+                result[key] = self.anonymize_id(item)
+            elif key in ("user_id", "chat_id") and isinstance(item, int):
+                result[key] = self.anonymize_id(item)
+            elif key == "chat_instance":
+                result[key] = hashlib.blake2b(str(item).encode(), key=self._salt, digest_size=8).hexdigest()
+            elif key in ("text", "caption") and isinstance(item, str):
+                result[key] = _anonymize_text(item)
+            else:
+                result[key] = self._anonymize(item)
+        return result
+
+    def _offset(self) -> float:
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+        return round(now - self._started, 6)
+
+    def _put(self, item: dict):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="traffic-recorder", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    @contextmanager
+    def record_update(self, update: object):
+        """Grava um update e associa a ele as chamadas ao Akinator feitas durante o processamento"""
+        if not self.enabled or not isinstance(update, Update):
+            yield
+            return
+
+        chat = self.anonymize_id(update.effective_chat.id) if update.effective_chat else None
+        self._put({"t": self._offset(), "type": "update", "chat": chat, "update": self._anonymize(update.to_dict())})
+        token = _recording_chat.set(chat)
+        try:
+            yield
+        finally:
+            _recording_chat.reset(token)
+
+    def record_akinator(self, path: str, response, elapsed: float):
+        """Grava uma resposta do Akinator com o tempo que levou"""
+        if not self.enabled:
+            return
+        self._put({
+            "t": self._offset(),
+            "type": "akinator",
+            "chat": _recording_chat.get(),
+            "path": path,
+            "status": response.status_code,
+            "elapsed": round(elapsed, 6),
+            "body": response.text,
+        })
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 100:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+                self.recorded += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                logger.error(f"❌ Erro ao gravar tráfego: {e}")
+
+    def _write(self, batch: List[dict]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for item in batch:
+                f.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+
+
+recorder = TrafficRecorder(TRAFFIC_RECORD_FILE)
@@ -0,0 +1,151 @@
+"""Processamento concorrente de updates com prioridade para os jogos em andamento"""
+
+import asyncio
+import heapq
+import itertools
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from utils.keyboard import parse_callback_data
+
+# Prioridades (menor = atendido antes)
+PRIORITY_GAME = 0   # botões de jogos em andamento
+PRIORITY_PLAY = 1   # início e cancelamento de jogos
+PRIORITY_OTHER = 2  # /start, configurações, comandos do dono, etc.
+
+_PLAY_COMMANDS = {"/jogar", "/cancelar"}
+
+
+def command_of(update: Update) -> Optional[str]:
+    """Comando de uma mensagem de texto (sem o @bot), se houver"""
+    message = update.message
+    if message is None or not message.text or not message.text.startswith("/"):
+        return None
+    return message.text.split()[0].split("@")[0].lower()
+
+
+def update_priority(update: object) -> int:
+    """Prioridade de um update na fila"""
+    if not isinstance(update, Update):
+        return PRIORITY_OTHER
+    if update.callback_query is not None:
+        _, game_id = parse_callback_data(update.callback_query.data or "")
+        return PRIORITY_GAME if game_id else PRIORITY_OTHER
+    if command_of(update) in _PLAY_COMMANDS:
+        return PRIORITY_PLAY
+    return PRIORITY_OTHER
+
+
+def _player_key(update: object) -> Optional[Tuple[int, int]]:
+    if not isinstance(update, Update) or not update.effective_chat or not update.effective_user:
+        return None
+    return update.effective_chat.id, update.effective_user.id
+
+
+class PriorityUpdateProcessor(BaseUpdateProcessor):
+    """Processa até `workers` updates ao mesmo tempo, escolhendo da fila pela prioridade
+
+    Updates de um mesmo jogador (chat, usuário) continuam sendo processados um de cada
+    vez e na ordem de chegada, como no processamento sequencial.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        # O semáforo da classe base limita os updates pendentes; as vagas de execução são daqui
+        super().__init__(max(workers, max_pending))
+        self.workers = workers
+        self._running = 0
+        self._waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        # {(chat_id, user_id): [lock, updates usando]}
+        self._players: Dict[Tuple[int, int], list] = {}
+        # Sinalizado a cada update concluído (vaga liberada no limite da Application)
+        self._finished = asyncio.Event()
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _prune(self):
+        """Descarta do topo da fila os updates cancelados enquanto esperavam"""
+        while self._waiting and self._waiting[0][2].done():
+            heapq.heappop(self._waiting)
+
+    async def _acquire(self, priority: int):
+        self._prune()
+        if self._running < self.workers and not self._waiting:
+            self._running += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._order), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # A vaga pode ter sido passada para este update logo antes do cancelamento
+            if future.done() and not future.cancelled():
+                self._release()
+            else:
+                self._prune()
+            raise
+
+    def _release(self):
+        # Passa a vaga direto para o próximo da fila (os cancelados são descartados)
+        self._prune()
+        if self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            future.set_result(None)
+            self._prune()
+            return
+        self._running -= 1
+
+    async def _run(self, priority: int, coroutine: Awaitable[Any]):
+        try:
+            await self._acquire(priority)
+        except asyncio.CancelledError:
+            getattr(coroutine, "close", lambda: None)()
+            raise
+        try:
+            await coroutine
+        finally:
+            self._release()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        try:
+            await self._process(update, coroutine)
+        finally:
+            # Quem espera acorda depois que a classe base devolve a vaga do semáforo
+            self._finished.set()
+
+    async def _process(self, update: object, coroutine: Awaitable[Any]):
+        priority = update_priority(update)
+        key = _player_key(update)
+        if key is None:
+            await self._run(priority, coroutine)
+            return
+
+        entry = self._players.get(key)
+        if entry is None:
+            entry = self._players[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await self._run(priority, coroutine)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._players[key]
+
+    async def wait_for_finished(self):
+        """Aguarda o próximo update terminar"""
+        self._finished.clear()
+        await self._finished.wait()
+
+    def snapshot(self) -> dict:
+        """Updates em execução e na fila, por prioridade"""
+        waiting = [0, 0, 0]
+        for priority, _, future in self._waiting:
+            if not future.done():
+                waiting[priority] += 1
+        return {"running": self._running, "workers": self.workers, "waiting": waiting}
@@ -0,0 +1,171 @@
+"""Recebimento dos updates por webhook, com fila limitada por bot
+
+O Telegram recebe a resposta assim que o update entra na fila; a conversão para
+Update e o processamento acontecem depois, na ordem de chegada. A fila só é
+esvaziada enquanto a Application tem vaga (UPDATE_MAX_PENDING); com ela cheia,
+os updates esperam aqui e, acima de WEBHOOK_QUEUE_SIZE, o Telegram reenvia.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import secrets
+from typing import Dict, Optional, Sequence
+from telegram import Update
+from telegram.ext import Application
+
+from utils import performance
+from utils.bot_registry import bot_id_from_token
+from utils.http_server import HttpServer, Request, Response
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+# Tamanho máximo de um update (os maiores são mensagens com muitas entidades)
+_MAX_BODY = 256 * 1024
+
+def webhook_path(bot_id: Optional[int]) -> str:
+    """Caminho do webhook de um bot (o token nunca aparece na URL)"""
+    return f"/webhook/{bot_id}"
+
+
+def new_secret() -> str:
+    """Segredo aleatório para o cabeçalho X-Telegram-Bot-Api-Secret-Token"""
+    return secrets.token_urlsafe(32)
+
+
+def _loads(body: bytes):
+    if performance.fast_json_loads is not None:
+        return performance.fast_json_loads(body)
+    return json.loads(body)
+
+
+class WebhookQueue:
+    """Fila de updates de um bot: recebidos pelo servidor, entregues à Application"""
+
+    def __init__(self, app: Application, secret: str, max_size: int):
+        self.app = app
+        self.secret = secret.encode()
+        self.queue: asyncio.Queue = asyncio.Queue(max_size)
+        self.received = 0
+        self.rejected = 0
+        self.dropped = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def handle(self, request: Request) -> Response:
+        """Confere o segredo, enfileira e responde sem esperar o processamento"""
+        secret = request.headers.get(SECRET_HEADER, "").encode()
+        if not hmac.compare_digest(secret, self.secret):
+            self.rejected += 1
+            return Response(401, b"unauthorized")
+        try:
+            data = _loads(request.body)
+        except ValueError:
+            return Response(400, b"bad request")
+        if not isinstance(data, dict):
+            return Response(400, b"bad request")
+
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # O Telegram reenvia o update mais tarde
+            self.dropped += 1
+            logger.warning(
+                "⚠️ Fila do webhook cheia (%s updates), pedindo reenvio", self.queue.qsize(),
+                extra={"event": "webhook_full"}
+            )
+            return Response(503, b"busy")
+        self.received += 1
+        return Response(200)
+
+    def _app_full(self) -> bool:
+        """Updates entregues e ainda não concluídos no limite da Application"""
+        processor = self.app.update_processor
+        pending = self.app.update_queue.qsize() + processor.current_concurrent_updates
+        return pending >= processor.max_concurrent_updates
+
+    async def _drain(self):
+        while True:
+            data = await self.queue.get()
+            try:
+                # Com a Application cheia, espera um update terminar (PriorityUpdateProcessor)
+                while self._app_full():
+                    await self.app.update_processor.wait_for_finished()
+                try:
+                    update = Update.de_json(data, self.app.bot)
+                except Exception as e:
+                    logger.error(f"❌ Update inválido recebido pelo webhook: {e}")
+                    continue
+                await self.app.update_queue.put(update)
+            finally:
+                self.queue.task_done()
+
+    def start(self):
+        self._task = asyncio.create_task(self._drain(), name=f"webhook:{self.app.bot.username}")
+
+    async def stop(self):
+        """Entrega o que ainda está na fila e para"""
+        if self._task is not None and not self._task.done():
+            delivered = asyncio.ensure_future(self.queue.join())
+            await asyncio.wait({delivered, self._task}, return_when=asyncio.FIRST_COMPLETED)
+            delivered.cancel()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "pending": self.queue.qsize(),
+            "max_size": self.queue.maxsize,
+            "received": self.received,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+        }
+
+
+class WebhookServer:
+    """Servidor HTTP com uma rota de webhook por bot"""
+
+    def __init__(self, host: str, port: int, secret: str, max_connections: int, queue_size: int):
+        self.server = HttpServer(host, port, max_body=_MAX_BODY, max_connections=max_connections)
+        self.secret = secret
+        self.max_connections = max_connections
+        self.queue_size = queue_size
+        self.queues: Dict[Optional[int], WebhookQueue] = {}
+
+    def add_application(self, app: Application) -> WebhookQueue:
+        """Cria a fila e a rota de um bot"""
+        bot_id = bot_id_from_token(app.bot.token)
+        queue = self.queues[bot_id] = WebhookQueue(app, self.secret, self.queue_size)
+        self.server.route("POST", webhook_path(bot_id), queue.handle)
+        return queue
+
+    async def start(self):
+        await self.server.start()
+
+    async def set_webhook(self, app: Application, base_url: str, allowed_updates: Sequence[str]):
+        """Registra a URL do bot no Telegram e começa a entregar os updates à Application"""
+        bot_id = bot_id_from_token(app.bot.token)
+        self.queues[bot_id].start()
+        await app.bot.set_webhook(
+            url=base_url.rstrip("/") + webhook_path(bot_id),
+            secret_token=self.secret,
+            allowed_updates=allowed_updates,
+            max_connections=self.max_connections,
+        )
+        logger.info(f"🪝 Webhook de @{app.bot.username} registrado")
+
+    async def stop(self):
+        await self.server.stop()
+        for bot_id, queue in self.queues.items():
+            await queue.stop()
+            logger.info(
+                "🪝 Webhook do bot %s encerrado - %s", bot_id, queue.snapshot(),
+                extra={"event": "webhook_stats"}
+            )